@@ -10,4 +10,8 @@ def get_config(request: Request):
 
 
 def get_cookie_service(request: Request):
-    return request.app.state.cookie_service
\ No newline at end of file
+    return request.app.state.cookie_service
+
+
+def get_response_cache(request: Request):
+    return request.app.state.response_cache
\ No newline at end of file
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+"""
+API 响应工具:
+- FastJSONResponse: 基于 orjson 的 JSON 响应(未安装 orjson 时回退到标准库 json)
+- SerializedDocCache: 按文档修订号缓存序列化后的字节, 列表与详情接口复用
+- compressed_response: 按 Accept-Encoding 协商 br / gzip 压缩较大的响应体
+"""
+
+import gzip, json
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    brotli = None
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为紧凑 JSON 字节。"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class SerializedDocCache:
+    """
+    文档序列化结果的 LRU 缓存。
+    以 (DedeUserID, 修订号) 判定命中, 文档写入或文件被外部改写后修订号递增即自然失效;
+    修订号取自全局计数, 账号删除后重建也不会命中旧结果。修订号为 None 时不缓存。
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, dede_user_id: str, revision: Optional[int]) -> Optional[bytes]:
+        if revision is None:
+            return None
+        cached = self._entries.get(dede_user_id)
+        if cached is None or cached[0] != revision:
+            return None
+        self._entries.move_to_end(dede_user_id)
+        return cached[1]
+
+    def put(self, dede_user_id: str, revision: Optional[int], body: bytes) -> None:
+        if revision is None:
+            return
+        self._entries[dede_user_id] = (revision, body)
+        self._entries.move_to_end(dede_user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def serialize(self, dede_user_id: str, revision: Optional[int], doc: Dict[str, Any]) -> bytes:
+        body = self.get(dede_user_id, revision)
+        if body is None:
+            body = dumps(doc)
+            self.put(dede_user_id, revision, body)
+        return body
+
+
+def join_array(parts: Iterable[bytes]) -> bytes:
+    """将若干已序列化的 JSON 元素拼接为 JSON 数组。"""
+    return b"[" + b",".join(parts) + b"]"
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """根据 Accept-Encoding 选择压缩算法; 优先 br(需安装 brotli), 其次 gzip。"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compressed_response(request: Request, body: bytes, headers: Optional[Dict[str, str]] = None,
+                        media_type: str = "application/json", min_size: int = 1024) -> Response:
+    """构建响应; 响应体超过 min_size 且客户端支持时进行压缩。"""
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding", "")) if len(body) >= min_size else None
+    if encoding == "br":
+        body = brotli.compress(body, quality=5)
+        headers["Content-Encoding"] = "br"
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type=media_type, headers=headers)
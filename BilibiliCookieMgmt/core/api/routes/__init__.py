@@ -4,5 +4,8 @@ from __future__ import annotations
 
 from .auth import router as auth_router
 from .cookies import router as cookies_router
+from .notifications import router as notifications_router
+from .scheduler import router as scheduler_router
+from .wbi import router as wbi_router
 
-__all__ = ["auth_router", "cookies_router"]
+__all__ = ["auth_router", "cookies_router", "notifications_router", "scheduler_router", "wbi_router"]
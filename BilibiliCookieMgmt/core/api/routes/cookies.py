@@ -4,35 +4,203 @@ from __future__ import annotations
 Cookie 相关路由
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from typing import List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Union
 
-from ..deps import get_cookie_service
+from ..deps import get_cookie_service, get_response_cache
+from ..responses import FastJSONResponse, compressed_response, dumps, join_array
+from ...infrastructure.repositories.cookie_repository import MANAGED_KEY
 from ...utils.security import require_api_token
 
-router = APIRouter(prefix="/cookies", tags=["cookies"], dependencies=[Depends(require_api_token)])
+router = APIRouter(
+    prefix="/cookies",
+    tags=["cookies"],
+    dependencies=[Depends(require_api_token)],
+    default_response_class=FastJSONResponse,
+)
+
+
+def _not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    """If-None-Match 命中时返回 304 响应, 否则返回 None。"""
+    if not etag:
+        return None
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return None
+    candidates = {item.strip() for item in header.split(",")}
+    weak = etag[2:] if etag.startswith("W/") else etag
+    if "*" in candidates or etag in candidates or weak in candidates or f"W/{weak}" in candidates:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
 
 
 @router.get("/random")
-async def get_random_cookie(format: str = "simple", service = Depends(get_cookie_service)):
-    result = await service.get_random_cookie(fmt=format)
+async def get_random_cookie(
+    format: str = "simple",
+    strategy: str = Query("uniform", description="抽取策略: uniform(均匀) 或 weighted(按健康分加权)"),
+    service = Depends(get_cookie_service),
+):
+    if strategy not in {"uniform", "weighted"}:
+        raise HTTPException(status_code=400, detail=f"未知的抽取策略: {strategy}")
+    result = await service.get_random_cookie(fmt=format, strategy=strategy)
     if not result:
         raise HTTPException(status_code=404, detail="没有可用的 Cookie")
     return result
 
 
 @router.get("/")
-async def list_cookies(service = Depends(get_cookie_service)):
-    """返回所有 Cookie 的完整文档(原始与管理信息)。"""
-    return await service.list_cookies()
+async def list_cookies(request: Request, service = Depends(get_cookie_service), cache = Depends(get_response_cache)):
+    """
+    返回所有 Cookie 的完整文档(原始与管理信息)。
+    - 支持 If-None-Match, 无任何变更时返回 304
+    - 每个文档的序列化结果按修订号缓存; 响应体按 Accept-Encoding 压缩
+    cookie_dir 监听运行时外部改写已反映在 ETag 中, 命中时不读取任何文档直接返回 304;
+    未开启监听时先读取并核对每个文件的签名(外部改写的文件会递增修订号), 再判断 304。
+    读取期间修订号变化(有写入或外部改写)时不返回 304, 也不缓存序列化结果, 响应携带读取前的 ETag,
+    客户端下次请求会重新获取。
+    """
+    etag = await service.list_etag()
+    if service.tracks_external_changes:
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+    docs = await service.list_cookies()
+    unchanged = await service.list_etag() == etag
+    if unchanged:
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+    parts = []
+    for doc in docs:
+        dede_user_id = str(doc[MANAGED_KEY]["DedeUserID"])
+        revision = service.cookie_revision(dede_user_id) if unchanged else None
+        parts.append(cache.serialize(dede_user_id, revision, doc))
+    return compressed_response(request, join_array(parts), headers={"ETag": etag})
+
+
+@router.get("/stats")
+async def get_cookie_stats(request: Request, response: Response, service = Depends(get_cookie_service)):
+    """
+    账号统计: 按 status / refresh_status / is_enabled / tags 计数。
+    支持 If-None-Match, 计数未变化时返回 304。
+    """
+    result = await service.get_stats()
+    etag = result["etag"]
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    response.headers["ETag"] = etag
+    return result["stats"]
+
+
+@router.get("/export")
+async def export_cookies(
+    compression: str = Query("gz", description="压缩格式: gz 或 zst(需安装 zstandard)"),
+    tag: Optional[str] = Query(None, description="仅导出带有该标签的账号"),
+    status: Optional[str] = Query(None, description="仅导出该状态的账号"),
+    service = Depends(get_cookie_service),
+):
+    """以 tar 归档流式导出文档(每个账号一个 <DedeUserID>.json), 边读取边压缩输出。"""
+    # 归档模块(及可选的 zstandard)仅在导入/导出时加载
+    from ...utils.archive import MEDIA_TYPES, TarStreamWriter, check_compression
+
+    try:
+        check_compression(compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def body():
+        writer = TarStreamWriter(compression)
+        async for doc in service.iter_documents(tag=tag, status=status):
+            chunk = writer.add(f"{doc['managed']['DedeUserID']}.json", dumps(doc))
+            if chunk:
+                yield chunk
+        yield writer.close()
+
+    filename = f"cookies-{datetime.now().strftime('%Y%m%d-%H%M%S')}.tar.{compression}"
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[compression],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import")
+async def import_cookies(
+    request: Request,
+    batch_size: int = Query(100, ge=1, le=1000, description="每批写入的文档数"),
+    service = Depends(get_cookie_service),
+):
+    """
+    导入 tar.gz / tar.zst 归档(请求体为归档本身, 按魔数识别压缩格式)。
+    边接收边解压解析, 按批写入; 已存在的账号会被覆盖。
+    返回 {"imported", "failed", "errors"}; errors 最多列出 100 条。
+    """
+    from ...utils.archive import TarStreamReader
+
+    reader = TarStreamReader()
+    summary = {"imported": 0, "failed": 0, "errors": []}
+    batch = []
+
+    async def flush():
+        result = await service.import_documents(batch)
+        batch.clear()
+        summary["imported"] += len(result["imported"])
+        summary["failed"] += len(result["errors"])
+        summary["errors"].extend(result["errors"][:max(0, 100 - len(summary["errors"]))])
+
+    try:
+        async for chunk in request.stream():
+            for name, data in reader.feed(chunk):
+                basename = name.rsplit("/", 1)[-1]
+                if not basename or basename.startswith("."):
+                    continue
+                batch.append((name, data))
+                if len(batch) >= batch_size:
+                    await flush()
+        reader.close()
+    except ValueError as e:
+        await flush()
+        raise HTTPException(status_code=400, detail={"message": f"归档解析失败: {e}", **summary})
+    await flush()
+    return summary
 
 
 @router.get("/{DedeUserID}")
-async def get_cookie(DedeUserID: str, service = Depends(get_cookie_service)):
+async def get_cookie(DedeUserID: str, request: Request, service = Depends(get_cookie_service), cache = Depends(get_response_cache)):
+    etag = await service.cookie_etag(DedeUserID)
+    # 监听运行时 ETag 已反映外部改写, 命中即返回; 否则先读取文档(缓存命中时只有一次 stat),
+    # 文件被外部改写时修订号随之变化, 再据此判断 304
+    if etag is not None and service.tracks_external_changes:
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
     doc = await service.get_cookie(DedeUserID)
     if not doc:
         raise HTTPException(status_code=404, detail="Cookie 不存在")
-    return doc
+    current = await service.cookie_etag(DedeUserID)
+    unchanged = etag is not None and current == etag
+    if unchanged:
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+    etag = etag or current
+    revision = service.cookie_revision(DedeUserID) if unchanged else None
+    body = cache.serialize(DedeUserID, revision, doc)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag} if etag else None)
+
+
+@router.get("/{DedeUserID}/history")
+async def get_cookie_history(
+    DedeUserID: str,
+    limit: int = Query(50, ge=1, le=10000, description="返回的最近事件条数"),
+    service = Depends(get_cookie_service),
+):
+    """返回账号最近的检查/刷新事件(新到旧)。"""
+    events = await service.get_history(DedeUserID, limit)
+    return {"DedeUserID": DedeUserID, "events": events}
 
 
 @router.delete("/{DedeUserID}")
@@ -43,6 +211,30 @@ async def delete_cookie(DedeUserID: str, service = Depends(get_cookie_service)):
     return {"deleted": True, "DedeUserID": DedeUserID}
 
 
+@router.post("/{DedeUserID}/report")
+async def report_usage(
+    DedeUserID: str,
+    outcome: Union[int, str] = Body(..., embed=True, description='使用结果: "ok" 或 0 表示成功, 其余为接口返回码, 如 -412 / -101'),
+    service = Depends(get_cookie_service),
+):
+    """
+    调用方上报一次使用结果。登录失效类返回码或窗口内错误过多时,
+    该账号立即退出随机抽取并加入优先检查队列。返回该账号当前的降级状态与窗口统计。
+    """
+    if isinstance(outcome, str):
+        value = outcome.strip().lower()
+        if value == "ok":
+            outcome = 0
+        else:
+            try:
+                outcome = int(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"无法识别的使用结果: {outcome}")
+    result = await service.report_usage(DedeUserID, outcome)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Cookie 不存在")
+    return result
+
 
 @router.post("/test")
 async def test_cookie(cookie: str = Body(..., embed=True, description="Cookie 请求头字符串, 如 SESSDATA=...; bili_jct=...; DedeUserID=..."),
@@ -54,6 +246,7 @@ async def test_cookie(cookie: str = Body(..., embed=True, description="Cookie 
 @router.post("/check")
 async def check_cookies(
     all: bool = Query(False, description="是否对全部 Cookie 执行检查"),
+    force: bool = Query(False, description="忽略新鲜期, 强制请求上游"),
     ids: Optional[List[str]] = Body(None, embed=True, description="要检查的 DedeUserID 列表"),
     service = Depends(get_cookie_service),
 ):
@@ -61,9 +254,10 @@ async def check_cookies(
     统一的批量检查接口: 
     - all=true: 检查全部启用的 Cookie
     - 提供 ids: 检查指定 ID 列表
+    - force=true: 新鲜期内已检查过的账号也重新请求上游
     返回执行摘要与明细列表。
     """
-    return await service.check_cookies(ids=ids, all=all)
+    return await service.check_cookies(ids=ids, all=all, force=force)
 
 
 @router.post("/refresh")
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+"""
+通知状态路由:
+- GET /notifications/channels  各通知渠道的路由规则、队列积压与发送统计
+"""
+
+from fastapi import APIRouter, Depends, Request
+
+from ..responses import FastJSONResponse
+from ...utils.security import require_api_token
+
+router = APIRouter(
+    prefix="/notifications",
+    tags=["notifications"],
+    dependencies=[Depends(require_api_token)],
+    default_response_class=FastJSONResponse,
+)
+
+
+@router.get("/channels")
+async def get_channels(request: Request):
+    """
+    返回 {"channels": [...]}, 每项包含 channel、route、queued、capacity、sent、failed、dropped、
+    latency_ms{avg,max,last}、last_error; 未启用任何渠道时为空列表。
+    """
+    notification = request.app.state.cookie_service.notification
+    metrics = getattr(notification, "metrics", None)
+    return {"channels": metrics() if callable(metrics) else []}
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+"""
+调度器状态路由:
+- GET /scheduler/shards  当前调度模式、各实例分片积压
+"""
+
+from fastapi import APIRouter, Depends, Request
+
+from ..responses import FastJSONResponse
+from ...utils.security import require_api_token
+
+router = APIRouter(
+    prefix="/scheduler",
+    tags=["scheduler"],
+    dependencies=[Depends(require_api_token)],
+    default_response_class=FastJSONResponse,
+)
+
+
+@router.get("/shards")
+async def get_shards(request: Request):
+    """
+    返回调度模式与分片信息:
+    - sharding: {"mode", "member", "shards": [{"member", "self", "heartbeat_age_seconds", "backlog"}]}
+    - leader: {"mode", "is_leader", "lease"}
+    - single: {"mode"}
+    """
+    shard = getattr(request.app.state, "shard", None)
+    if shard is not None:
+        return {"mode": "sharding", "member": shard.member_id, "shards": shard.shards()}
+    election = getattr(request.app.state, "leader_election", None)
+    if election is not None:
+        return {"mode": "leader", "is_leader": election.is_leader, "lease": election.current()}
+    return {"mode": "single"}
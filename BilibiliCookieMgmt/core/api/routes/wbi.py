@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+"""
+WBI 签名口令路由:
+- GET /wbi/keys  返回缓存的 img_key / sub_key / mixin_key, 供调用方自行签名, 无需各自请求 nav
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..deps import get_cookie_service
+from ..responses import FastJSONResponse
+from ...utils.security import require_api_token
+
+router = APIRouter(
+    prefix="/wbi",
+    tags=["wbi"],
+    dependencies=[Depends(require_api_token)],
+    default_response_class=FastJSONResponse,
+)
+
+
+@router.get("/keys")
+async def get_wbi_keys(service = Depends(get_cookie_service)):
+    """
+    返回: {"img_key", "sub_key", "mixin_key", "fetched_at", "expires_at"}(时间为 Unix 秒)
+    口令在北京时间 0 点过期, 过期后的首次请求会刷新。
+    """
+    client = getattr(service, "client", None)
+    if client is None or not hasattr(client, "get_wbi_keys"):
+        raise HTTPException(status_code=500, detail="Bilibili 客户端未初始化")
+    keys = await client.get_wbi_keys()
+    if keys is None:
+        raise HTTPException(status_code=503, detail="暂时无法获取 WBI 口令")
+    return keys
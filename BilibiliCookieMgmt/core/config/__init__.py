@@ -1,5 +1,14 @@
 from __future__ import annotations
 
-from .loader import load_config, AppConfig
+from .loader import load_config, parse_config_file, resolve_config_path, validate_config, AppConfig
+from .watcher import ConfigWatcher, diff_config
 
-__all__ = ["load_config", "AppConfig"]
+__all__ = [
+    "load_config",
+    "parse_config_file",
+    "resolve_config_path",
+    "validate_config",
+    "AppConfig",
+    "ConfigWatcher",
+    "diff_config",
+]
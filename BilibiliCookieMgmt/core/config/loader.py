@@ -1,12 +1,19 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Dict, List, Optional
 from pathlib import Path
 import os
 import argparse
+import logging
 import yaml
 
+from ..utils.profiling import ENGINES
+from ..utils.tracing import EXPORTERS
+
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class ApiTokenConfig:
@@ -17,6 +24,18 @@ class ApiTokenConfig:
 @dataclass
 class StorageConfig:
     cookie_dir: str = "./data/cookie"
+    history_dir: str = "./data/history"
+    history_capacity: int = 256
+    format: str = "pretty"
+    layout: str = "flat"
+    convert_existing: bool = True
+    upgrade_workers: int = 4
+    write_behind: bool = False
+    flush_interval_seconds: int = 30
+    watch: bool = True
+    watch_poll_interval_seconds: float = 60.0
+    load_workers: int = 8
+    load_mode: str = "thread"
 
 
 @dataclass
@@ -26,6 +45,83 @@ class GotifyConfig:
     token: str = ""
     priority: int = 5
     title: str = "BilibiliCookieMgmt"
+    min_priority: int = 0
+    max_priority: int = 10
+
+
+@dataclass
+class WebhookConfig:
+    enable: bool = False
+    url: str = ""
+    headers: Dict[str, str] = field(default_factory=dict)
+    min_priority: int = 0
+    max_priority: int = 10
+
+
+@dataclass
+class TelegramConfig:
+    enable: bool = False
+    api_url: str = ""
+    chat_id: str = ""
+    min_priority: int = 0
+    max_priority: int = 10
+
+
+@dataclass
+class NotificationConfig:
+    queue_size: int = 100
+    drain_timeout_seconds: float = 5.0
+    outbox: bool = False
+    outbox_path: str = "./data/notifications.db"
+    retry_base_seconds: float = 5.0
+    retry_max_seconds: float = 600.0
+    dedupe_seconds: float = 86400.0
+    max_age_seconds: float = 604800.0
+
+
+@dataclass
+class BilibiliConfig:
+    test_cache_ttl_seconds: float = 10.0
+    check_fresh_seconds: float = 60.0
+
+
+@dataclass
+class FeedbackConfig:
+    window_seconds: float = 300.0
+    error_threshold: int = 5
+    error_ratio: float = 0.5
+    auth_codes: List[int] = field(default_factory=lambda: [-101])
+    cooldown_seconds: float = 600.0
+
+
+@dataclass
+class ProfilingConfig:
+    enable: bool = False
+    allow_header: bool = True
+    engine: str = "auto"
+    interval_ms: float = 1.0
+    threshold_ms: float = 500.0
+    output_dir: str = "./logs/profiles"
+    slow_callback_ms: float = 0.0
+
+
+@dataclass
+class TracingConfig:
+    enable: bool = False
+    exporter: str = "jsonl"
+    jsonl_path: str = "./logs/traces.jsonl"
+    otlp_endpoint: str = "http://127.0.0.1:4318"
+    otlp_headers: Dict[str, str] = field(default_factory=dict)
+    service_name: str = "BilibiliCookieMgmt"
+    sample_ratio: float = 1.0
+    flush_interval_seconds: float = 5.0
+    max_queue: int = 10000
+
+
+@dataclass
+class ConfigReloadConfig:
+    enable: bool = False
+    poll_interval_seconds: float = 2.0
 
 
 @dataclass
@@ -34,10 +130,29 @@ class SchedulerItemConfig:
     interval_seconds: int = 600
 
 
+@dataclass
+class LeaderElectionConfig:
+    enable: bool = False
+    lease_file: str = "./data/scheduler.lease"
+    lease_seconds: int = 15
+    heartbeat_seconds: int = 5
+
+
+@dataclass
+class ShardingConfig:
+    enable: bool = False
+    members_dir: str = "./data/scheduler.members"
+    heartbeat_seconds: int = 5
+    member_ttl_seconds: int = 15
+    vnodes: int = 64
+
+
 @dataclass
 class SchedulerConfig:
     cookie_check: SchedulerItemConfig = field(default_factory=SchedulerItemConfig)
     cookie_refresh: SchedulerItemConfig = field(default_factory=lambda: SchedulerItemConfig(enable=False, interval_seconds=86400))
+    leader_election: LeaderElectionConfig = field(default_factory=LeaderElectionConfig)
+    sharding: ShardingConfig = field(default_factory=ShardingConfig)
 
 
 @dataclass
@@ -47,27 +162,40 @@ class AppConfig:
     api_token: ApiTokenConfig = field(default_factory=ApiTokenConfig)
     storage: StorageConfig = field(default_factory=StorageConfig)
     gotify: GotifyConfig = field(default_factory=GotifyConfig)
+    webhook: WebhookConfig = field(default_factory=WebhookConfig)
+    telegram: TelegramConfig = field(default_factory=TelegramConfig)
+    notification: NotificationConfig = field(default_factory=NotificationConfig)
+    bilibili: BilibiliConfig = field(default_factory=BilibiliConfig)
+    feedback: FeedbackConfig = field(default_factory=FeedbackConfig)
+    profiling: ProfilingConfig = field(default_factory=ProfilingConfig)
+    tracing: TracingConfig = field(default_factory=TracingConfig)
+    config_reload: ConfigReloadConfig = field(default_factory=ConfigReloadConfig)
     scheduler: SchedulerConfig = field(default_factory=SchedulerConfig)
 
 
 def _ensure_dirs(cfg: AppConfig) -> None:
     os.makedirs(cfg.storage.cookie_dir, exist_ok=True)
+    os.makedirs(cfg.storage.history_dir, exist_ok=True)
 
 
-def load_config(config_path: Optional[str] = None) -> AppConfig:
-    """
-    加载配置
-    """
-    # 优先使用命令行参数指定的配置文件
+def _sibling_dir(cookie_dir: str, name: str) -> str:
+    """未显式配置时, 数据目录默认与 cookie_dir 同级。"""
+    return os.path.join(os.path.dirname(os.path.normpath(cookie_dir)), name)
+
+
+def resolve_config_path(config_path: Optional[str] = None) -> str:
+    """配置文件路径: 命令行 -c/--config 优先, 其次为参数, 缺省为 config.yaml。"""
     parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument("-c", "--config", help="配置文件路径")
     args, _ = parser.parse_known_args()
+    return args.config or config_path or "config.yaml"
 
-    if args.config:
-        config_path = args.config
 
-    if config_path is None:
-        config_path = "config.yaml"
+def load_config(config_path: Optional[str] = None) -> AppConfig:
+    """
+    加载配置
+    """
+    config_path = resolve_config_path(config_path)
 
     if not os.path.exists(config_path):
         msg = f"未找到配置文件: {config_path}"
@@ -75,15 +203,39 @@ def load_config(config_path: Optional[str] = None) -> AppConfig:
             msg += "。检测到 config.example.yaml，请将其复制为 config.yaml 并根据需要修改配置。"
         raise FileNotFoundError(msg)
 
+    cfg = parse_config_file(config_path, strict=False)
+    _ensure_dirs(cfg)
+    return cfg
+
+
+def parse_config_file(config_path: str, strict: bool = True) -> AppConfig:
+    """
+    解析并校验配置文件, 不创建目录(热重载时使用); 配置无效时抛出 ValueError。
+    strict=False 时(启动加载)引入校验前即可加载的配置项不合法只记录警告, 见 validate_config。
+    """
     with open(config_path, "r", encoding="utf-8") as f:
         data = yaml.safe_load(f) or {}
+    if not isinstance(data, dict):
+        raise ValueError("配置文件顶层必须是键值映射")
 
     api_token_cfg = data.get("API_TOKEN", {})
     storage_cfg = data.get("STORAGE", {})
     gotify_cfg = data.get("GOTIFY", {})
+    webhook_cfg = data.get("WEBHOOK", {}) or {}
+    telegram_cfg = data.get("TELEGRAM", {}) or {}
+    notification_cfg = data.get("NOTIFICATION", {}) or {}
+    bilibili_cfg = data.get("BILIBILI", {}) or {}
+    feedback_cfg = data.get("FEEDBACK", {}) or {}
+    profiling_cfg = data.get("PROFILING", {}) or {}
+    tracing_cfg = data.get("TRACING", {}) or {}
+    reload_cfg = data.get("CONFIG_RELOAD", {}) or {}
     scheduler_cfg = data.get("SCHEDULER", {})
     check_cfg_src = scheduler_cfg.get("COOKIE_CHECK", {}) if scheduler_cfg else {}
     refresh_cfg_src = scheduler_cfg.get("COOKIE_REFRESH", {}) if scheduler_cfg else {}
+    leader_cfg_src = scheduler_cfg.get("LEADER_ELECTION", {}) if scheduler_cfg else {}
+    sharding_cfg_src = scheduler_cfg.get("SHARDING", {}) if scheduler_cfg else {}
+
+    cookie_dir = str(storage_cfg.get("cookie_dir", "./data/cookie"))
 
     cfg = AppConfig(
         host=str(data.get("HOST", "0.0.0.0")),
@@ -93,7 +245,19 @@ def load_config(config_path: Optional[str] = None) -> AppConfig:
             token=str(api_token_cfg.get("token", "")),
         ),
         storage=StorageConfig(
-            cookie_dir=str(storage_cfg.get("cookie_dir", "./data/cookie")),
+            cookie_dir=cookie_dir,
+            history_dir=str(storage_cfg.get("history_dir") or _sibling_dir(cookie_dir, "history")),
+            history_capacity=int(storage_cfg.get("history_capacity", 256)),
+            format=str(storage_cfg.get("format", "pretty")),
+            layout=str(storage_cfg.get("layout", "flat")),
+            convert_existing=bool(storage_cfg.get("convert_existing", True)),
+            upgrade_workers=int(storage_cfg.get("upgrade_workers", 4)),
+            write_behind=bool(storage_cfg.get("write_behind", False)),
+            flush_interval_seconds=int(storage_cfg.get("flush_interval_seconds", 30)),
+            watch=bool(storage_cfg.get("watch", True)),
+            watch_poll_interval_seconds=float(storage_cfg.get("watch_poll_interval_seconds", 60.0)),
+            load_workers=int(storage_cfg.get("load_workers", 8)),
+            load_mode=str(storage_cfg.get("load_mode", "thread")),
         ),
         gotify=GotifyConfig(
             enable=bool(gotify_cfg.get("enable", False)),
@@ -101,6 +265,67 @@ def load_config(config_path: Optional[str] = None) -> AppConfig:
             token=str(gotify_cfg.get("token", "")),
             priority=int(gotify_cfg.get("priority", 5)),
             title=str(gotify_cfg.get("title", "BilibiliCookieMgmt")),
+            min_priority=int(gotify_cfg.get("min_priority", 0)),
+            max_priority=int(gotify_cfg.get("max_priority", 10)),
+        ),
+        webhook=WebhookConfig(
+            enable=bool(webhook_cfg.get("enable", False)),
+            url=str(webhook_cfg.get("url", "")),
+            headers={str(k): str(v) for k, v in (webhook_cfg.get("headers") or {}).items()},
+            min_priority=int(webhook_cfg.get("min_priority", 0)),
+            max_priority=int(webhook_cfg.get("max_priority", 10)),
+        ),
+        telegram=TelegramConfig(
+            enable=bool(telegram_cfg.get("enable", False)),
+            api_url=str(telegram_cfg.get("api_url", "")),
+            chat_id=str(telegram_cfg.get("chat_id", "")),
+            min_priority=int(telegram_cfg.get("min_priority", 0)),
+            max_priority=int(telegram_cfg.get("max_priority", 10)),
+        ),
+        notification=NotificationConfig(
+            queue_size=int(notification_cfg.get("queue_size", 100)),
+            drain_timeout_seconds=float(notification_cfg.get("drain_timeout_seconds", 5.0)),
+            outbox=bool(notification_cfg.get("outbox", False)),
+            outbox_path=str(notification_cfg.get("outbox_path") or _sibling_dir(cookie_dir, "notifications.db")),
+            retry_base_seconds=float(notification_cfg.get("retry_base_seconds", 5.0)),
+            retry_max_seconds=float(notification_cfg.get("retry_max_seconds", 600.0)),
+            dedupe_seconds=float(notification_cfg.get("dedupe_seconds", 86400.0)),
+            max_age_seconds=float(notification_cfg.get("max_age_seconds", 604800.0)),
+        ),
+        bilibili=BilibiliConfig(
+            test_cache_ttl_seconds=float(bilibili_cfg.get("test_cache_ttl_seconds", 10.0)),
+            check_fresh_seconds=float(bilibili_cfg.get("check_fresh_seconds", 60.0)),
+        ),
+        feedback=FeedbackConfig(
+            window_seconds=float(feedback_cfg.get("window_seconds", 300.0)),
+            error_threshold=int(feedback_cfg.get("error_threshold", 5)),
+            error_ratio=float(feedback_cfg.get("error_ratio", 0.5)),
+            auth_codes=[int(code) for code in (feedback_cfg.get("auth_codes") if feedback_cfg.get("auth_codes") is not None else [-101])],
+            cooldown_seconds=float(feedback_cfg.get("cooldown_seconds", 600.0)),
+        ),
+        profiling=ProfilingConfig(
+            enable=bool(profiling_cfg.get("enable", False)),
+            allow_header=bool(profiling_cfg.get("allow_header", True)),
+            engine=str(profiling_cfg.get("engine", "auto")),
+            interval_ms=float(profiling_cfg.get("interval_ms", 1.0)),
+            threshold_ms=float(profiling_cfg.get("threshold_ms", 500.0)),
+            output_dir=str(profiling_cfg.get("output_dir", "./logs/profiles")),
+            slow_callback_ms=float(profiling_cfg.get("slow_callback_ms", 0.0)),
+        ),
+        tracing=TracingConfig(
+            enable=bool(tracing_cfg.get("enable", False)),
+            exporter=str(tracing_cfg.get("exporter", "jsonl")),
+            jsonl_path=str(tracing_cfg.get("jsonl_path", "./logs/traces.jsonl")),
+            otlp_endpoint=str(tracing_cfg.get("otlp_endpoint", "http://127.0.0.1:4318")),
+            otlp_headers={str(k): str(v) for k, v in (tracing_cfg.get("otlp_headers") or {}).items()},
+            service_name=str(tracing_cfg.get("service_name", "BilibiliCookieMgmt")),
+            sample_ratio=float(tracing_cfg.get("sample_ratio", 1.0)),
+            flush_interval_seconds=float(tracing_cfg.get("flush_interval_seconds", 5.0)),
+            max_queue=int(tracing_cfg.get("max_queue", 10000)),
+        ),
+        config_reload=ConfigReloadConfig(
+            enable=bool(reload_cfg.get("enable", False)),
+            poll_interval_seconds=float(reload_cfg.get("poll_interval_seconds", 2.0)),
         ),
         scheduler=SchedulerConfig(
             cookie_check=SchedulerItemConfig(
@@ -111,8 +336,66 @@ def load_config(config_path: Optional[str] = None) -> AppConfig:
                 enable=bool(refresh_cfg_src.get("enable", False)),
                 interval_seconds=int(refresh_cfg_src.get("interval_seconds", 86400)),
             ),
+            leader_election=LeaderElectionConfig(
+                enable=bool(leader_cfg_src.get("enable", False)),
+                lease_file=str(leader_cfg_src.get("lease_file") or _sibling_dir(cookie_dir, "scheduler.lease")),
+                lease_seconds=int(leader_cfg_src.get("lease_seconds", 15)),
+                heartbeat_seconds=int(leader_cfg_src.get("heartbeat_seconds", 5)),
+            ),
+            sharding=ShardingConfig(
+                enable=bool(sharding_cfg_src.get("enable", False)),
+                members_dir=str(sharding_cfg_src.get("members_dir") or _sibling_dir(cookie_dir, "scheduler.members")),
+                heartbeat_seconds=int(sharding_cfg_src.get("heartbeat_seconds", 5)),
+                member_ttl_seconds=int(sharding_cfg_src.get("member_ttl_seconds", 15)),
+                vnodes=int(sharding_cfg_src.get("vnodes", 64)),
+            ),
         ),
     )
 
-    _ensure_dirs(cfg)
-    return cfg
\ No newline at end of file
+    for problem in validate_config(cfg, strict=strict):
+        logger.warning(f"配置项取值无效, 兼容旧配置仍按原值启动, 热重载时将被拒绝: {problem}")
+    return cfg
+
+
+def _legacy_problems(cfg: AppConfig) -> List[str]:
+    """引入配置校验前已存在、且不合法时仍能启动的配置项。"""
+    problems: List[str] = []
+    if not 0 < cfg.port < 65536:
+        problems.append(f"PORT 超出范围: {cfg.port}")
+    if cfg.api_token.enable and not cfg.api_token.token:
+        problems.append("API_TOKEN.enable 为 true 时 token 不能为空")
+    if cfg.bilibili.test_cache_ttl_seconds < 0 or cfg.bilibili.check_fresh_seconds < 0:
+        problems.append("BILIBILI 中的时长不能为负数")
+    if cfg.profiling.engine not in ENGINES:
+        problems.append(f"未知的采样引擎: {cfg.profiling.engine}, 可选: {', '.join(ENGINES)}")
+    if cfg.tracing.exporter not in EXPORTERS:
+        problems.append(f"未知的追踪导出器: {cfg.tracing.exporter}, 可选: {', '.join(EXPORTERS)}")
+    if not 0 <= cfg.tracing.sample_ratio <= 1:
+        problems.append(f"TRACING.sample_ratio 必须在 0~1 之间: {cfg.tracing.sample_ratio}")
+    for name, item in (("COOKIE_CHECK", cfg.scheduler.cookie_check), ("COOKIE_REFRESH", cfg.scheduler.cookie_refresh)):
+        if item.interval_seconds <= 0:
+            problems.append(f"SCHEDULER.{name}.interval_seconds 必须大于 0")
+    return problems
+
+
+def validate_config(cfg: AppConfig, strict: bool = True) -> List[str]:
+    """
+    校验取值范围与枚举值, 第一个不合法的配置项以 ValueError 抛出。
+    strict=False 时, 引入校验前已存在的配置项(端口、鉴权、BILIBILI、采样/追踪、调度间隔)不合法不抛出,
+    以列表返回供调用方记录警告; 之后新增的配置项始终严格校验。
+    """
+    problems = _legacy_problems(cfg)
+    if problems and strict:
+        raise ValueError(problems[0])
+    for name, channel in (("GOTIFY", cfg.gotify), ("WEBHOOK", cfg.webhook), ("TELEGRAM", cfg.telegram)):
+        if channel.min_priority > channel.max_priority:
+            raise ValueError(f"{name}.min_priority 不能大于 max_priority")
+    if cfg.notification.queue_size < 1:
+        raise ValueError("NOTIFICATION.queue_size 必须大于 0")
+    if cfg.notification.retry_base_seconds <= 0 or cfg.notification.retry_max_seconds < cfg.notification.retry_base_seconds:
+        raise ValueError("NOTIFICATION.retry_base_seconds 必须大于 0 且不大于 retry_max_seconds")
+    if cfg.feedback.window_seconds <= 0 or cfg.feedback.error_threshold < 1 or not 0 <= cfg.feedback.error_ratio <= 1:
+        raise ValueError("FEEDBACK 配置无效: window_seconds 须大于 0, error_threshold 至少为 1, error_ratio 在 0~1 之间")
+    if cfg.config_reload.poll_interval_seconds <= 0:
+        raise ValueError("CONFIG_RELOAD.poll_interval_seconds 必须大于 0")
+    return problems
\ No newline at end of file
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+"""
+配置热重载: 定期检查 config.yaml 的修改时间/大小, 变化后重新解析并校验。
+- 校验通过时交给 on_reload 回调应用差异(见 main.py), 校验失败时记录日志并保留当前配置
+- 单个文件的 stat 开销可以忽略, 因此只使用轮询; 编辑器"写临时文件再替换"的保存方式同样能被发现
+"""
+
+import os, asyncio, logging
+from dataclasses import fields, is_dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from .loader import AppConfig, parse_config_file
+
+
+logger = logging.getLogger(__name__)
+
+ReloadCallback = Callable[[AppConfig], Awaitable[None]]
+
+# 展开到下一层比较的配置段, 其余配置段整体比较
+_NESTED_SECTIONS = ("scheduler",)
+
+
+def diff_config(old: AppConfig, new: AppConfig) -> List[str]:
+    """返回发生变化的配置段, 如 ["api_token", "scheduler.cookie_check"]。"""
+    changed: List[str] = []
+    for f in fields(old):
+        before, after = getattr(old, f.name), getattr(new, f.name)
+        if before == after:
+            continue
+        if f.name in _NESTED_SECTIONS and is_dataclass(before):
+            changed.extend(
+                f"{f.name}.{sub.name}" for sub in fields(before)
+                if getattr(before, sub.name) != getattr(after, sub.name)
+            )
+        else:
+            changed.append(f.name)
+    return changed
+
+
+class ConfigWatcher:
+    """轮询配置文件, 变化且校验通过时调用 on_reload(new_config)。"""
+
+    def __init__(self, path: str, on_reload: ReloadCallback, poll_interval_seconds: float = 2.0):
+        self.path = path
+        self.on_reload = on_reload
+        self.poll_interval_seconds = max(0.1, float(poll_interval_seconds))
+        self.reloads = 0
+        self.rejected = 0
+        self._signature = self._stat()
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    async def check_once(self) -> Optional[AppConfig]:
+        """检查一次; 文件变化且新配置有效时应用并返回新配置, 否则返回 None。"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return None
+        self._signature = signature
+        loop = asyncio.get_running_loop()
+        try:
+            config = await loop.run_in_executor(None, parse_config_file, self.path)
+        except Exception as e:
+            # 文件可能仍在写入, 再次保存后会重新检查
+            self.rejected += 1
+            logger.error(f"配置文件无效, 已忽略本次修改并继续使用当前配置: {self.path}, 错误: {e}")
+            return None
+        try:
+            await self.on_reload(config)
+        except Exception as e:
+            self.rejected += 1
+            logger.error(f"应用新配置失败: {e}", exc_info=True)
+            return None
+        self.reloads += 1
+        return config
+
+    async def run(self) -> None:
+        logger.info(f"配置热重载已启用, 监听: {self.path}")
+        while True:
+            try:
+                await self.check_once()
+            except Exception as e:
+                logger.error(f"检查配置文件异常: {e}", exc_info=True)
+            await asyncio.sleep(self.poll_interval_seconds)
@@ -31,6 +31,7 @@ class ManagedInfo:
     update_time: datetime
     join_time: datetime
     last_check_time: Optional[datetime] = None
+    last_verified_time: Optional[datetime] = None
     last_refresh_time: Optional[datetime] = None
     refresh_status: RefreshStatus = RefreshStatus.NOT_NEEDED
     error_message: Optional[str] = None
@@ -46,6 +47,7 @@ class ManagedInfo:
             "update_time": self.update_time.isoformat(),
             "join_time": self.join_time.isoformat(),
             "last_check_time": self.last_check_time.isoformat() if self.last_check_time else None,
+            "last_verified_time": self.last_verified_time.isoformat() if self.last_verified_time else None,
             "last_refresh_time": self.last_refresh_time.isoformat() if self.last_refresh_time else None,
             "refresh_status": self.refresh_status.value,
             "error_message": self.error_message,
@@ -2,10 +2,16 @@ from __future__ import annotations
 
 """
 Bilibili 客户端
+WBI 签名(见 .docs/wbi.md): img_key / sub_key 取自 nav 响应的 wbi_img, 检查 Cookie 时顺带更新,
+混合后的 mixin_key 缓存到次日 0 点(北京时间), 过期后并发请求只触发一次 nav 刷新。
+请求合并(single-flight): 以 (接口, Cookie 哈希) 为键, 同一 Cookie 的并发 nav / spi 请求共享同一次上游调用。
 """
 
-import time, hashlib, urllib.parse, httpx, logging
-from typing import Any, Dict, Optional
+import time, asyncio, hashlib, urllib.parse, httpx, logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from ..utils.tracing import traced, tracer
 
 
 logger = logging.getLogger(__name__)
@@ -19,6 +25,56 @@ USER_AGENT = (
 )
 
 
+MIXIN_KEY_ENC_TAB = [
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
+    33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
+    61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
+    36, 20, 34, 44, 52,
+]
+NAV_URL = "https://api.bilibili.com/x/web-interface/nav"
+SPI_URL = "https://api.bilibili.com/x/frontend/finger/spi"
+# nav 接口未登录时的返回码; 请求失败(网络异常、响应无法解析)记为 -1
+NAV_NOT_LOGGED_IN = -101
+REQUEST_FAILED = -1
+# WBI 口令每日更替, 以北京时间 0 点为界
+_WBI_TZ = timezone(timedelta(hours=8))
+
+
+def get_mixin_key(img_key: str, sub_key: str) -> str:
+    """对 img_key + sub_key 按 MIXIN_KEY_ENC_TAB 重排, 取前 32 位。"""
+    raw = img_key + sub_key
+    return "".join(raw[i] for i in MIXIN_KEY_ENC_TAB if i < len(raw))[:32]
+
+
+def wbisign(params: Dict[str, Any], mixin_key: str, wts: Optional[int] = None) -> Dict[str, Any]:
+    """WBI 签名: 返回追加了 wts 与 w_rid 的参数副本。"""
+    signed = dict(params)
+    signed["wts"] = int(time.time()) if wts is None else int(wts)
+    signed = {
+        key: "".join(ch for ch in str(value) if ch not in "!'()*")
+        for key, value in sorted(signed.items())
+    }
+    query = urllib.parse.urlencode(signed, quote_via=urllib.parse.quote)
+    signed["w_rid"] = hashlib.md5((query + mixin_key).encode()).hexdigest()
+    return signed
+
+
+def _extract_wbi_keys(nav_data: Any) -> Optional[tuple]:
+    """从 nav 响应的 data 中提取 (img_key, sub_key); 未登录的响应同样携带 wbi_img。"""
+    if not isinstance(nav_data, dict):
+        return None
+    wbi_img = nav_data.get("wbi_img")
+    if not isinstance(wbi_img, dict):
+        return None
+    keys = []
+    for field in ("img_url", "sub_url"):
+        url = wbi_img.get(field)
+        if not isinstance(url, str) or "/" not in url:
+            return None
+        keys.append(url.rsplit("/", 1)[1].split(".")[0])
+    return tuple(keys) if all(keys) else None
+
+
 def tvsign(params: Dict[str, Any], appkey: str = APP_KEY, appsec: str = APP_SEC) -> Dict[str, Any]:
     """TV 签名"""
     signed = dict(params)
@@ -31,11 +87,64 @@ def tvsign(params: Dict[str, Any], appkey: str = APP_KEY, appsec: str = APP_SEC)
 
 
 class BilibiliClient:
-    def __init__(self, timeout: float = 10.0):
-        self._client = httpx.AsyncClient(timeout=timeout)
+    def __init__(self, timeout: float = 10.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        # httpx 客户端(含 TLS 上下文)在首次请求时才创建, 不占用启动时间
+        self._timeout = timeout
+        self._transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        self._wbi_keys: Optional[Dict[str, Any]] = None
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    @staticmethod
+    def cookie_key(header_string: str) -> str:
+        """Cookie 字符串的摘要, 用作合并/缓存键, 避免在内存中以明文作键。"""
+        return hashlib.sha256(header_string.encode("utf-8")).hexdigest()
+
+    async def _single_flight(self, key: Tuple[str, str], factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        同键的并发调用共享同一次请求, 结果(或异常)原样返回给所有等待者。
+        请求完成即移除, 不做结果缓存; 单个调用方被取消不影响其他等待者。
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+
+            def _clear(fut: asyncio.Future) -> None:
+                if self._inflight.get(key) is fut:
+                    del self._inflight[key]
+                if not fut.cancelled():
+                    fut.exception()  # 标记异常已读取, 避免无人等待时告警
+
+            future.add_done_callback(_clear)
+        return await asyncio.shield(future)
+
+    async def _get_json(self, url: str, header_string: Optional[str]) -> Dict[str, Any]:
+        headers = {"User-Agent": USER_AGENT, "Referer": "https://www.bilibili.com/"}
+        if header_string:
+            headers["Cookie"] = header_string
+        with tracer.span("bilibili.http", url=url) as span:
+            rsp = await self._client.get(url, headers=headers, timeout=10.0)
+            span.set_attribute("status_code", rsp.status_code)
+            return rsp.json()
+
+    async def _nav(self, header_string: Optional[str]) -> Dict[str, Any]:
+        """请求 nav 接口(合并并发请求), 并顺带更新 WBI 口令。"""
+        key = ("nav", self.cookie_key(header_string) if header_string else "")
+        data = await self._single_flight(key, lambda: self._get_json(NAV_URL, header_string))
+        self._observe_nav(data.get("data"))
+        return data
+
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self._timeout, transport=self._transport)
+        return self._http
 
     async def aclose(self) -> None:
-        await self._client.aclose()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     @staticmethod
     def build_cookie_string(cookies: list[dict]) -> str:
@@ -43,6 +152,7 @@ class BilibiliClient:
         cookie_dict = {c.get("name"): c.get("value") for c in cookies if c.get("name")}
         return "; ".join([f"{k}={v}" for k, v in cookie_dict.items()])
 
+    @traced("bilibili.generate_qrcode", uid_arg=None)
     async def generate_qrcode(self) -> Dict[str, Any]:
         """
         生成扫码登录二维码(TV 登录)
@@ -59,6 +169,7 @@ class BilibiliClient:
             logger.error(f"生成二维码网络请求失败: {e}")
             return {"code": -1, "message": f"网络错误: {e}"}
 
+    @traced("bilibili.poll_qrcode_status", uid_arg=None)
     async def poll_qrcode_status(self, auth_code: str) -> Dict[str, Any]:
         """
         轮询扫码登录状态(TV 登录)
@@ -97,40 +208,97 @@ class BilibiliClient:
             logger.error(f"轮询二维码网络请求失败: {e}")
             return {"code": -1, "message": f"网络错误: {e}"}
 
+    def _observe_nav(self, nav_data: Any) -> None:
+        """用 nav 响应中的 wbi_img 更新 WBI 口令缓存; 口令未变化时不延长有效期。"""
+        keys = _extract_wbi_keys(nav_data)
+        if keys is None:
+            return
+        img_key, sub_key = keys
+        cached = self._wbi_keys
+        now = time.time()
+        if cached and cached["img_key"] == img_key and cached["sub_key"] == sub_key and cached["expires_at"] > now:
+            return
+        tomorrow = datetime.fromtimestamp(now, _WBI_TZ).date() + timedelta(days=1)
+        expires_at = datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=_WBI_TZ).timestamp()
+        self._wbi_keys = {
+            "img_key": img_key,
+            "sub_key": sub_key,
+            "mixin_key": get_mixin_key(img_key, sub_key),
+            "fetched_at": int(now),
+            "expires_at": int(expires_at),
+        }
+
+    async def _fetch_wbi_keys(self) -> Optional[Dict[str, Any]]:
+        try:
+            await self._nav(None)
+        except Exception as e:
+            logger.error(f"获取 WBI 口令失败: {e}")
+            return None
+        keys = self._wbi_keys
+        return keys if keys and keys["expires_at"] > time.time() else None
+
+    async def get_wbi_keys(self) -> Optional[Dict[str, Any]]:
+        """
+        返回 {"img_key", "sub_key", "mixin_key", "fetched_at", "expires_at"}。
+        缓存有效时直接返回; 过期时并发调用共享同一次 nav 请求, 请求失败则退回过期的缓存, 均无时返回 None。
+        """
+        keys = self._wbi_keys
+        if keys and keys["expires_at"] > time.time():
+            return keys
+        fresh = await self._single_flight(("wbi", ""), self._fetch_wbi_keys)
+        return fresh or keys
+
+    async def sign_wbi(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """使用缓存的 mixin_key 进行 WBI 签名; 无法获取口令时返回 None。"""
+        keys = await self.get_wbi_keys()
+        if keys is None:
+            return None
+        return wbisign(params, keys["mixin_key"])
+
+    @traced("bilibili.check_login", uid_arg=None)
+    async def check_login(self, header_string: str) -> Tuple[Optional[bool], int, Dict[str, Any]]:
+        """
+        同 check_cookie_valid, 但区分请求失败, 返回 (判定, nav 返回码, nav 的 data):
+        - 判定 True/False 为上游的登录判定, None 表示未得到判定
+        - 只有 code 为 0(按 isLogin 判定)或 -101(未登录)时视为判定; 风控(-412)、-352 等其他返回码
+          与请求失败一样判定为 None, 不能据此认为 Cookie 已失效
+        - 请求失败时返回码为 -1
+        - data 为 code 为 0 时的导航信息(uname 等), 其余情况为空字典; 调用方无需再请求 get_nav
+        """
+        try:
+            data = await self._nav(header_string)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"检查 Cookie 有效性网络请求失败: {e}")
+            return None, REQUEST_FAILED, {}
+        try:
+            code = int(data.get("code"))
+        except (TypeError, ValueError):
+            code = REQUEST_FAILED
+        if code == 0:
+            nav_data = data.get("data") if isinstance(data.get("data"), dict) else {}
+            return bool(nav_data.get("isLogin")), code, nav_data
+        if code == NAV_NOT_LOGGED_IN:
+            return False, code, {}
+        logger.warning(f"检查 Cookie 有效性未得到判定: code={code}, message={data.get('message')}")
+        return None, code, {}
+
     async def check_cookie_valid(self, header_string: str) -> bool:
         """
         检查 Cookie 是否有效: 调用导航接口, 判断是否登录
         - header_string: 形如 "SESSDATA=...; bili_jct=...; DedeUserID=..." 的 Cookie 请求头字符串
         返回布尔值: True 表示有效；False 表示无效或请求失败
         """
-        url = "https://api.bilibili.com/x/web-interface/nav"
-        headers = {
-            "User-Agent": USER_AGENT,
-            "Referer": "https://www.bilibili.com/",
-            "Cookie": header_string,
-        }
-        try:
-            rsp = await self._client.get(url, headers=headers, timeout=10.0)
-            data = rsp.json()
-            return bool(data.get("code") == 0 and data.get("data", {}).get("isLogin"))
-        except httpx.HTTPError as e:
-            logger.error(f"检查 Cookie 有效性网络请求失败: {e}")
-            return False
+        verdict, _, _ = await self.check_login(header_string)
+        return bool(verdict)
 
+    @traced("bilibili.get_nav", uid_arg=None)
     async def get_nav(self, header_string: str) -> Optional[Dict[str, Any]]:
         """
         获取导航信息(包含 isLogin、uname 等)。
         成功返回 data 字典；失败返回 None。
         """
-        url = "https://api.bilibili.com/x/web-interface/nav"
-        headers = {
-            "User-Agent": USER_AGENT,
-            "Referer": "https://www.bilibili.com/",
-            "Cookie": header_string,
-        }
         try:
-            rsp = await self._client.get(url, headers=headers, timeout=10.0)
-            data = rsp.json()
+            data = await self._nav(header_string)
             if data.get("code") == 0:
                 return data.get("data", {})
             return None
@@ -138,21 +306,16 @@ class BilibiliClient:
             logger.error(f"获取导航信息失败: {e}")
             return None
 
+    @traced("bilibili.fetch_buvid", uid_arg=None)
     async def fetch_buvid(self, header_string: str) -> Optional[Dict[str, Any]]:
         """
         获取 buvid 信息: 调用 x/frontend/finger/spi 接口, 返回包含 b_3、b_4 字段的字典
         - header_string: Cookie 请求头字符串
         返回: dict 或 None
         """
-        url = "https://api.bilibili.com/x/frontend/finger/spi"
-        headers = {
-            "User-Agent": USER_AGENT,
-            "Referer": "https://www.bilibili.com/",
-            "Cookie": header_string,
-        }
         try:
-            rsp = await self._client.get(url, headers=headers, timeout=10.0)
-            data = rsp.json()
+            key = ("spi", self.cookie_key(header_string))
+            data = await self._single_flight(key, lambda: self._get_json(SPI_URL, header_string))
             if data.get("code") == 0:
                 return data.get("data", {})
             return None
@@ -160,6 +323,7 @@ class BilibiliClient:
             logger.error(f"获取 buvid 失败: {e}")
             return None
 
+    @traced("bilibili.refresh_cookie", uid_arg=None)
     async def refresh_cookie(self, access_key: str, refresh_token: str) -> Dict[str, Any]:
         """
         刷新 Token/Cookie: 对应 passport.bilibili.com 的刷新接口
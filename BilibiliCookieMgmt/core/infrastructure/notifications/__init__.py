@@ -4,6 +4,7 @@ from __future__ import annotations
 通知服务抽象与基础实现: 
 - NotificationService: 抽象接口
 - NoopNotificationService: 空实现(关闭通知时使用)
+- 具体渠道(Gotify / Webhook / Telegram)与多渠道扇出 FanoutNotificationService 按需导入
 """
 
 from typing import Optional
@@ -18,21 +19,44 @@ class NotificationMessage:
 
 
 class NotificationService:
-    async def send(self, title: str, message: str, priority: int = 5) -> None:
-        """发送通知"""
+    async def send(self, title: str, message: str, priority: int = 5, key: Optional[str] = None) -> None:
+        """发送通知; key 为事件键, 启用发件箱时同一事件键只发送一次"""
         raise NotImplementedError
 
 
 class NoopNotificationService(NotificationService):
-    async def send(self, title: str, message: str, priority: int = 5) -> None:
+    async def send(self, title: str, message: str, priority: int = 5, key: Optional[str] = None) -> None:
         return None
 
 
-from .gotify import GotifyNotificationService
+_LAZY = {
+    "NotificationChannel": ".channel",
+    "GotifyNotificationService": ".gotify",
+    "WebhookNotificationService": ".webhook",
+    "TelegramNotificationService": ".telegram",
+    "ChannelWorker": ".fanout",
+    "FanoutNotificationService": ".fanout",
+    "NotificationOutbox": ".outbox",
+}
+
+
+def __getattr__(name: str):
+    # 具体通知实现(及其 httpx 依赖)按需导入, 未启用通知时不加载
+    if name in _LAZY:
+        import importlib
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "NotificationMessage",
     "NotificationService",
     "NoopNotificationService",
+    "NotificationChannel",
     "GotifyNotificationService",
+    "WebhookNotificationService",
+    "TelegramNotificationService",
+    "ChannelWorker",
+    "FanoutNotificationService",
+    "NotificationOutbox",
 ]
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+"""
+通知渠道基类: 
+- deliver 发送一条通知, 失败时抛出异常(供扇出 worker 统计失败)
+- send 调用 deliver 并吞掉异常, 保持 NotificationService 的语义
+- HTTP 客户端在首次发送时创建
+"""
+
+import httpx
+from typing import Optional
+
+from . import NotificationService
+from ...utils.tracing import current_span
+
+
+class NotificationChannel(NotificationService):
+    name = "channel"
+
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.timeout)
+        return self._http
+
+    async def deliver(self, title: str, message: str, priority: int = 5) -> None:
+        raise NotImplementedError
+
+    async def send(self, title: str, message: str, priority: int = 5, key: Optional[str] = None) -> None:
+        try:
+            await self.deliver(title, message, priority)
+        except Exception as e:
+            current_span().record_error(e)
+            return None
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
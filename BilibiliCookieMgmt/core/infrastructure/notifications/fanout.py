@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+"""
+多渠道通知扇出:
+- 每个渠道一个有界队列和一个独立的异步 worker, 某个渠道变慢或不可用时不影响其他渠道
+- send 只负责按优先级路由并入队, 不等待发送; 队列已满时丢弃并计数
+- 每个渠道统计发送数、失败数、丢弃数与发送耗时
+- 配置发件箱(NotificationOutbox)时通知先落盘再入队: 队列满或发送失败的通知留在发件箱中,
+  由后台补发任务按退避重试, 重启后继续发送; 同一事件键只发送一次
+"""
+
+import time, uuid, asyncio, logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from . import NotificationService
+from .channel import NotificationChannel
+from .outbox import NotificationOutbox, OutboxEntry
+from ...utils.tracing import activate, current_span, tracer
+
+
+logger = logging.getLogger(__name__)
+
+# (title, message, priority, 入队时的 span, 发件箱记录; 未启用发件箱时为 None)
+_Item = Tuple[str, str, int, Any, Optional[OutboxEntry]]
+
+
+async def _in_thread(func: Any, *args: Any) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+class ChannelWorker:
+    """单个渠道的队列与发送 worker; 只接收 min_priority <= priority <= max_priority 的通知。"""
+
+    def __init__(self, channel: NotificationChannel, queue_size: int = 100, min_priority: int = 0, max_priority: int = 10):
+        self.channel = channel
+        self.name = channel.name
+        self.min_priority = min_priority
+        self.max_priority = max_priority
+        self.capacity = max(1, int(queue_size))
+        self.outbox: Optional[NotificationOutbox] = None
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        # 发件箱中尚未送达的数量(由补发任务定期更新)与因队列已满延后的次数
+        self.pending = 0
+        self.deferred = 0
+        self.last_error: Optional[str] = None
+        # 已在本地队列或正在发送的发件箱记录 id
+        self.in_flight: Set[int] = set()
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._latency_last = 0.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def accepts(self, priority: int) -> bool:
+        return self.min_priority <= priority <= self.max_priority
+
+    def free_slots(self) -> int:
+        return self.capacity - (self._queue.qsize() if self._queue is not None else 0)
+
+    def offer(self, item: _Item) -> bool:
+        """入队(不等待); 队列已满时返回 False: 没有发件箱记录的通知被丢弃, 有记录的留待补发。"""
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.capacity)
+            self._task = asyncio.create_task(self._run())
+        entry = item[4]
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if entry is not None:
+                self.deferred += 1
+            else:
+                self.dropped += 1
+                logger.warning(f"通知渠道 {self.name} 队列已满({self.capacity}), 丢弃通知: {item[0]}")
+            return False
+        if entry is not None:
+            self.in_flight.add(entry.id)
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            title, message, priority, parent, entry = await self._queue.get()
+            started = time.perf_counter()
+            error: Optional[Exception] = None
+            try:
+                with activate(parent), tracer.span("notification.send", channel=self.name):
+                    await self.channel.deliver(title, message, priority)
+                self.sent += 1
+            except Exception as e:
+                error = e
+                self.failed += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.warning(f"通知渠道 {self.name} 发送失败: {e}")
+            finally:
+                elapsed = time.perf_counter() - started
+                self._latency_total += elapsed
+                self._latency_last = elapsed
+                self._latency_max = max(self._latency_max, elapsed)
+            if entry is not None and self.outbox is not None:
+                try:
+                    if error is None:
+                        await _in_thread(self.outbox.mark_delivered, entry.id)
+                    else:
+                        await _in_thread(self.outbox.mark_failed, entry.id, entry.attempts, self.last_error)
+                except Exception as e:
+                    logger.error(f"更新通知发件箱失败: {e}")
+                self.in_flight.discard(entry.id)
+            self._queue.task_done()
+
+    def metrics(self) -> Dict[str, Any]:
+        attempts = self.sent + self.failed
+        return {
+            "channel": self.name,
+            "route": {"min_priority": self.min_priority, "max_priority": self.max_priority},
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "capacity": self.capacity,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "pending": self.pending,
+            "deferred": self.deferred,
+            "latency_ms": {
+                "avg": round(self._latency_total / attempts * 1000, 3) if attempts else 0.0,
+                "max": round(self._latency_max * 1000, 3),
+                "last": round(self._latency_last * 1000, 3),
+            },
+            "last_error": self.last_error,
+        }
+
+    async def aclose(self, drain_timeout: float = 5.0) -> None:
+        """等待队列发送完毕(最多 drain_timeout 秒), 然后停止 worker 并关闭渠道。"""
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"通知渠道 {self.name} 关闭时仍有 {self._queue.qsize()} 条通知未发送")
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.channel.aclose()
+
+
+class FanoutNotificationService(NotificationService):
+    def __init__(self, workers: List[ChannelWorker], drain_timeout_seconds: float = 5.0,
+                 outbox: Optional[NotificationOutbox] = None, poll_interval_seconds: float = 2.0):
+        self.workers = workers
+        self.drain_timeout_seconds = drain_timeout_seconds
+        self.outbox = outbox
+        self.poll_interval_seconds = max(0.1, float(poll_interval_seconds))
+        self._drainer: Optional[asyncio.Task] = None
+        for worker in workers:
+            worker.outbox = outbox
+
+    def start(self) -> None:
+        """启动发件箱补发任务(重启后发送上次未送达的通知); 未启用发件箱时无操作。"""
+        if self.outbox is not None and self._drainer is None:
+            self._drainer = asyncio.create_task(self._drain_loop())
+
+    async def send(self, title: str, message: str, priority: int = 5, key: Optional[str] = None) -> None:
+        parent = current_span()
+        targets = [worker for worker in self.workers if worker.accepts(priority)]
+        if not targets:
+            return
+        if self.outbox is None:
+            for worker in targets:
+                worker.offer((title, message, priority, parent, None))
+            return
+        self.start()
+        event_key = key or uuid.uuid4().hex
+        try:
+            added = await _in_thread(self.outbox.add, event_key, [w.name for w in targets], title, message, priority)
+        except Exception as e:
+            logger.error(f"写入通知发件箱失败, 直接发送: {e}")
+            for worker in targets:
+                worker.offer((title, message, priority, parent, None))
+            return
+        rejected = []
+        for worker in targets:
+            entry_id = added.get(worker.name)
+            if entry_id is None:
+                continue  # 同一事件已在发件箱中
+            entry = OutboxEntry(entry_id, event_key, worker.name, title, message, priority, 0)
+            if not worker.offer((title, message, priority, parent, entry)):
+                rejected.append(entry_id)
+        if rejected:
+            await _in_thread(self.outbox.release, rejected)
+
+    async def drain_once(self) -> int:
+        """认领各渠道到期的发件箱记录并入队, 返回入队数量。"""
+        queued = 0
+        for worker in self.workers:
+            entries = await _in_thread(self.outbox.claim_due, worker.name, worker.free_slots())
+            rejected = []
+            for entry in entries:
+                if entry.id in worker.in_flight:
+                    continue
+                if worker.offer((entry.title, entry.message, entry.priority, None, entry)):
+                    queued += 1
+                else:
+                    rejected.append(entry.id)
+            if rejected:
+                await _in_thread(self.outbox.release, rejected)
+        await _in_thread(self.outbox.purge)
+        pending = await _in_thread(self.outbox.pending)
+        for worker in self.workers:
+            worker.pending = pending.get(worker.name, 0)
+        return queued
+
+    async def _drain_loop(self) -> None:
+        while True:
+            try:
+                await self.drain_once()
+            except Exception as e:
+                logger.error(f"通知发件箱补发异常: {e}", exc_info=True)
+            await asyncio.sleep(self.poll_interval_seconds)
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        return [worker.metrics() for worker in self.workers]
+
+    async def aclose(self) -> None:
+        if self._drainer is not None:
+            self._drainer.cancel()
+            try:
+                await self._drainer
+            except asyncio.CancelledError:
+                pass
+            self._drainer = None
+        # 未发送完的通知留在发件箱中, 下次启动时补发
+        await asyncio.gather(
+            *(worker.aclose(self.drain_timeout_seconds) for worker in self.workers),
+            return_exceptions=True,
+        )
+        if self.outbox is not None:
+            self.outbox.close()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+"""
+通知发件箱(SQLite, 位于数据目录): 通知先落盘再发送, 保证至少送达一次。
+- 每个 (事件键, 渠道) 一行; 同一事件键重复提交时忽略, 已送达的记录保留 dedupe_seconds 用于去重
+- 发送前按租约认领(claimed_until), 进程崩溃或重启后租约到期即可被重新认领;
+  多个 worker 进程共享同一文件时也不会同时发送同一行
+- 发送失败按指数退避安排下次重试, 超过 max_age_seconds 仍未送达的记录放弃并记录日志
+所有方法均为同步调用, 由调用方放到线程池执行。
+"""
+
+import os
+import time
+import random
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_key TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    title TEXT NOT NULL,
+    message TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claimed_until REAL,
+    delivered_at REAL,
+    last_error TEXT,
+    UNIQUE (event_key, channel)
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (channel, delivered_at, next_attempt_at);
+"""
+
+
+@dataclass
+class OutboxEntry:
+    id: int
+    event_key: str
+    channel: str
+    title: str
+    message: str
+    priority: int
+    attempts: int
+
+
+class NotificationOutbox:
+    def __init__(self, path: str, lease_seconds: float = 60.0, retry_base_seconds: float = 5.0,
+                 retry_max_seconds: float = 600.0, dedupe_seconds: float = 86400.0, max_age_seconds: float = 7 * 86400.0):
+        self.path = path
+        self.lease_seconds = max(1.0, float(lease_seconds))
+        self.retry_base_seconds = max(0.1, float(retry_base_seconds))
+        self.retry_max_seconds = max(self.retry_base_seconds, float(retry_max_seconds))
+        self.dedupe_seconds = max(0.0, float(dedupe_seconds))
+        self.max_age_seconds = max(1.0, float(max_age_seconds))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add(self, event_key: str, channels: Iterable[str], title: str, message: str, priority: int,
+            now: Optional[float] = None) -> Dict[str, int]:
+        """
+        为每个渠道写入一行并直接由本进程认领(随后立即入队发送), 返回 {渠道: 行 id}。
+        该事件键在某渠道已有记录(待发送或去重期内已送达)时, 该渠道不在返回值中。
+        """
+        now = time.time() if now is None else now
+        added: Dict[str, int] = {}
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for channel in channels:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO outbox (event_key, channel, title, message, priority, created_at,"
+                        " next_attempt_at, claimed_until) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (event_key, channel, title, message, int(priority), now, now, now + self.lease_seconds),
+                    )
+                    if cursor.rowcount:
+                        added[channel] = int(cursor.lastrowid)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def claim_due(self, channel: str, limit: int, now: Optional[float] = None) -> List[OutboxEntry]:
+        """认领该渠道到期未送达、且未被(其他进程)持有租约的记录。"""
+        if limit <= 0:
+            return []
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, event_key, channel, title, message, priority, attempts FROM outbox"
+                    " WHERE channel = ? AND delivered_at IS NULL AND next_attempt_at <= ?"
+                    " AND (claimed_until IS NULL OR claimed_until < ?) ORDER BY id LIMIT ?",
+                    (channel, now, now, int(limit)),
+                ).fetchall()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE outbox SET claimed_until = ? WHERE id = ?",
+                        [(now + self.lease_seconds, row[0]) for row in rows],
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [OutboxEntry(*row) for row in rows]
+
+    def release(self, entry_ids: Iterable[int]) -> None:
+        """放弃认领(如本地队列已满), 由下一轮认领重新发送。"""
+        with self._lock:
+            self._conn.executemany("UPDATE outbox SET claimed_until = NULL WHERE id = ?", [(i,) for i in entry_ids])
+
+    def mark_delivered(self, entry_id: int, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET delivered_at = ?, claimed_until = NULL, attempts = attempts + 1 WHERE id = ?",
+                (now, entry_id),
+            )
+
+    def mark_failed(self, entry_id: int, attempts: int, error: str, now: Optional[float] = None) -> float:
+        """记录一次失败并按退避安排重试, 返回下次重试时刻。attempts 为本次之前的失败次数。"""
+        now = time.time() if now is None else now
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** min(attempts, 20)))
+        retry_at = now + delay * random.uniform(0.8, 1.2)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, claimed_until = NULL, last_error = ?"
+                " WHERE id = ?",
+                (retry_at, error[:500], entry_id),
+            )
+        return retry_at
+
+    def purge(self, now: Optional[float] = None) -> Tuple[int, int]:
+        """清理去重期已过的送达记录与超龄未送达的记录, 返回 (清理的送达数, 放弃的未送达数)。"""
+        now = time.time() if now is None else now
+        with self._lock:
+            delivered = self._conn.execute(
+                "DELETE FROM outbox WHERE delivered_at IS NOT NULL AND delivered_at < ?", (now - self.dedupe_seconds,)
+            ).rowcount
+            expired = self._conn.execute(
+                "DELETE FROM outbox WHERE delivered_at IS NULL AND created_at < ?", (now - self.max_age_seconds,)
+            ).rowcount
+        if expired:
+            logger.warning(f"通知发件箱中 {expired} 条通知超过 {self.max_age_seconds:.0f} 秒仍未送达, 已放弃")
+        return delivered, expired
+
+    def pending(self) -> Dict[str, int]:
+        """各渠道未送达的记录数。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT channel, COUNT(*) FROM outbox WHERE delivered_at IS NULL GROUP BY channel"
+            ).fetchall()
+        return {channel: count for channel, count in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
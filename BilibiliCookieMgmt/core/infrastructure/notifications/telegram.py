@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+"""
+Telegram Bot 通知: 调用 <api_url>/sendMessage, api_url 形如 https://api.telegram.org/bot<TOKEN>,
+也可指向兼容 Bot API 的自建服务。
+"""
+
+from .channel import NotificationChannel
+
+
+class TelegramNotificationService(NotificationChannel):
+    name = "telegram"
+
+    def __init__(self, api_url: str, chat_id: str, timeout: float = 10.0):
+        super().__init__(timeout=timeout)
+        self.url = api_url.rstrip("/") + "/sendMessage"
+        self.chat_id = chat_id
+
+    async def deliver(self, title: str, message: str, priority: int = 5) -> None:
+        payload = {
+            "chat_id": self.chat_id,
+            "text": f"{title}\n{message}" if title else message,
+            # 低优先级通知静默推送
+            "disable_notification": int(priority) < 5,
+        }
+        resp = await self._client.post(self.url, json=payload)
+        resp.raise_for_status()
+        body = resp.json()
+        if isinstance(body, dict) and body.get("ok") is False:
+            raise RuntimeError(f"Telegram 返回错误: {body.get('description')}")
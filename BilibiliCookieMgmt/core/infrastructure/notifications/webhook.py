@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+"""
+通用 Webhook 通知: 以 JSON {"title", "message", "priority"} POST 到配置的地址。
+"""
+
+from typing import Dict, Optional
+
+from .channel import NotificationChannel
+
+
+class WebhookNotificationService(NotificationChannel):
+    name = "webhook"
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None, default_title: str = "BilibiliCookieMgmt",
+                 timeout: float = 10.0):
+        super().__init__(timeout=timeout)
+        self.url = url
+        self.headers = headers or {}
+        self.default_title = default_title
+
+    async def deliver(self, title: str, message: str, priority: int = 5) -> None:
+        payload = {"title": title or self.default_title, "message": message, "priority": int(priority)}
+        resp = await self._client.post(self.url, json=payload, headers=self.headers)
+        resp.raise_for_status()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
-from .cookie_repository import CookieRepository, MANAGED_KEY, RAW_KEY
+from .cookie_repository import CookieRepository, LAYOUTS, MANAGED_KEY, RAW_KEY
+from .cookie_watcher import CookieDirWatcher
+from .history_repository import CheckHistoryRepository, EVENT_CHECK, EVENT_REFRESH
 
-__all__ = ["CookieRepository", "MANAGED_KEY", "RAW_KEY"]
+__all__ = ["CookieRepository", "LAYOUTS", "MANAGED_KEY", "RAW_KEY", "CookieDirWatcher", "CheckHistoryRepository", "EVENT_CHECK", "EVENT_REFRESH"]
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+"""
+Cookie 内存索引:
+- 记录每个账号的 status / refresh_status / is_enabled / tags 摘要
+- 随仓库每次写入/删除增量维护各维度计数, 统计查询无需遍历文档
+- 维护每个文档的单调修订号与全局修订号, 用于 ETag / 条件请求
+"""
+
+import os, time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from ...domain.models import CookieStatus, RefreshStatus
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    status: str
+    refresh_status: str
+    is_enabled: bool
+    tags: Tuple[str, ...]
+
+    @classmethod
+    def from_managed(cls, managed: Dict[str, Any]) -> "IndexEntry":
+        tags = managed.get("tags")
+        return cls(
+            status=str(managed.get("status") or CookieStatus.UNKNOWN.value),
+            refresh_status=str(managed.get("refresh_status") or RefreshStatus.NOT_NEEDED.value),
+            is_enabled=bool(managed.get("is_enabled", True)),
+            tags=tuple(dict.fromkeys(tags)) if isinstance(tags, list) else (),
+        )
+
+
+class CookieIndex:
+    """账号摘要与计数器。put/remove 为幂等操作, 只按差量调整计数。"""
+
+    def __init__(self):
+        self._entries: Dict[str, IndexEntry] = {}
+        self._status: Counter = Counter()
+        self._refresh_status: Counter = Counter()
+        self._enabled: Counter = Counter()
+        self._tags: Counter = Counter()
+        self.stats_revision = 0
+        self._revisions: Dict[str, int] = {}
+        self.revision = 0
+        self.ready = False
+        # 进程纪元: 保证重启后的 ETag 不与重启前冲突
+        self.epoch = f"{os.getpid():x}{int(time.time()):x}"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, dede_user_id: str) -> bool:
+        return dede_user_id in self._entries
+
+    def ids(self):
+        return self._entries.keys()
+
+    def entry(self, dede_user_id: str) -> Optional[IndexEntry]:
+        return self._entries.get(dede_user_id)
+
+    def _apply(self, entry: IndexEntry, sign: int) -> None:
+        self._status[entry.status] += sign
+        self._refresh_status[entry.refresh_status] += sign
+        self._enabled[entry.is_enabled] += sign
+        for tag in entry.tags:
+            self._tags[tag] += sign
+            if self._tags[tag] <= 0:
+                del self._tags[tag]
+
+    def put(self, dede_user_id: str, managed: Dict[str, Any], touch: bool = True) -> None:
+        """
+        写入账号摘要。
+        touch=True 表示文档内容已变化, 递增文档与全局修订号; 仅建索引时传 False。
+        """
+        if touch or dede_user_id not in self._revisions:
+            # 文档修订号取自全局修订号: 账号删除后重建也不会复用旧的修订号
+            self.revision += 1
+            self._revisions[dede_user_id] = self.revision
+        entry = IndexEntry.from_managed(managed)
+        old = self._entries.get(dede_user_id)
+        if old == entry:
+            return
+        if old is not None:
+            self._apply(old, -1)
+        self._apply(entry, 1)
+        self._entries[dede_user_id] = entry
+        self.stats_revision += 1
+
+    def remove(self, dede_user_id: str) -> None:
+        if self._revisions.pop(dede_user_id, None) is not None:
+            self.revision += 1
+        old = self._entries.pop(dede_user_id, None)
+        if old is None:
+            return
+        self._apply(old, -1)
+        self.stats_revision += 1
+
+    def doc_revision(self, dede_user_id: str) -> Optional[int]:
+        return self._revisions.get(dede_user_id)
+
+    def doc_etag(self, dede_user_id: str) -> Optional[str]:
+        revision = self._revisions.get(dede_user_id)
+        if revision is None:
+            return None
+        return f'W/"{self.epoch}-{dede_user_id}-{revision}"'
+
+    @property
+    def list_etag(self) -> str:
+        return f'W/"{self.epoch}-{self.revision}"'
+
+    @property
+    def stats_etag(self) -> str:
+        return f'W/"stats-{self.epoch}-{self.stats_revision}"'
+
+    def stats(self) -> Dict[str, Any]:
+        status = {item.value: 0 for item in CookieStatus}
+        status.update({k: v for k, v in self._status.items() if v})
+        refresh_status = {item.value: 0 for item in RefreshStatus}
+        refresh_status.update({k: v for k, v in self._refresh_status.items() if v})
+        return {
+            "total": len(self._entries),
+            "status": status,
+            "refresh_status": refresh_status,
+            "enabled": {"true": self._enabled[True], "false": self._enabled[False]},
+            "tags": dict(self._tags),
+        }
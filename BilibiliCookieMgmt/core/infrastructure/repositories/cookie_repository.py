@@ -8,28 +8,155 @@ from __future__ import annotations
   "managed": { ... 管理信息 ... }
 }
 文件名: <DedeUserID>.json
+目录布局由 layout 决定:
+- flat: <base_dir>/<DedeUserID>.json
+- hashed: <base_dir>/ab/cd/<DedeUserID>.json, ab/cd 取自 md5(DedeUserID) 的前 4 位, 适合十万级以上账号
+两种布局的文件均可被读取, 切换布局后可用 migrate_layout 迁移已有文件。
+落盘编码由 storage_format 决定(pretty / compact / msgpack), 读取时按内容识别, 见 doc_codec。
+开启 write_behind 时, 仅涉及低价值字段(见 HOT_MANAGED_FIELDS)的更新先写入内存, 由 flush 批量落盘。
+冷启动或缓存失效后由 bulk_load 在线程池(或进程池)中并行读取解析全部文件, 一次性建立缓存与索引。
 """
 
-import os, json, aiofiles
-from typing import Any, Dict, List, Optional
+import os, copy, json, time, uuid, asyncio, hashlib, aiofiles, logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
 from ...domain.models import ManagedInfo, CookieStatus, RefreshStatus
+from ...utils.tracing import traced, tracer
+from .cookie_index import CookieIndex
+from .doc_codec import FORMAT_PRETTY, check_format, decode_doc, detect_format, encode_doc
 
 
+logger = logging.getLogger(__name__)
+
 # 统一的键名
 RAW_KEY = "raw"
 MANAGED_KEY = "managed"
 
+# 可延迟落盘的管理字段: 仅这些字段变化时允许合并写入
+HOT_MANAGED_FIELDS = frozenset({"last_check_time", "last_verified_time", "username"})
+
+LAYOUT_FLAT = "flat"
+LAYOUT_HASHED = "hashed"
+LAYOUTS = (LAYOUT_FLAT, LAYOUT_HASHED)
+
+LOAD_THREAD = "thread"
+LOAD_PROCESS = "process"
+LOAD_MODES = (LOAD_THREAD, LOAD_PROCESS)
+# bulk_load 每个任务处理的文件数, 摊薄线程/进程间往返开销
+LOAD_BATCH = 64
+
+
+def temp_path(path: str) -> str:
+    """同目录下的唯一临时文件名(含进程号), 多个进程同时写同一文件时互不覆盖。"""
+    return f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+
+
+def layout_path(base_dir: str, dede_user_id: str, layout: str) -> str:
+    """账号文件在指定布局下的路径(迁移脚本等仓库之外的写入方也使用此函数)。"""
+    if layout == LAYOUT_HASHED:
+        digest = hashlib.md5(dede_user_id.encode("utf-8")).hexdigest()
+        return os.path.join(base_dir, digest[:2], digest[2:4], f"{dede_user_id}.json")
+    return os.path.join(base_dir, f"{dede_user_id}.json")
+
+
+def _is_hash_dir(name: str) -> bool:
+    return len(name) == 2 and all(c in "0123456789abcdef" for c in name)
+
+
+def _load_files(paths: List[str]) -> List[Tuple[str, Optional[Tuple[int, int, int]], Any, Optional[str]]]:
+    """读取并解析一批文件, 返回 [(路径, 文件签名, 文档, 错误)]; 在工作线程/进程中运行。"""
+    results = []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                data = f.read()
+            results.append((path, (stat.st_mtime_ns, stat.st_size, stat.st_ino), decode_doc(data), None))
+        except Exception as e:
+            results.append((path, None, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
 class CookieRepository:
     """文件系统实现的 Cookie 仓库。"""
 
-    def __init__(self, base_dir: str):
+    def __init__(self, base_dir: str, storage_format: str = FORMAT_PRETTY, write_behind: bool = False,
+                 layout: str = LAYOUT_FLAT, load_workers: int = 8, load_mode: str = LOAD_THREAD):
+        if layout not in LAYOUTS:
+            raise ValueError(f"未知的目录布局: {layout}, 可选: {', '.join(LAYOUTS)}")
+        if load_mode not in LOAD_MODES:
+            raise ValueError(f"未知的加载方式: {load_mode}, 可选: {', '.join(LOAD_MODES)}")
         self.base_dir = base_dir
+        self.load_workers = max(1, int(load_workers))
+        self.load_mode = load_mode
+        self.storage_format = check_format(storage_format)
+        self.write_behind = write_behind
+        self.layout = layout
         os.makedirs(self.base_dir, exist_ok=True)
+        self.index = CookieIndex()
+        # 启动预热与首个请求可能同时触发建索引, 只扫描一次
+        self._index_lock = asyncio.Lock()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # 文档缓存: DedeUserID -> (文件签名, 文档); 文件签名不一致时重新读取
+        self._cache: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+        # 待落盘文档: DedeUserID -> (缓冲时的文件签名, 文档)
+        self._dirty: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+        # 已定位的文件路径: DedeUserID -> 路径(布局迁移期间文件可能位于任一布局)
+        self._paths: Dict[str, str] = {}
+        # CookieDirWatcher 运行期间为 True: 外部改写会被同步到索引并递增修订号
+        self.watched = False
+
+    def _lock(self, dede_user_id: str) -> asyncio.Lock:
+        lock = self._locks.get(dede_user_id)
+        if lock is None:
+            lock = self._locks[dede_user_id] = asyncio.Lock()
+        return lock
+
+    def _layout_path(self, dede_user_id: str, layout: str) -> str:
+        return layout_path(self.base_dir, dede_user_id, layout)
 
     def _file_path(self, dede_user_id: str) -> str:
-        return os.path.join(self.base_dir, f"{dede_user_id}.json")
+        """返回文件所在路径: 优先当前布局, 其次另一布局; 均不存在时返回当前布局的路径。"""
+        path = self._paths.get(dede_user_id)
+        if path is not None:
+            return path
+        preferred = self._layout_path(dede_user_id, self.layout)
+        for layout in (self.layout, *(item for item in LAYOUTS if item != self.layout)):
+            path = self._layout_path(dede_user_id, layout)
+            if os.path.exists(path):
+                self._paths[dede_user_id] = path
+                return path
+        return preferred
+
+    def _locate(self, dede_user_id: str) -> Tuple[str, Optional[Tuple[int, int, int]]]:
+        """返回 (路径, 文件签名); 已记录的路径失效(文件被迁移或删除)时重新定位一次。"""
+        path = self._file_path(dede_user_id)
+        signature = self._file_signature(path)
+        if signature is None and self._paths.pop(dede_user_id, None) is not None:
+            path = self._file_path(dede_user_id)
+            signature = self._file_signature(path)
+        return path, signature
+
+    def iter_entries(self) -> Iterator[Tuple[str, os.DirEntry]]:
+        """遍历两种布局下的全部文档文件, 产出 (DedeUserID, DirEntry)。"""
+        if not os.path.isdir(self.base_dir):
+            return
+        with os.scandir(self.base_dir) as top:
+            for entry in top:
+                name = entry.name
+                if name.endswith(".json") and not name.startswith("."):
+                    yield name[:-5], entry
+                elif _is_hash_dir(name) and entry.is_dir(follow_symlinks=False):
+                    with os.scandir(entry.path) as middle:
+                        for sub in middle:
+                            if not _is_hash_dir(sub.name) or not sub.is_dir(follow_symlinks=False):
+                                continue
+                            with os.scandir(sub.path) as leaves:
+                                for leaf in leaves:
+                                    if leaf.name.endswith(".json") and not leaf.name.startswith("."):
+                                        yield leaf.name[:-5], leaf
 
     @staticmethod
     def _validate_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
@@ -70,15 +197,217 @@ class CookieRepository:
             timestamp = stat.st_ctime if os.name == "nt" else stat.st_mtime
         return datetime.fromtimestamp(timestamp)
 
+    @staticmethod
+    def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _cache_doc(self, dede_user_id: str, path: str, doc: Dict[str, Any]) -> None:
+        signature = self._file_signature(path)
+        if signature is None:
+            self._cache.pop(dede_user_id, None)
+        else:
+            self._cache[dede_user_id] = (signature, doc)
+
     async def _persist_doc(self, doc: Dict[str, Any], path: str) -> None:
-        async with aiofiles.open(path, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(doc, ensure_ascii=False, indent=2))
+        """先写同目录临时文件再替换, 其他进程的读取不会读到写了一半的文件。"""
+        if self.layout != LAYOUT_FLAT:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = temp_path(path)
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(encode_doc(doc, self.storage_format))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    async def _read_doc(path: str) -> Any:
+        async with aiofiles.open(path, "rb") as f:
+            return decode_doc(await f.read())
+
+    @traced("repository.save")
+    async def _save_doc(self, dede_user_id: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """写入文档并同步内存索引。"""
+        path = self._file_path(dede_user_id)
+        async with self._lock(dede_user_id):
+            await self._persist_doc(doc, path)
+            self._dirty.pop(dede_user_id, None)
+            self._cache_doc(dede_user_id, path, doc)
+        managed = doc.get(MANAGED_KEY)
+        if isinstance(managed, dict):
+            self.index.put(dede_user_id, managed)
+        return self._validate_doc(doc)
+
+    async def _save_or_buffer(self, dede_user_id: str, old_managed: Dict[str, Any], doc: Dict[str, Any]) -> Dict[str, Any]:
+        """仅 HOT_MANAGED_FIELDS 变化且开启 write_behind 时缓冲写入, 否则立即落盘。"""
+        managed = doc.get(MANAGED_KEY, {})
+        changed = {key for key in set(old_managed) | set(managed) if old_managed.get(key) != managed.get(key)}
+        if not self.write_behind or not changed or not changed <= HOT_MANAGED_FIELDS or doc.get(RAW_KEY) is None:
+            return await self._save_doc(dede_user_id, doc)
+
+        path, signature = self._locate(dede_user_id)
+        if signature is None:
+            return await self._save_doc(dede_user_id, doc)
+        doc = self._validate_doc(doc)
+        # 缓存与待写队列共用缓冲时的文件签名: 读取直接命中缓冲文档; 文件被外部改写后缓冲作废
+        self._cache[dede_user_id] = (signature, doc)
+        self._dirty[dede_user_id] = (signature, doc)
+        self.index.put(dede_user_id, managed)
+        return doc
+
+    @property
+    def pending_writes(self) -> int:
+        return len(self._dirty)
+
+    @traced("repository.flush", uid_arg=None)
+    async def flush(self) -> int:
+        """将缓冲的文档批量落盘, 返回写入数量。文件在缓冲后被外部改写的, 以磁盘为准丢弃缓冲。"""
+        written = 0
+        for dede_user_id in list(self._dirty):
+            async with self._lock(dede_user_id):
+                pending = self._dirty.pop(dede_user_id, None)
+                if pending is None:
+                    continue
+                signature, doc = pending
+                path = self._file_path(dede_user_id)
+                if self._file_signature(path) != signature:
+                    logger.debug(f"缓冲写入已过期(文件被改写或删除), 丢弃: {dede_user_id}")
+                    continue
+                try:
+                    await self._persist_doc(doc, path)
+                except Exception as e:
+                    self._dirty.setdefault(dede_user_id, pending)
+                    logger.warning(f"缓冲写入落盘失败: {dede_user_id}, 错误: {e}")
+                    continue
+                self._cache_doc(dede_user_id, path, doc)
+                written += 1
+        return written
+
+    async def flush_loop(self, interval_seconds: float) -> None:
+        """周期性落盘缓冲写入, 直到任务被取消。"""
+        interval = max(1.0, float(interval_seconds))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                written = await self.flush()
+                if written:
+                    logger.debug(f"缓冲写入已落盘: {written} 个文档")
+            except Exception as e:
+                logger.error(f"缓冲写入落盘异常: {e}", exc_info=True)
+
+    async def ensure_index(self) -> CookieIndex:
+        """首次使用时全量扫描目录建立索引, 之后由写入路径增量维护。"""
+        if self.index.ready:
+            return self.index
+        async with self._index_lock:
+            if not self.index.ready:
+                await self._bulk_load()
+        return self.index
+
+    async def bulk_load(self, on_doc: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        并行读取全部文件, 一次性重建文档缓存、路径缓存与索引; on_doc 对每个有效文档调用一次(供上层同步其他索引)。
+        返回 {"files", "loaded", "failed", "seconds", "files_per_sec"}。
+        """
+        async with self._index_lock:
+            return await self._bulk_load(on_doc)
+
+    def invalidate(self) -> None:
+        """丢弃文档缓存与索引(保留尚未落盘的缓冲), 下次 ensure_index / bulk_load 时重新加载。"""
+        self._cache = {uid: item for uid, item in self._cache.items() if uid in self._dirty}
+        self._paths.clear()
+        self.index.ready = False
+
+    def _make_load_executor(self) -> Executor:
+        if self.load_mode == LOAD_PROCESS and self.load_workers > 1:
+            return ProcessPoolExecutor(max_workers=self.load_workers)
+        return ThreadPoolExecutor(max_workers=self.load_workers, thread_name_prefix="cookie-load")
+
+    async def _bulk_load(self, on_doc: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        paths: Dict[str, str] = {}
+        for dede_user_id, entry in await loop.run_in_executor(None, lambda: list(self.iter_entries())):
+            # 两种布局下都有文件时与 _file_path 一致, 以当前布局为准
+            if dede_user_id not in paths or entry.path == self._layout_path(dede_user_id, self.layout):
+                paths[dede_user_id] = entry.path
+        owners = {path: dede_user_id for dede_user_id, path in paths.items()}
+        items = list(owners)
+        batches = [items[i:i + LOAD_BATCH] for i in range(0, len(items), LOAD_BATCH)]
+
+        seen = set()
+        failed = 0
+        executor = self._make_load_executor()
+        try:
+            # 在途批次数限制为 workers 的两倍, 避免一次性提交全部任务
+            pending = set()
+            queue = iter(batches)
+            limit = self.load_workers * 2
+            while True:
+                for batch in queue:
+                    pending.add(loop.run_in_executor(executor, _load_files, batch))
+                    if len(pending) >= limit:
+                        break
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    for path, signature, doc, error in fut.result():
+                        dede_user_id = owners[path]
+                        if error is None:
+                            try:
+                                if isinstance(doc, dict):
+                                    self._fill_missing_managed_fields(doc, path)
+                                doc = self._validate_doc(doc)
+                            except (ValueError, AttributeError, OSError) as e:
+                                error = str(e)
+                        if error is not None:
+                            failed += 1
+                            logger.warning(f"加载 Cookie 文件失败: {path}, 错误: {error}")
+                            continue
+                        self._paths.setdefault(dede_user_id, path)
+                        if dede_user_id in self._dirty:
+                            # 尚未落盘的缓冲比磁盘内容新
+                            doc = self._dirty[dede_user_id][1]
+                        else:
+                            self._cache[dede_user_id] = (signature, doc)
+                        self.index.put(dede_user_id, doc[MANAGED_KEY], touch=False)
+                        seen.add(dede_user_id)
+                        if on_doc is not None:
+                            on_doc(doc)
+        finally:
+            executor.shutdown(wait=False)
+
+        for dede_user_id in [uid for uid in self.index.ids() if uid not in seen]:
+            self.index.remove(dede_user_id)
+        self.index.ready = True
+        seconds = time.perf_counter() - started
+        result = {
+            "files": len(items),
+            "loaded": len(seen),
+            "failed": failed,
+            "seconds": round(seconds, 3),
+            "files_per_sec": round(len(items) / seconds, 1) if seconds > 0 else 0.0,
+        }
+        logger.info(f"仓库加载完成({self.load_mode} x{self.load_workers}): {result}")
+        return result
+
+    async def stats(self) -> Dict[str, Any]:
+        """按 status / refresh_status / is_enabled / tags 汇总的账号计数。"""
+        index = await self.ensure_index()
+        return index.stats()
 
     async def _get_existing_join_time(self, path: str) -> datetime:
         try:
-            async with aiofiles.open(path, "r", encoding="utf-8") as f:
-                content = await f.read()
-            doc = json.loads(content)
+            doc = await self._read_doc(path)
             managed = doc.get(MANAGED_KEY, {}) if isinstance(doc, dict) else {}
             join_time = managed.get("join_time") if isinstance(managed, dict) else None
             if isinstance(join_time, str) and join_time.strip():
@@ -87,25 +416,24 @@ class CookieRepository:
             pass
         return self._get_file_time(path)
 
-    async def _fill_missing_managed_fields(self, doc: Dict[str, Any], path: str) -> Dict[str, Any]:
+    @classmethod
+    def _fill_missing_managed_fields(cls, doc: Dict[str, Any], path: str) -> bool:
+        """
+        在内存中补齐旧文档缺失的管理字段, 返回是否有改动。
+        不写回磁盘; 持久化由显式的存储升级流程(schema_upgrade)完成。
+        """
         managed = doc.get(MANAGED_KEY)
         if not isinstance(managed, dict):
-            return doc
+            return False
 
         changed = False
         if "tags" not in managed:
             managed["tags"] = []
             changed = True
         if "join_time" not in managed:
-            managed["join_time"] = self._get_file_time(path).isoformat()
+            managed["join_time"] = cls._get_file_time(path).isoformat()
             changed = True
-
-        if not changed:
-            return doc
-
-        doc[MANAGED_KEY] = managed
-        await self._persist_doc(doc, path)
-        return doc
+        return changed
 
     @staticmethod
     def _extract_cookie_map(raw: Dict[str, Any]) -> Dict[str, str]:
@@ -171,61 +499,219 @@ class CookieRepository:
             MANAGED_KEY: managed.to_dict(),
         }
 
-        await self._persist_doc(doc, file_path)
-
-        return self._validate_doc(doc)
+        return await self._save_doc(dede_user_id, doc)
 
     async def get(self, dede_user_id: str) -> Optional[Dict[str, Any]]:
-        path = self._file_path(dede_user_id)
-        if not os.path.exists(path):
+        """
+        读取文档(不写磁盘)。
+        结果按文件签名(mtime/size/inode)缓存, 返回的是共享对象, 调用方不得修改。
+        文件在本进程写入之外被改写或删除时(外部编辑、其他进程, 目录监听尚未处理或未开启),
+        同步更新索引并递增修订号, 使 ETag 与序列化缓存随之失效。
+        """
+        path, signature = self._locate(dede_user_id)
+        if signature is None:
+            self._cache.pop(dede_user_id, None)
+            if self.index.ready:
+                self.index.remove(dede_user_id)
             return None
+        cached = self._cache.get(dede_user_id)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
         try:
-            async with aiofiles.open(path, "r", encoding="utf-8") as f:
-                content = await f.read()
-                doc = json.loads(content)
-                if isinstance(doc, dict):
-                    doc = await self._fill_missing_managed_fields(doc, path)
-                return self._validate_doc(doc)
+            with tracer.span("repository.read", DedeUserID=dede_user_id):
+                doc = await self._read_doc(path)
+            if isinstance(doc, dict):
+                self._fill_missing_managed_fields(doc, path)
+            doc = self._validate_doc(doc)
         except json.JSONDecodeError:
             return None
+        except FileNotFoundError:
+            self._cache.pop(dede_user_id, None)
+            return None
+        self._cache[dede_user_id] = (signature, doc)
+        if self.index.ready:
+            self.index.put(dede_user_id, doc[MANAGED_KEY])
+        return doc
 
+    async def sync_external(self, dede_user_id: str) -> Optional[str]:
+        """
+        应用磁盘上的外部变更(其他进程或人工放入的文件)到缓存与索引。
+        文件签名与缓存一致(即本进程自己的写入)时忽略。
+        返回 "updated" / "removed", 无变化时返回 None。
+        """
+        path, signature = self._locate(dede_user_id)
+        if signature is None:
+            known = dede_user_id in self._cache or dede_user_id in self.index
+            self._cache.pop(dede_user_id, None)
+            self._dirty.pop(dede_user_id, None)
+            self.index.remove(dede_user_id)
+            return "removed" if known else None
+        cached = self._cache.get(dede_user_id)
+        if cached is not None and cached[0] == signature:
+            return None
+        doc = await self.get(dede_user_id)
+        if doc is None:
+            return None
+        # 外部写入优先, 丢弃尚未落盘的缓冲
+        self._dirty.pop(dede_user_id, None)
+        self.index.put(dede_user_id, doc[MANAGED_KEY])
+        return "updated"
+
+    async def _get_for_update(self, dede_user_id: str) -> Optional[Dict[str, Any]]:
+        """读取文档的独立副本, 供写入路径修改。"""
+        doc = await self.get(dede_user_id)
+        return copy.deepcopy(doc) if doc else None
+
+    @traced("repository.list", uid_arg=None)
     async def list(self) -> List[Dict[str, Any]]:
         items: List[Dict[str, Any]] = []
-        if not os.path.isdir(self.base_dir):
-            return items
-        for name in os.listdir(self.base_dir):
-            if not name.endswith(".json"):
+        seen = set()
+        for dede_user_id, entry in self.iter_entries():
+            if dede_user_id in seen:
                 continue
-            dede_user_id = name[:-5]
+            seen.add(dede_user_id)
+            self._paths.setdefault(dede_user_id, entry.path)
             item = await self.get(dede_user_id)
             if item:
                 items.append(item)
         return items
 
-    async def delete(self, dede_user_id: str) -> bool:
-        path = self._file_path(dede_user_id)
-        if os.path.exists(path):
-            os.remove(path)
-            return True
-        return False
+    async def convert_storage(self, target_format: Optional[str] = None, pause_every: int = 100) -> Dict[str, int]:
+        """
+        将已有文件重写为目标格式(默认当前 storage_format), 内容不变。
+        逐个文件加锁处理, 可在服务运行时后台执行; 每处理 pause_every 个文件让出事件循环。
+        经唯一临时文件替换; 转换期间文件被其他进程改写时跳过该文件, 不覆盖对方的写入。
+        """
+        target = check_format(target_format or self.storage_format)
+        result = {"scanned": 0, "converted": 0, "failed": 0}
+        for dede_user_id, entry in list(self.iter_entries()):
+            path = entry.path
+            result["scanned"] += 1
+            try:
+                async with self._lock(dede_user_id):
+                    before = self._file_signature(path)
+                    async with aiofiles.open(path, "rb") as f:
+                        data = await f.read()
+                    if detect_format(data) == target:
+                        continue
+                    doc = decode_doc(data)
+                    tmp_path = temp_path(path)
+                    async with aiofiles.open(tmp_path, "wb") as f:
+                        await f.write(encode_doc(doc, target))
+                    if self._file_signature(path) != before:
+                        os.remove(tmp_path)
+                        logger.debug(f"存储格式转换期间文件被改写, 跳过: {path}")
+                        continue
+                    os.replace(tmp_path, path)
+                    # 内容未变, 同步签名以免缓冲写入被误判为过期
+                    signature = self._file_signature(path)
+                    if dede_user_id in self._dirty and signature is not None:
+                        self._dirty[dede_user_id] = (signature, self._dirty[dede_user_id][1])
+                        self._cache[dede_user_id] = (signature, self._dirty[dede_user_id][1])
+                result["converted"] += 1
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                result["failed"] += 1
+                logger.warning(f"存储格式转换失败: {path}, 错误: {e}")
+            if result["scanned"] % max(1, pause_every) == 0:
+                await asyncio.sleep(0)
+        return result
 
-    async def update_check_status(self, dede_user_id: str, valid: bool, error_message: Optional[str] = None, username: Optional[str] = None, header_string: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        doc = await self.get(dede_user_id)
+    async def migrate_layout(self, target_layout: Optional[str] = None, pause_every: int = 100) -> Dict[str, int]:
+        """
+        将已有文件移动到目标布局(默认当前 layout)。同一文件系统内使用 rename,
+        inode 与 mtime 不变, 因此文档缓存与待落盘缓冲无需失效; 可在服务运行时后台执行。
+        两种布局下同时存在同一账号的文件时(迁移曾中断或人工放入), 保留修改时间较新的一份,
+        较旧的一份重命名为 <文件名>.conflict 备份并记录日志, 不直接删除。
+        """
+        target = target_layout or self.layout
+        if target not in LAYOUTS:
+            raise ValueError(f"未知的目录布局: {target}, 可选: {', '.join(LAYOUTS)}")
+        result = {"scanned": 0, "moved": 0, "conflicts": 0, "failed": 0}
+        for dede_user_id, entry in list(self.iter_entries()):
+            result["scanned"] += 1
+            dst = self._layout_path(dede_user_id, target)
+            if entry.path == dst:
+                continue
+            try:
+                async with self._lock(dede_user_id):
+                    if os.path.exists(dst):
+                        result["conflicts"] += 1
+                        if os.stat(entry.path).st_mtime_ns > os.stat(dst).st_mtime_ns:
+                            os.replace(dst, dst + ".conflict")
+                            os.replace(entry.path, dst)
+                            kept, backup = entry.path, dst + ".conflict"
+                        else:
+                            os.replace(entry.path, entry.path + ".conflict")
+                            kept, backup = dst, entry.path + ".conflict"
+                        logger.warning(
+                            f"目录布局迁移发现重复文件: {dede_user_id}, 保留较新的 {kept}, 较旧的一份已备份为 {backup}"
+                        )
+                    else:
+                        os.makedirs(os.path.dirname(dst), exist_ok=True)
+                        os.replace(entry.path, dst)
+                    self._paths[dede_user_id] = dst
+                result["moved"] += 1
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                result["failed"] += 1
+                logger.warning(f"目录布局迁移失败: {entry.path}, 错误: {e}")
+            if result["scanned"] % max(1, pause_every) == 0:
+                await asyncio.sleep(0)
+        return result
+
+    async def upsert(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """写入外部提供的完整文档(如导入), 经 _validate_doc 校验; 非法文档抛出 ValueError。"""
+        if not isinstance(doc, dict):
+            raise ValueError("Cookie 文档必须是对象")
+        doc = self._validate_doc(doc)
+        dede_user_id = doc[MANAGED_KEY]["DedeUserID"]
+        # DedeUserID 用作文件名, 只接受纯数字
+        if not dede_user_id.isdigit():
+            raise ValueError("Cookie managed.DedeUserID 非法")
+        return await self._save_doc(dede_user_id, doc)
+
+    @traced("repository.delete")
+    async def delete(self, dede_user_id: str) -> bool:
+        """删除账号在两种布局下的文件, 避免残留的另一份在删除后重新出现。"""
+        removed = False
+        for layout in LAYOUTS:
+            try:
+                os.remove(self._layout_path(dede_user_id, layout))
+                removed = True
+            except FileNotFoundError:
+                continue
+        if removed:
+            self._paths.pop(dede_user_id, None)
+            self._dirty.pop(dede_user_id, None)
+            self._cache.pop(dede_user_id, None)
+            self.index.remove(dede_user_id)
+        return removed
+
+    async def update_check_status(self, dede_user_id: str, valid: bool, error_message: Optional[str] = None, username: Optional[str] = None, header_string: Optional[str] = None, verified: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        记录检查结果。verified=True 表示结果来自上游的明确判定(而非请求异常),
+        同时写入 last_verified_time, 供服务层在新鲜期内复用该结果。
+        """
+        doc = await self._get_for_update(dede_user_id)
         if not doc:
             return None
         managed = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
+        old_managed = dict(managed)
+        now = datetime.now().isoformat()
         managed["status"] = CookieStatus.VALID.value if valid else CookieStatus.INVALID.value
-        managed["last_check_time"] = datetime.now().isoformat()
+        managed["last_check_time"] = now
+        if verified:
+            managed["last_verified_time"] = now
         managed["error_message"] = error_message
         if username:
             managed["username"] = username
         if header_string:
             managed["header_string"] = header_string
         doc[MANAGED_KEY] = managed
-        path = self._file_path(dede_user_id)
-        async with aiofiles.open(path, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(doc, ensure_ascii=False, indent=2))
-        return self._validate_doc(doc)
+        return await self._save_or_buffer(dede_user_id, old_managed, doc)
 
     async def update_on_refresh(self, dede_user_id: str, token_info: Dict[str, Any], cookie_info: Dict[str, Any], ts: Optional[int] = None) -> Optional[Dict[str, Any]]:
         """
@@ -234,7 +720,7 @@ class CookieRepository:
         - 依据新的 cookies 重建 header_string
         - 更新管理字段: update_time、last_refresh_time、refresh_status、status、error_message、username
         """
-        doc = await self.get(dede_user_id)
+        doc = await self._get_for_update(dede_user_id)
         if not doc:
             return None
         raw = doc.get(RAW_KEY, {}) if isinstance(doc.get(RAW_KEY), dict) else {}
@@ -255,18 +741,17 @@ class CookieRepository:
         managed["status"] = CookieStatus.VALID.value
         managed["error_message"] = None
         managed["header_string"] = header_str
+        # Cookie 已更换, 之前的判定不再适用
+        managed["last_verified_time"] = None
         managed["username"] = cookie_map.get("DedeUserID")
 
         doc[RAW_KEY] = raw
         doc[MANAGED_KEY] = managed
-        path = self._file_path(dede_user_id)
-        async with aiofiles.open(path, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(doc, ensure_ascii=False, indent=2))
-        return self._validate_doc(doc)
+        return await self._save_doc(dede_user_id, doc)
 
     async def update_refresh_failed(self, dede_user_id: str, error_message: str) -> Optional[Dict[str, Any]]:
         """刷新失败时更新管理信息。"""
-        doc = await self.get(dede_user_id)
+        doc = await self._get_for_update(dede_user_id)
         if not doc:
             return None
         managed = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
@@ -274,17 +759,14 @@ class CookieRepository:
         managed["refresh_status"] = RefreshStatus.FAILED.value
         managed["error_message"] = error_message
         doc[MANAGED_KEY] = managed
-        path = self._file_path(dede_user_id)
-        async with aiofiles.open(path, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(doc, ensure_ascii=False, indent=2))
-        return self._validate_doc(doc)
+        return await self._save_doc(dede_user_id, doc)
 
     async def update_buvid(self, dede_user_id: str, buvid3: Optional[str], buvid4: Optional[str]) -> Optional[Dict[str, Any]]:
         """
         更新原始响应中的 buvid3/buvid4 并重建 header_string。
         buvid3/buvid4 任意为 None 时跳过对应项的更新。
         """
-        doc = await self.get(dede_user_id)
+        doc = await self._get_for_update(dede_user_id)
         if not doc:
             return None
         raw = doc.get(RAW_KEY, {}) if isinstance(doc.get(RAW_KEY), dict) else {}
@@ -326,33 +808,24 @@ class CookieRepository:
         doc[RAW_KEY] = raw
         doc[MANAGED_KEY] = managed
 
-        path = self._file_path(dede_user_id)
-        async with aiofiles.open(path, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(doc, ensure_ascii=False, indent=2))
-        return self._validate_doc(doc)
+        return await self._save_doc(dede_user_id, doc)
 
     async def update_enabled(self, dede_user_id: str, is_enabled: bool) -> Optional[Dict[str, Any]]:
         """更新启用/禁用状态。"""
-        doc = await self.get(dede_user_id)
+        doc = await self._get_for_update(dede_user_id)
         if not doc:
             return None
         managed = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
         managed["is_enabled"] = bool(is_enabled)
         doc[MANAGED_KEY] = managed
-        path = self._file_path(dede_user_id)
-        async with aiofiles.open(path, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(doc, ensure_ascii=False, indent=2))
-        return self._validate_doc(doc)
+        return await self._save_doc(dede_user_id, doc)
 
     async def update_tags(self, dede_user_id: str, tags: List[str]) -> Optional[Dict[str, Any]]:
         """更新账号标签列表。"""
-        doc = await self.get(dede_user_id)
+        doc = await self._get_for_update(dede_user_id)
         if not doc:
             return None
         managed = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
         managed["tags"] = list(tags)
         doc[MANAGED_KEY] = managed
-        path = self._file_path(dede_user_id)
-        async with aiofiles.open(path, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(doc, ensure_ascii=False, indent=2))
-        return self._validate_doc(doc)
+        return await self._save_doc(dede_user_id, doc)
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+"""
+cookie_dir 变更监听: 将其他进程(uvicorn --workers N)或人工放入/删除的文件增量同步到本进程的缓存与索引。
+- 安装 watchfiles 时使用系统文件事件(Linux 下为 inotify)
+- 否则按 poll_interval_seconds 轮询目录(含 hashed 布局的子目录), 比较文件签名
+同一时间窗口内的多次事件合并处理; 本进程自己的写入由仓库按文件签名识别并忽略。
+"""
+
+import os, asyncio, logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from .cookie_repository import CookieRepository
+
+try:
+    import watchfiles
+except ImportError:  # pragma: no cover - 可选依赖
+    watchfiles = None
+
+
+logger = logging.getLogger(__name__)
+
+ChangeListener = Callable[[str, Optional[Dict[str, Any]]], Awaitable[None]]
+
+
+def _uid_from_name(name: str) -> Optional[str]:
+    if name.startswith(".") or not name.endswith(".json"):
+        return None
+    return name[:-5] or None
+
+
+class CookieDirWatcher:
+    """监听 cookie_dir 并调用 CookieRepository.sync_external 同步变更。"""
+
+    def __init__(self, repository: CookieRepository, debounce_ms: int = 200,
+                 poll_interval_seconds: float = 60.0, use_polling: bool = False,
+                 on_change: Optional[ChangeListener] = None):
+        self.repository = repository
+        self.debounce_ms = max(0, int(debounce_ms))
+        self.poll_interval_seconds = max(0.1, float(poll_interval_seconds))
+        self.use_polling = use_polling or watchfiles is None
+        self.on_change = on_change
+        self._snapshot: Optional[Dict[str, Tuple[int, int, int]]] = None
+
+    @property
+    def mode(self) -> str:
+        return "polling" if self.use_polling else "watchfiles"
+
+    async def apply(self, dede_user_ids: Iterable[str]) -> Dict[str, int]:
+        """同步一批发生变化的账号, 返回 {"updated", "removed"} 计数。"""
+        result = {"updated": 0, "removed": 0}
+        for dede_user_id in dede_user_ids:
+            try:
+                change = await self.repository.sync_external(dede_user_id)
+            except Exception as e:
+                logger.warning(f"同步外部变更失败: {dede_user_id}, 错误: {e}")
+                continue
+            if change is None:
+                continue
+            result[change] += 1
+            if self.on_change is not None:
+                doc = await self.repository.get(dede_user_id) if change == "updated" else None
+                try:
+                    await self.on_change(dede_user_id, doc)
+                except Exception as e:
+                    logger.warning(f"外部变更回调异常: {dede_user_id}, 错误: {e}")
+        if result["updated"] or result["removed"]:
+            logger.info(f"已同步 cookie_dir 外部变更: {result}")
+        return result
+
+    def _scan(self) -> Dict[str, Tuple[int, int, int]]:
+        snapshot: Dict[str, Tuple[int, int, int]] = {}
+        try:
+            for dede_user_id, entry in self.repository.iter_entries():
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                snapshot[dede_user_id] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    async def poll_once(self) -> Dict[str, int]:
+        """轮询一次目录; 首次调用仅建立快照。"""
+        loop = asyncio.get_running_loop()
+        current = await loop.run_in_executor(None, self._scan)
+        previous, self._snapshot = self._snapshot, current
+        if previous is None:
+            return {"updated": 0, "removed": 0}
+        changed = [uid for uid in previous.keys() | current.keys() if previous.get(uid) != current.get(uid)]
+        if changed and self.debounce_ms:
+            # 等待写入突发结束后再读取, 避免读到写了一半的文件
+            await asyncio.sleep(self.debounce_ms / 1000)
+        return await self.apply(changed)
+
+    async def _run_polling(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"轮询 cookie_dir 异常: {e}", exc_info=True)
+            await asyncio.sleep(self.poll_interval_seconds)
+
+    async def _run_watchfiles(self) -> None:
+        def watch_filter(_change: Any, path: str) -> bool:
+            return _uid_from_name(os.path.basename(path)) is not None
+
+        async for changes in watchfiles.awatch(self.repository.base_dir, watch_filter=watch_filter,
+                                               debounce=self.debounce_ms or 1, recursive=True):
+            dede_user_ids = {_uid_from_name(os.path.basename(path)) for _, path in changes}
+            await self.apply(uid for uid in dede_user_ids if uid)
+
+    async def run(self) -> None:
+        """持续监听, 直到任务被取消。"""
+        logger.info(f"开始监听 cookie_dir 变更({self.mode}): {self.repository.base_dir}")
+        if watchfiles is None:
+            logger.warning(
+                f"未安装 watchfiles, 每 {self.poll_interval_seconds:g}s 全量扫描一次 cookie_dir; 账号较多时建议安装 watchfiles"
+            )
+        self.repository.watched = True
+        try:
+            if self.use_polling:
+                await self._run_polling()
+            else:
+                await self._run_watchfiles()
+        finally:
+            self.repository.watched = False
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+"""
+Cookie 文档编解码。
+支持三种落盘格式:
+- pretty: 缩进 JSON(默认, 便于人工查看)
+- compact: 无空白 JSON
+- msgpack: MessagePack 二进制(需安装 msgpack)
+读取时按文件内容自动识别格式, 与写入格式设置无关。
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 可选依赖
+    msgpack = None
+
+
+FORMAT_PRETTY = "pretty"
+FORMAT_COMPACT = "compact"
+FORMAT_MSGPACK = "msgpack"
+FORMATS = (FORMAT_PRETTY, FORMAT_COMPACT, FORMAT_MSGPACK)
+
+_JSON_LEADING = (b"{", b"[")
+
+
+def check_format(fmt: str) -> str:
+    if fmt not in FORMATS:
+        raise ValueError(f"未知的存储格式: {fmt}, 可选: {', '.join(FORMATS)}")
+    if fmt == FORMAT_MSGPACK and msgpack is None:
+        raise ValueError("存储格式 msgpack 需要安装 msgpack")
+    return fmt
+
+
+def detect_format(data: bytes) -> str:
+    """根据内容识别格式: JSON 以 { 或 [ 开头(允许前导空白/BOM), 否则视为 msgpack。"""
+    head = data[:64].lstrip(b"\xef\xbb\xbf \t\r\n")
+    if head[:1] in _JSON_LEADING:
+        return FORMAT_PRETTY if b"\n" in head else FORMAT_COMPACT
+    return FORMAT_MSGPACK
+
+
+def encode_doc(doc: Any, fmt: str) -> bytes:
+    if fmt == FORMAT_MSGPACK:
+        return msgpack.packb(doc, use_bin_type=True)
+    if fmt == FORMAT_COMPACT:
+        if orjson is not None:
+            return orjson.dumps(doc)
+        return json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(doc, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def decode_doc(data: bytes) -> Any:
+    """解码任意格式的文档; JSON 解析失败时抛出 json.JSONDecodeError。"""
+    if detect_format(data) == FORMAT_MSGPACK:
+        if msgpack is None:
+            raise json.JSONDecodeError("文件为 msgpack 格式, 但未安装 msgpack", "", 0)
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except Exception as e:
+            raise json.JSONDecodeError(f"msgpack 解码失败: {e}", "", 0)
+    if data.startswith(b"\xef\xbb\xbf"):
+        data = data[3:]
+    if orjson is not None:
+        # orjson.JSONDecodeError 是 json.JSONDecodeError 的子类
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
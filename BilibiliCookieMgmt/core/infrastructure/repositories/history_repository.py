@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+"""
+检查/刷新历史存储。
+每个账号一个仅追加的二进制文件: <history_dir>/<DedeUserID>.bin
+每条记录定长 18 字节(小端):
+  时间戳 float64 | 事件类型 uint8 | 是否成功 uint8 | 耗时(ms) float32 | 上游返回码 int32
+文件记录数超过 2 倍容量时压缩为最近 capacity 条, 因此磁盘占用与内存占用都有上界。
+"""
+
+import os, struct, asyncio, aiofiles
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+RECORD = struct.Struct("<dBBfi")
+
+EVENT_CHECK = 1
+EVENT_REFRESH = 2
+EVENT_NAMES = {EVENT_CHECK: "check", EVENT_REFRESH: "refresh"}
+
+
+class CheckHistoryRepository:
+    """按账号保存最近 capacity 条检查/刷新事件的环形历史。"""
+
+    def __init__(self, base_dir: str, capacity: int = 256):
+        self.base_dir = base_dir
+        self.capacity = max(1, int(capacity))
+        os.makedirs(self.base_dir, exist_ok=True)
+        # 仅保存每个账号文件中的记录数, 用于判断何时压缩
+        self._counts: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _file_path(self, dede_user_id: str) -> str:
+        return os.path.join(self.base_dir, f"{dede_user_id}.bin")
+
+    def _lock(self, dede_user_id: str) -> asyncio.Lock:
+        lock = self._locks.get(dede_user_id)
+        if lock is None:
+            lock = self._locks[dede_user_id] = asyncio.Lock()
+        return lock
+
+    def _count_on_disk(self, path: str) -> int:
+        try:
+            return os.path.getsize(path) // RECORD.size
+        except OSError:
+            return 0
+
+    async def append(self, dede_user_id: str, kind: int, ok: bool, latency_ms: float = 0.0, code: Optional[int] = None, ts: Optional[float] = None) -> None:
+        """追加一条事件; code 缺失时记为 0(成功)或 -1(失败)。"""
+        if code is None:
+            code = 0 if ok else -1
+        record = RECORD.pack(
+            ts if ts is not None else datetime.now().timestamp(),
+            int(kind),
+            1 if ok else 0,
+            float(latency_ms),
+            int(code),
+        )
+        path = self._file_path(dede_user_id)
+        async with self._lock(dede_user_id):
+            count = self._counts.get(dede_user_id)
+            if count is None:
+                count = self._count_on_disk(path)
+            async with aiofiles.open(path, "ab") as f:
+                await f.write(record)
+            count += 1
+            if count >= self.capacity * 2:
+                count = await self._compact(path)
+            self._counts[dede_user_id] = count
+
+    async def _compact(self, path: str) -> int:
+        """只保留最近 capacity 条记录, 通过临时文件原子替换。"""
+        keep = self.capacity * RECORD.size
+        async with aiofiles.open(path, "rb") as f:
+            size = os.path.getsize(path)
+            usable = size - size % RECORD.size
+            await f.seek(max(0, usable - keep))
+            data = await f.read(min(keep, usable))
+        tmp_path = path + ".tmp"
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(data)
+        os.replace(tmp_path, path)
+        return len(data) // RECORD.size
+
+    async def read(self, dede_user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """读取最近的事件(新到旧), 只读取文件尾部所需的字节。"""
+        path = self._file_path(dede_user_id)
+        if not os.path.exists(path):
+            return []
+        limit = self.capacity if limit is None else max(0, min(int(limit), self.capacity))
+        if limit == 0:
+            return []
+        async with self._lock(dede_user_id):
+            size = os.path.getsize(path)
+            usable = size - size % RECORD.size
+            want = min(usable, limit * RECORD.size)
+            async with aiofiles.open(path, "rb") as f:
+                await f.seek(usable - want)
+                data = await f.read(want)
+
+        events: List[Dict[str, Any]] = []
+        for ts, kind, ok, latency_ms, code in RECORD.iter_unpack(data):
+            events.append({
+                "time": datetime.fromtimestamp(ts).isoformat(),
+                "event": EVENT_NAMES.get(kind, "unknown"),
+                "ok": bool(ok),
+                "latency_ms": round(latency_ms, 3),
+                "code": code,
+            })
+        events.reverse()
+        return events
+
+    async def delete(self, dede_user_id: str) -> None:
+        path = self._file_path(dede_user_id)
+        async with self._lock(dede_user_id):
+            if os.path.exists(path):
+                os.remove(path)
+            self._counts.pop(dede_user_id, None)
+        self._locks.pop(dede_user_id, None)
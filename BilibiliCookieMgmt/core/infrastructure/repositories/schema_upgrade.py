@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+"""
+存储升级: 一次性补齐旧文档缺失的管理字段(tags、join_time)并写回磁盘。
+- 多线程并行处理文件
+- 可续跑: 已处理的 DedeUserID 追加记录到进度文件, 中断后重跑会跳过
+- 完成后在 cookie_dir 写入 .schema_version 记录当前版本, 之后启动直接跳过
+- 写回使用带进程号的唯一临时文件再 os.replace, 多个进程同时升级也不会写出残缺文档
+  (开启选主时只由 leader 执行, 见 main.py)
+升级完成后仓库的读取路径不再产生任何写入。
+"""
+
+import os, json, time, asyncio, logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Set
+
+from .cookie_repository import CookieRepository, temp_path
+from .doc_codec import decode_doc, detect_format, encode_doc
+
+
+logger = logging.getLogger(__name__)
+
+# 1: managed 段包含 tags 与 join_time
+SCHEMA_VERSION = 1
+SCHEMA_FILENAME = ".schema_version"
+PROGRESS_FILENAME = ".schema_upgrade.progress"
+
+
+def read_schema_version(base_dir: str) -> int:
+    path = os.path.join(base_dir, SCHEMA_FILENAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(json.load(f).get("version", 0))
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _write_schema_version(base_dir: str, version: int) -> None:
+    path = os.path.join(base_dir, SCHEMA_FILENAME)
+    tmp_path = temp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "upgraded_at": datetime.now().isoformat()}, f)
+    os.replace(tmp_path, path)
+
+
+def _load_progress(path: str) -> Set[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+    except OSError:
+        return set()
+
+
+def _upgrade_file(path: str) -> bool:
+    """升级单个文件, 返回是否写回。写回时保留文件原有格式。"""
+    with open(path, "rb") as f:
+        data = f.read()
+    doc = decode_doc(data)
+    if not isinstance(doc, dict) or not CookieRepository._fill_missing_managed_fields(doc, path):
+        return False
+    tmp_path = temp_path(path)
+    with open(tmp_path, "wb") as f:
+        f.write(encode_doc(doc, detect_format(data)))
+    os.replace(tmp_path, path)
+    return True
+
+
+async def upgrade_storage(repository: CookieRepository, workers: int = 4, force: bool = False) -> Dict[str, Any]:
+    """
+    执行存储升级。已记录为当前版本且未指定 force 时直接返回。
+    返回摘要: {"version", "skipped", "scanned", "upgraded", "failed", "seconds"}
+    """
+    base_dir = repository.base_dir
+    current = read_schema_version(base_dir)
+    if current >= SCHEMA_VERSION and not force:
+        return {"version": current, "skipped": True, "scanned": 0, "upgraded": 0, "failed": 0, "seconds": 0.0}
+
+    started = time.perf_counter()
+    progress_path = os.path.join(base_dir, PROGRESS_FILENAME)
+    done = set() if force else _load_progress(progress_path)
+    pending = iter([
+        (dede_user_id, entry.path) for dede_user_id, entry in repository.iter_entries()
+        if dede_user_id not in done
+    ])
+
+    loop = asyncio.get_running_loop()
+    workers = max(1, int(workers))
+    result = {"scanned": 0, "upgraded": 0, "failed": 0}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="schema-upgrade") as executor, \
+            open(progress_path, "a", encoding="utf-8") as progress:
+
+        async def worker() -> None:
+            for dede_user_id, path in pending:
+                # 与仓库写入共用账号锁, 避免覆盖并发写入
+                async with repository._lock(dede_user_id):
+                    try:
+                        changed = await loop.run_in_executor(executor, _upgrade_file, path)
+                    except FileNotFoundError:
+                        changed = False
+                    except Exception as e:
+                        result["failed"] += 1
+                        logger.warning(f"存储升级失败: {dede_user_id}, 错误: {e}")
+                        continue
+                result["scanned"] += 1
+                if changed:
+                    result["upgraded"] += 1
+                progress.write(dede_user_id + "\n")
+                if result["scanned"] % 100 == 0:
+                    progress.flush()
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    if result["failed"] == 0:
+        _write_schema_version(base_dir, SCHEMA_VERSION)
+        try:
+            os.remove(progress_path)
+        except OSError:
+            pass
+
+    seconds = time.perf_counter() - started
+    summary = {"version": read_schema_version(base_dir), "skipped": False, **result, "seconds": round(seconds, 3)}
+    logger.info(f"存储升级完成: {summary}")
+    return summary
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 """
-调度器包: 包含后台周期任务(健康检查、刷新占位)。
+调度器包: 包含后台周期任务(健康检查、刷新占位)、多 worker 选主与多实例分片。
 """
 
+from .leader import LeaderElection
+from .sharding import HashRing, ShardMembership
 from .tasks import AppScheduler
 
-__all__ = ["AppScheduler"]
+__all__ = ["AppScheduler", "LeaderElection", "HashRing", "ShardMembership"]
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+"""
+调度器选主: 多个 worker(uvicorn --workers N)共享数据目录时, 只有持有租约的进程运行后台任务。
+- 租约文件记录持有者与心跳时间, 持有者每 heartbeat_seconds 续约
+- 心跳超过 lease_seconds 未更新视为失效, 备用进程在下一次尝试时接管
+- 读改写租约时持有同目录下 .lock 文件的进程间文件锁, 保证同一时刻只有一个进程判定成功
+API 服务不受影响, 所有 worker 均可处理请求。
+"""
+
+import os, json, time, uuid, socket, asyncio, logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+
+logger = logging.getLogger(__name__)
+
+Callback = Callable[[], Awaitable[None]]
+
+
+class _FileMutex:
+    """基于 flock / msvcrt.locking 的进程间互斥, 仅在读改写租约期间短暂持有。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> "_FileMutex":
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        else:  # pragma: no cover - Windows
+            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:  # pragma: no cover - Windows
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class LeaderElection:
+    """基于租约文件的选主。"""
+
+    def __init__(self, lease_path: str, lease_seconds: float = 15, heartbeat_seconds: float = 5):
+        self.lease_path = lease_path
+        self.lease_seconds = max(1.0, float(lease_seconds))
+        # 心跳间隔必须小于租约时长, 否则持有者会在续约前失去租约
+        self.heartbeat_seconds = min(max(0.1, float(heartbeat_seconds)), self.lease_seconds / 2)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        directory = os.path.dirname(os.path.abspath(lease_path))
+        os.makedirs(directory, exist_ok=True)
+        self._mutex = _FileMutex(lease_path + ".lock")
+
+    def _read_lease(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.lease_path, "r", encoding="utf-8") as f:
+                lease = json.load(f)
+            return lease if isinstance(lease, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def _write_lease(self, acquired_at: float, now: float) -> None:
+        tmp_path = f"{self.lease_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"owner": self.owner, "acquired_at": acquired_at, "heartbeat": now}, f)
+        os.replace(tmp_path, self.lease_path)
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """返回当前租约(可能已过期)。"""
+        return self._read_lease()
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        """获取或续约租约, 返回本进程是否为 leader。"""
+        now = time.time() if now is None else now
+        with self._mutex:
+            lease = self._read_lease()
+            owner = lease.get("owner") if lease else None
+            heartbeat = float(lease.get("heartbeat", 0)) if lease else 0.0
+            if owner == self.owner:
+                self._write_lease(float(lease.get("acquired_at", now)), now)
+                return True
+            if owner is None or now - heartbeat > self.lease_seconds:
+                if owner is not None:
+                    logger.warning(f"调度器 leader 心跳超时, 接管租约: {owner} -> {self.owner}")
+                self._write_lease(now, now)
+                return True
+            return False
+
+    def release(self) -> None:
+        """主动释放租约, 备用进程无需等待超时即可接管。"""
+        with self._mutex:
+            lease = self._read_lease()
+            if lease and lease.get("owner") == self.owner:
+                try:
+                    os.remove(self.lease_path)
+                except OSError:
+                    pass
+        self.is_leader = False
+
+    async def run(self, on_elected: Callback, on_demoted: Callback) -> None:
+        """持续参与选主, 在成为/失去 leader 时调用回调, 直到任务被取消。"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                leader = await loop.run_in_executor(None, self.try_acquire)
+            except Exception as e:
+                logger.error(f"调度器选主异常: {e}", exc_info=True)
+                leader = False
+            if leader and not self.is_leader:
+                self.is_leader = True
+                logger.info(f"本进程成为调度器 leader: {self.owner}")
+                await on_elected()
+            elif not leader and self.is_leader:
+                self.is_leader = False
+                logger.warning(f"本进程失去调度器 leader 身份: {self.owner}")
+                await on_demoted()
+            await asyncio.sleep(self.heartbeat_seconds)
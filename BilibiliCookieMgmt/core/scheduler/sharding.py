@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+"""
+多实例分片调度: 每个实例按一致性哈希负责一部分 DedeUserID。
+- 成员信息保存在共享数据目录下的 members_dir, 每个实例一个文件, 定期写入心跳与积压
+- 心跳超过 member_ttl_seconds 的成员视为离开; 成员变化后哈希环自动重建
+- 一致性哈希保证成员增减时只有约 1/N 的账号改变归属
+"""
+
+import os, json, time, uuid, socket, bisect, hashlib, asyncio, logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """带虚拟节点的一致性哈希环。"""
+
+    def __init__(self, members: Iterable[str] = (), vnodes: int = 64):
+        self.vnodes = max(1, int(vnodes))
+        self.members: Tuple[str, ...] = tuple(sorted(set(members)))
+        points: List[Tuple[int, str]] = sorted(
+            (_hash(f"{member}#{i}"), member) for member in self.members for i in range(self.vnodes)
+        )
+        self._keys = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[index]
+
+
+class ShardMembership:
+    """基于共享目录的分片成员管理。"""
+
+    def __init__(self, members_dir: str, heartbeat_seconds: float = 5, member_ttl_seconds: float = 15,
+                 vnodes: int = 64, member_id: Optional[str] = None):
+        self.members_dir = members_dir
+        self.member_ttl_seconds = max(1.0, float(member_ttl_seconds))
+        self.heartbeat_seconds = min(max(0.1, float(heartbeat_seconds)), self.member_ttl_seconds / 2)
+        self.vnodes = vnodes
+        self.member_id = member_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # 由调度器更新: {"owned", "check", "refresh"}
+        self.backlog: Dict[str, int] = {"owned": 0, "check": 0, "refresh": 0}
+        self.ring = HashRing([self.member_id], vnodes)
+        self._members: Dict[str, Dict[str, Any]] = {}
+        os.makedirs(self.members_dir, exist_ok=True)
+
+    def _member_path(self, member_id: str) -> str:
+        return os.path.join(self.members_dir, f"{member_id}.json")
+
+    def _write_member(self, now: float) -> None:
+        path = self._member_path(self.member_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"member": self.member_id, "heartbeat": now, "backlog": self.backlog}, f)
+        os.replace(tmp_path, path)
+
+    def _read_members(self, now: float) -> Dict[str, Dict[str, Any]]:
+        members: Dict[str, Dict[str, Any]] = {}
+        for name in os.listdir(self.members_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.members_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    info = json.load(f)
+                heartbeat = float(info.get("heartbeat", 0))
+            except (OSError, ValueError, AttributeError):
+                continue
+            age = now - heartbeat
+            if age <= self.member_ttl_seconds:
+                members[str(info.get("member") or name[:-5])] = info
+            elif age > self.member_ttl_seconds * 10:
+                # 长期失联成员的文件直接清理
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return members
+
+    def heartbeat(self, now: Optional[float] = None) -> bool:
+        """写入本实例心跳并刷新成员列表, 返回哈希环是否发生变化。"""
+        now = time.time() if now is None else now
+        self._write_member(now)
+        members = self._read_members(now)
+        members.setdefault(self.member_id, {"member": self.member_id, "heartbeat": now, "backlog": self.backlog})
+        self._members = members
+        if set(members) == set(self.ring.members):
+            return False
+        previous = self.ring.members
+        self.ring = HashRing(members, self.vnodes)
+        logger.info(f"分片成员变化, 重新平衡: {len(previous)} -> {len(self.ring.members)} 个实例")
+        return True
+
+    def owns(self, dede_user_id: str) -> bool:
+        return self.ring.owner(dede_user_id) == self.member_id
+
+    def shards(self) -> List[Dict[str, Any]]:
+        """当前存活成员及其上报的积压。"""
+        now = time.time()
+        return [
+            {
+                "member": member_id,
+                "self": member_id == self.member_id,
+                "heartbeat_age_seconds": round(now - float(info.get("heartbeat", now)), 3),
+                "backlog": info.get("backlog", {}),
+            }
+            for member_id, info in sorted(self._members.items())
+        ]
+
+    def leave(self) -> None:
+        """退出集群, 其余实例在下一次心跳时接管本实例的分片。"""
+        try:
+            os.remove(self._member_path(self.member_id))
+        except OSError:
+            pass
+
+    async def run(self) -> None:
+        """周期性心跳, 直到任务被取消。"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await loop.run_in_executor(None, self.heartbeat)
+            except Exception as e:
+                logger.error(f"分片心跳异常: {e}", exc_info=True)
@@ -4,47 +4,70 @@ from __future__ import annotations
 后台调度任务: 
 - 根据配置周期性执行 Cookie 健康检查与刷新
 - 支持应用启动/停止的安全启停
+- 配置分片时只处理本实例负责的账号, 并上报积压
+- 配置热重载时按新的开关与间隔调整循环, 不打断正在执行的检查/刷新
 """
 
 import asyncio
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from fastapi import FastAPI
 
 from ..services.cookie_service import CookieService
 from ..infrastructure.repositories.cookie_repository import MANAGED_KEY
 from ..config.loader import AppConfig
+from .sharding import ShardMembership
 
 
 logger = logging.getLogger(__name__)
 
 
 class AppScheduler:
-    def __init__(self, service: CookieService, config: AppConfig):
+    def __init__(self, service: CookieService, config: AppConfig, shard: Optional[ShardMembership] = None):
         self.service = service
         self.config = config
-        self._tasks: List[asyncio.Task] = []
+        self.shard = shard
+        # 循环名 -> 任务; 循环名为 "check" / "refresh"
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {"check": asyncio.Event(), "refresh": asyncio.Event()}
         self._stopping = asyncio.Event()
+        self._running = False
 
     async def start(self, app: FastAPI) -> None:
         """根据配置启动后台任务。"""
         self._stopping.clear()
-        if self.config.scheduler.cookie_check.enable:
-            logger.info("启动 Cookie 检查任务")
-            t = asyncio.create_task(self._loop_cookie_check())
-            self._tasks.append(t)
-        if self.config.scheduler.cookie_refresh.enable:
-            logger.info("启动 Cookie 刷新任务")
-            t = asyncio.create_task(self._loop_cookie_refresh())
-            self._tasks.append(t)
+        self._running = True
+        self._sync_loops()
         app.state.scheduler = self
 
+    def _sync_loops(self) -> None:
+        """为已启用且未在运行的循环创建任务; 已关闭的循环在下次醒来时自行退出。"""
+        loops = (
+            ("check", "启动 Cookie 检查任务", self._loop_cookie_check),
+            ("refresh", "启动 Cookie 刷新任务", self._loop_cookie_refresh),
+        )
+        for name, message, factory in loops:
+            task = self._tasks.get(name)
+            if self._interval(name) is not None and (task is None or task.done()):
+                logger.info(message)
+                self._tasks[name] = asyncio.create_task(factory())
+
+    async def reconfigure(self, config: AppConfig) -> None:
+        """热重载: 换用新配置。运行中时立即按新开关启停循环, 间隔变化从上一轮开始时刻重新计算。"""
+        self.config = config
+        if not self._running:
+            return  # 未运行(如非 leader)时下次 start 使用新配置
+        for event in self._wakeups.values():
+            event.set()
+        self._sync_loops()
+
     async def stop(self) -> None:
         """请求停止并取消所有任务。"""
         logger.info("停止所有调度任务...")
+        self._running = False
         self._stopping.set()
-        for t in self._tasks:
+        for t in self._tasks.values():
             t.cancel()
             try:
                 await t
@@ -53,36 +76,95 @@ class AppScheduler:
         self._tasks.clear()
         logger.info("调度任务已停止")
 
+    def _interval(self, name: str) -> Optional[int]:
+        """循环当前的间隔(秒); 循环已关闭或调度器正在停止时为 None。"""
+        if self._stopping.is_set():
+            return None
+        if name == "check":
+            item = self.config.scheduler.cookie_check
+            return max(1, int(item.interval_seconds)) if item.enable else None
+        item = self.config.scheduler.cookie_refresh
+        return max(60, int(item.interval_seconds)) if item.enable else None
+
+    async def _sleep(self, name: str, started: float) -> None:
+        """等待到 started + 间隔; 期间配置变化时按新间隔重新计算剩余时间。"""
+        loop = asyncio.get_running_loop()
+        wakeup = self._wakeups[name]
+        while True:
+            interval = self._interval(name)
+            if interval is None:
+                return
+            remaining = started + interval - loop.time()
+            if remaining <= 0:
+                return
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    def _owned_ids(self, items: List[dict]) -> List[str]:
+        """返回本实例负责的 DedeUserID; 未启用分片时为全部。"""
+        ids = []
+        for doc in items:
+            info = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
+            dede_user_id = info.get("DedeUserID")
+            if dede_user_id and (self.shard is None or self.shard.owns(dede_user_id)):
+                ids.append(dede_user_id)
+        if self.shard is not None:
+            self.shard.backlog["owned"] = len(ids)
+        return ids
+
+    def _still_owned(self, dede_user_id: str) -> bool:
+        # 本轮执行期间可能发生重新平衡, 逐个确认归属避免与新负责实例重复处理
+        return self.shard is None or self.shard.owns(dede_user_id)
+
+    def _report_backlog(self, kind: str, remaining: int) -> None:
+        if self.shard is not None:
+            self.shard.backlog[kind] = remaining
+
     async def _loop_cookie_check(self) -> None:
-        interval = max(1, int(self.config.scheduler.cookie_check.interval_seconds))
-        logger.info(f"Cookie 检查循环已启动, 间隔: {interval}秒")
-        while not self._stopping.is_set():
+        loop = asyncio.get_running_loop()
+        logger.info(f"Cookie 检查循环已启动, 间隔: {self._interval('check')}秒")
+        while self._interval("check") is not None:
+            started = loop.time()
             try:
                 # 遍历所有 cookie 执行检查
                 items = await self.service.list_cookies()
-                if items:
-                    logger.debug(f"开始检查 {len(items)} 个 Cookie")
-                for doc in items:
-                    info = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
-                    dede_user_id = info.get("DedeUserID")
-                    if dede_user_id:
-                        await self.service.check_cookie(dede_user_id)
+                owned = self._owned_ids(items)
+                if owned:
+                    logger.debug(f"开始检查 {len(owned)} 个 Cookie")
+                for done, dede_user_id in enumerate(owned):
+                    self._report_backlog("check", len(owned) - done)
+                    if not self._still_owned(dede_user_id):
+                        continue
+                    await self.service.check_cookie(dede_user_id)
+                self._report_backlog("check", 0)
             except Exception as e:
                 logger.error(f"Cookie 检查循环异常: {e}", exc_info=True)
-            await asyncio.sleep(interval)
+            await self._sleep("check", started)
+        logger.info("Cookie 检查循环已停止")
 
     async def _loop_cookie_refresh(self) -> None:
-        interval = max(60, int(self.config.scheduler.cookie_refresh.interval_seconds))
-        logger.info(f"Cookie 刷新循环已启动, 间隔: {interval}秒")
-        while not self._stopping.is_set():
+        loop = asyncio.get_running_loop()
+        logger.info(f"Cookie 刷新循环已启动, 间隔: {self._interval('refresh')}秒")
+        while True:
+            interval = self._interval("refresh")
+            if interval is None:
+                break
+            started = loop.time()
             try:
                 # 基于上次刷新时间与配置间隔执行刷新
                 items = await self.service.list_cookies()
                 from datetime import datetime, timedelta
                 threshold = timedelta(seconds=interval)
+                owned = set(self._owned_ids(items))
+                due = []
                 for doc in items:
                     info = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
                     dede_user_id = info.get("DedeUserID")
+                    if dede_user_id not in owned:
+                        continue
                     last_refresh_iso = info.get("last_refresh_time")
                     try:
                         last_refresh = datetime.fromisoformat(last_refresh_iso) if last_refresh_iso else None
@@ -93,9 +175,16 @@ class AppScheduler:
                         need_refresh = True
                     else:
                         need_refresh = (datetime.now() - last_refresh) >= threshold
-                    if dede_user_id and need_refresh:
-                        logger.info(f"触发自动刷新: {dede_user_id}")
-                        await self.service.refresh_cookie(dede_user_id)
+                    if need_refresh:
+                        due.append(dede_user_id)
+                for done, dede_user_id in enumerate(due):
+                    self._report_backlog("refresh", len(due) - done)
+                    if not self._still_owned(dede_user_id):
+                        continue
+                    logger.info(f"触发自动刷新: {dede_user_id}")
+                    await self.service.refresh_cookie(dede_user_id)
+                self._report_backlog("refresh", 0)
             except Exception as e:
                 logger.error(f"Cookie 刷新循环异常: {e}", exc_info=True)
-            await asyncio.sleep(interval)
\ No newline at end of file
+            await self._sleep("refresh", started)
+        logger.info("Cookie 刷新循环已停止")
\ No newline at end of file
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+"""
+账号健康度:
+- 根据最近的检查/刷新结果维护滚动健康分(指数加权平均)
+- 结合 Token 剩余有效期计算抽样权重
+- 权重存放于 WeightedSampler, 供 /cookies/random?strategy=weighted 使用
+- 因使用反馈降级的账号在降级期内权重为 0
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from ..infrastructure.repositories.cookie_repository import MANAGED_KEY, RAW_KEY
+from ..utils.sampler import WeightedSampler
+
+
+@dataclass
+class AccountHealth:
+    score: float = 1.0
+    eligible: bool = False
+    expire_at: Optional[float] = None
+    suspended_until: float = 0.0
+
+
+def _extract_expire_at(doc: Dict[str, Any]) -> Optional[float]:
+    """从文档中推算 Token 过期时间戳(秒)。优先 SESSDATA 的 expires, 其次 update_time + expires_in。"""
+    raw = doc.get(RAW_KEY) if isinstance(doc.get(RAW_KEY), dict) else {}
+    cookies = (raw.get("cookie_info") or {}).get("cookies", []) if isinstance(raw.get("cookie_info"), dict) else []
+    for cookie in cookies:
+        if isinstance(cookie, dict) and cookie.get("name") == "SESSDATA":
+            try:
+                expires = float(cookie.get("expires") or 0)
+            except (TypeError, ValueError):
+                expires = 0
+            if expires > 0:
+                return expires
+
+    managed = doc.get(MANAGED_KEY) if isinstance(doc.get(MANAGED_KEY), dict) else {}
+    token_info = raw.get("token_info") if isinstance(raw.get("token_info"), dict) else {}
+    try:
+        expires_in = float(token_info.get("expires_in") or 0)
+        update_time = datetime.fromisoformat(str(managed.get("update_time"))).timestamp()
+    except (TypeError, ValueError):
+        return None
+    if expires_in <= 0:
+        return None
+    return update_time + expires_in
+
+
+def _is_eligible(doc: Dict[str, Any]) -> bool:
+    info = doc.get(MANAGED_KEY) if isinstance(doc.get(MANAGED_KEY), dict) else {}
+    return bool(info.get("is_enabled", True)) and str(info.get("status")) == "valid"
+
+
+class HealthTracker:
+    """
+    维护每个账号的健康分与抽样权重。
+    - record: 记录一次检查/刷新结果, O(log n)
+    - observe: 根据最新文档更新可用性与过期时间, O(log n)
+    - pick: 按权重抽取账号, O(log n)
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.3,
+        expiry_horizon_seconds: float = 3 * 86400,
+        min_expiry_factor: float = 0.05,
+        reweigh_interval_seconds: float = 60.0,
+    ):
+        self.alpha = alpha
+        self.expiry_horizon_seconds = expiry_horizon_seconds
+        self.min_expiry_factor = min_expiry_factor
+        self.reweigh_interval_seconds = reweigh_interval_seconds
+        self._accounts: Dict[str, AccountHealth] = {}
+        self._sampler = WeightedSampler()
+        self._last_reweigh = 0.0
+        self.primed = False
+
+    def _weight(self, health: AccountHealth, now: float) -> float:
+        if not health.eligible or health.suspended_until > now:
+            return 0.0
+        factor = 1.0
+        if health.expire_at is not None:
+            remaining = health.expire_at - now
+            factor = min(1.0, max(self.min_expiry_factor, remaining / self.expiry_horizon_seconds))
+        return health.score * factor
+
+    def _apply(self, dede_user_id: str, health: AccountHealth, now: Optional[float] = None) -> None:
+        self._sampler.set(dede_user_id, self._weight(health, now or time.time()))
+
+    def score(self, dede_user_id: str) -> Optional[float]:
+        health = self._accounts.get(dede_user_id)
+        return health.score if health else None
+
+    def weight(self, dede_user_id: str) -> float:
+        return self._sampler.get(dede_user_id)
+
+    def record(self, dede_user_id: str, ok: bool) -> None:
+        """记录一次检查或刷新结果, 更新滚动健康分。"""
+        health = self._accounts.setdefault(dede_user_id, AccountHealth())
+        health.score = (1 - self.alpha) * health.score + self.alpha * (1.0 if ok else 0.0)
+        self._apply(dede_user_id, health)
+
+    def observe(self, doc: Optional[Dict[str, Any]]) -> None:
+        """根据文档更新账号的可用性与过期时间。"""
+        if not doc:
+            return
+        info = doc.get(MANAGED_KEY) if isinstance(doc.get(MANAGED_KEY), dict) else {}
+        dede_user_id = info.get("DedeUserID")
+        if not dede_user_id:
+            return
+        health = self._accounts.setdefault(str(dede_user_id), AccountHealth())
+        health.eligible = _is_eligible(doc)
+        health.expire_at = _extract_expire_at(doc)
+        self._apply(str(dede_user_id), health)
+
+    def suspend(self, dede_user_id: str, until: Optional[float]) -> None:
+        """降级期内不参与加权抽取; until 为 None 时立即恢复。到期后在下次 reweigh 时恢复。"""
+        health = self._accounts.setdefault(dede_user_id, AccountHealth())
+        health.suspended_until = until or 0.0
+        self._apply(dede_user_id, health)
+
+    def remove(self, dede_user_id: str) -> None:
+        self._accounts.pop(dede_user_id, None)
+        self._sampler.remove(dede_user_id)
+
+    def sync(self, docs: Iterable[Dict[str, Any]]) -> None:
+        """以完整文档列表初始化(或重建)可用性, 保留已有健康分。"""
+        seen = set()
+        for doc in docs:
+            self.observe(doc)
+            info = doc.get(MANAGED_KEY) if isinstance(doc.get(MANAGED_KEY), dict) else {}
+            if info.get("DedeUserID"):
+                seen.add(str(info["DedeUserID"]))
+        for dede_user_id in [uid for uid in self._accounts if uid not in seen]:
+            self.remove(dede_user_id)
+        self._last_reweigh = time.time()
+        self.primed = True
+
+    def reweigh(self, force: bool = False) -> None:
+        """按当前时间重新计算过期系数; 默认按间隔节流。"""
+        now = time.time()
+        if not force and now - self._last_reweigh < self.reweigh_interval_seconds:
+            return
+        for dede_user_id, health in self._accounts.items():
+            self._apply(dede_user_id, health, now)
+        self._last_reweigh = now
+
+    def pick(self) -> Optional[str]:
+        self.reweigh()
+        chosen = self._sampler.pick()
+        return str(chosen) if chosen is not None else None
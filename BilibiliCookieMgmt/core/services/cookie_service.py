@@ -4,16 +4,25 @@ from __future__ import annotations
 Cookie 业务服务: 封装领域规则, 仅做一件事、写干净的业务逻辑。
 """
 
-import logging
-from typing import Any, Dict, List, Optional
+import json, asyncio, logging, time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 
 from ..infrastructure.repositories.cookie_repository import CookieRepository, MANAGED_KEY, RAW_KEY
+from ..infrastructure.repositories.doc_codec import decode_doc
+from ..infrastructure.repositories.history_repository import CheckHistoryRepository, EVENT_CHECK, EVENT_REFRESH
 from ..infrastructure.bilibili_client import BilibiliClient
 from ..infrastructure.notifications import NotificationService, NoopNotificationService
+from ..utils.tracing import traced
+from .cookie_health import HealthTracker
+from .usage_feedback import UsageFeedback
 
 
 logger = logging.getLogger(__name__)
 
+# test_cookie 结果缓存的条目上限, 超出时先淘汰过期条目, 再淘汰最早写入的
+TEST_CACHE_MAX_ENTRIES = 1024
+
 
 def _normalize_tags(tags: List[str]) -> List[str]:
     """整理标签输入，去空白、去空值、去重并保持原顺序。"""
@@ -29,14 +38,45 @@ def _normalize_tags(tags: List[str]) -> List[str]:
 
 
 class CookieService:
-    def __init__(self, repository: CookieRepository, notification: NotificationService | None = None, bilibili_client: BilibiliClient | None = None):
+    def __init__(self, repository: CookieRepository, notification: NotificationService | None = None, bilibili_client: BilibiliClient | None = None, history: CheckHistoryRepository | None = None, test_cache_ttl_seconds: float = 10.0, check_fresh_seconds: float = 0.0, feedback: UsageFeedback | None = None):
         self.repo = repository
         self.notification = notification or NoopNotificationService()
         self.client = bilibili_client
+        self.history = history
+        self.health = HealthTracker()
+        # Cookie 摘要 -> (过期时刻 monotonic, 结果)
+        self._test_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # 新鲜期内的检查直接沿用上次上游判定; 0 表示每次都请求上游
+        self.configure(test_cache_ttl_seconds=test_cache_ttl_seconds, check_fresh_seconds=check_fresh_seconds)
+        # DedeUserID -> (判定时间 Unix 秒, 是否有效, Cookie 摘要); 重启后由文档中的 last_verified_time 恢复
+        self._verified: Dict[str, Tuple[float, bool, str]] = {}
+        # 调用方上报的使用结果; 降级账号进入优先检查队列(同一账号排队期间只检查一次)
+        self.feedback = feedback or UsageFeedback()
+        self._priority_queue: Optional[asyncio.Queue] = None
+        self._priority_pending: Set[str] = set()
+        self._priority_task: Optional[asyncio.Task] = None
+
+    def configure(self, test_cache_ttl_seconds: float, check_fresh_seconds: float) -> None:
+        """设置缓存时长与检查新鲜期(配置热重载时直接调用); 已缓存的结果按写入时的时长过期。"""
+        self.test_cache_ttl_seconds = max(0.0, float(test_cache_ttl_seconds))
+        self.check_fresh_seconds = max(0.0, float(check_fresh_seconds))
+
+    async def _record_outcome(self, dede_user_id: str, kind: int, ok: bool, started: Optional[float] = None, code: Optional[int] = None) -> None:
+        """记录一次检查/刷新结果: 更新健康分并追加历史事件。"""
+        self.health.record(dede_user_id, ok)
+        if self.history is None:
+            return
+        latency_ms = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+        try:
+            await self.history.append(dede_user_id, kind, ok, latency_ms=latency_ms, code=code)
+        except Exception as e:
+            logger.warning(f"写入检查历史失败: {dede_user_id}, 错误: {e}")
 
+    @traced("service.create_from_raw", uid_arg=None)
     async def create_from_raw(self, raw: Dict[str, Any]) -> Dict[str, Any]:
         """根据原始响应创建/保存 Cookie 文件。"""
         doc = await self.repo.save_from_raw(raw)
+        self.health.observe(doc)
         try:
             info = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
             dede_user_id = info.get("DedeUserID")
@@ -50,6 +90,7 @@ class CookieService:
             logger.error(f"Cookie 创建后通知发送失败: {e}", exc_info=True)
         return doc
 
+    @traced("service.enrich_after_create")
     async def enrich_after_create(self, dede_user_id: str) -> Optional[Dict[str, Any]]:
         """
         扫码创建后置处理: 
@@ -76,26 +117,189 @@ class CookieService:
 
         # 首轮检查
         try:
-            doc = await self.check_cookie(dede_user_id) or doc
+            doc = await self.check_cookie(dede_user_id, force=True) or doc
         except Exception as e:
             logger.warning(f"扫码后置处理-首轮检查异常: {e}")
 
         return doc
 
+    async def warm_up(self) -> Dict[str, Any]:
+        """并行加载全部文档, 同一轮读取中同时重建仓库索引与健康度索引; 返回加载统计。"""
+        docs: List[Dict[str, Any]] = []
+        result = await self.repo.bulk_load(on_doc=docs.append)
+        self.health.sync(docs)
+        return result
+
     async def get_cookie(self, dede_user_id: str) -> Optional[Dict[str, Any]]:
         return await self.repo.get(dede_user_id)
 
     async def list_cookies(self) -> List[Dict[str, Any]]:
         return await self.repo.list()
 
+    async def get_stats(self) -> Dict[str, Any]:
+        """账号计数(由仓库索引增量维护), 附带用于条件请求的 etag。"""
+        index = await self.repo.ensure_index()
+        return {"etag": index.stats_etag, "stats": index.stats()}
+
+    async def list_etag(self) -> str:
+        """全部文档的 ETag, 任一文档写入或删除后变化。"""
+        index = await self.repo.ensure_index()
+        return index.list_etag
+
+    @property
+    def tracks_external_changes(self) -> bool:
+        """cookie_dir 监听运行中时为 True: 外部改写已反映在修订号中, 无需读取文件即可比对 ETag。"""
+        return self.repo.watched
+
+    def cookie_revision(self, dede_user_id: str) -> Optional[int]:
+        """文档当前修订号(索引未收录时为 None)。"""
+        return self.repo.index.doc_revision(dede_user_id)
+
+    async def cookie_etag(self, dede_user_id: str) -> Optional[str]:
+        """单个文档的 ETag; 文档不存在时返回 None。"""
+        index = await self.repo.ensure_index()
+        return index.doc_etag(dede_user_id)
+
+    @traced("service.delete_cookie")
     async def delete_cookie(self, dede_user_id: str) -> bool:
+        self.health.remove(dede_user_id)
+        self.feedback.remove(dede_user_id)
+        self._verified.pop(dede_user_id, None)
+        if self.history is not None:
+            await self.history.delete(dede_user_id)
         return await self.repo.delete(dede_user_id)
 
-    async def check_cookie(self, dede_user_id: str) -> Optional[Dict[str, Any]]:
+    async def iter_documents(self, tag: Optional[str] = None, status: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """按索引筛选后逐个读取文档(用于导出), 不一次性加载全部文档。"""
+        index = await self.repo.ensure_index()
+        for dede_user_id in sorted(index.ids()):
+            entry = index.entry(dede_user_id)
+            if entry is None:
+                continue
+            if tag is not None and tag not in entry.tags:
+                continue
+            if status is not None and entry.status != status:
+                continue
+            doc = await self.repo.get(dede_user_id)
+            if doc:
+                yield doc
+
+    @traced("service.import_documents", uid_arg=None)
+    async def import_documents(self, files: List[Tuple[str, bytes]]) -> Dict[str, Any]:
+        """
+        批量写入导入的文档。files 为 (文件名, 内容) 列表, 内容可为任一落盘格式。
+        返回 {"imported": [DedeUserID...], "errors": [{"name", "error"}]}。
+        """
+        imported: List[str] = []
+        errors: List[Dict[str, str]] = []
+        for name, data in files:
+            try:
+                saved = await self.repo.upsert(decode_doc(data))
+            except json.JSONDecodeError as e:
+                errors.append({"name": name, "error": f"文档解析失败: {e}"})
+                continue
+            except ValueError as e:
+                errors.append({"name": name, "error": str(e)})
+                continue
+            self.health.observe(saved)
+            imported.append(saved[MANAGED_KEY]["DedeUserID"])
+        return {"imported": imported, "errors": errors}
+
+    async def on_external_change(self, dede_user_id: str, doc: Optional[Dict[str, Any]]) -> None:
+        """cookie_dir 被其他进程修改后同步健康状态; doc 为 None 表示文件已删除。"""
+        if doc is None:
+            self.health.remove(dede_user_id)
+            self.feedback.remove(dede_user_id)
+            self._verified.pop(dede_user_id, None)
+        else:
+            self.health.observe(doc)
+
+    @traced("service.report_usage")
+    async def report_usage(self, dede_user_id: str, code: int) -> Optional[Dict[str, Any]]:
+        """
+        记录调用方的使用结果(code 为 0 表示成功, 其余为接口返回码, 如 -412 / -101)。
+        达到降级条件时立即移出随机池并加入优先检查队列; 账号不存在时返回 None。
+        """
+        index = await self.repo.ensure_index()
+        if index.entry(dede_user_id) is None:
+            return None
+        if self.feedback.record(dede_user_id, int(code)):
+            state = self.feedback.state(dede_user_id)
+            self.health.suspend(dede_user_id, state["demoted_until"])
+            logger.warning(f"Cookie 使用反馈异常, 已移出随机池并加入优先检查: {dede_user_id}, 原因: {state['reason']}, 返回码: {code}")
+            self._enqueue_priority_check(dede_user_id)
+        return {"DedeUserID": dede_user_id, **self.feedback.state(dede_user_id)}
+
+    def _enqueue_priority_check(self, dede_user_id: str) -> None:
+        if dede_user_id in self._priority_pending:
+            return
+        if self._priority_task is None or self._priority_task.done():
+            self._priority_queue = asyncio.Queue()
+            self._priority_pending.clear()
+            self._priority_task = asyncio.create_task(self._run_priority_checks())
+        self._priority_pending.add(dede_user_id)
+        self._priority_queue.put_nowait(dede_user_id)
+
+    async def _run_priority_checks(self) -> None:
+        while True:
+            dede_user_id = await self._priority_queue.get()
+            try:
+                result = await self.check_cookie(dede_user_id, force=True)
+                info = (result or {}).get(MANAGED_KEY) or {}
+                if self.feedback.reinstate(dede_user_id, str(info.get("status")) == "valid"):
+                    self.health.suspend(dede_user_id, None)
+                    logger.info(f"优先检查通过, 已恢复到随机池: {dede_user_id}")
+            except Exception as e:
+                logger.error(f"优先检查异常: {dede_user_id}, 错误: {e}", exc_info=True)
+            finally:
+                self._priority_pending.discard(dede_user_id)
+
+    async def aclose(self) -> None:
+        """停止优先检查队列(关闭时调用)。"""
+        task, self._priority_task = self._priority_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def get_history(self, dede_user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """返回账号最近的检查/刷新事件(新到旧), 不读取 Cookie 文档。"""
+        if self.history is None:
+            return []
+        return await self.history.read(dede_user_id, limit)
+
+    def _fresh_verdict(self, dede_user_id: str, info: Dict[str, Any]) -> Optional[bool]:
+        """返回新鲜期内的上次判定结果; 无判定、已过期或 Cookie 已更换时返回 None。"""
+        if self.check_fresh_seconds <= 0:
+            return None
+        digest = BilibiliClient.cookie_key(info.get("header_string") or "")
+        entry = self._verified.get(dede_user_id)
+        if entry is None or entry[2] != digest:
+            entry = None
+            verified_time = info.get("last_verified_time")
+            status = info.get("status")
+            if verified_time and status in ("valid", "invalid"):
+                try:
+                    entry = (datetime.fromisoformat(verified_time).timestamp(), status == "valid", digest)
+                except (TypeError, ValueError):
+                    entry = None
+            if entry is None:
+                self._verified.pop(dede_user_id, None)
+                return None
+            self._verified[dede_user_id] = entry
+        if time.time() - entry[0] >= self.check_fresh_seconds:
+            return None
+        return entry[1]
+
+    @traced("service.check_cookie")
+    async def check_cookie(self, dede_user_id: str, force: bool = False) -> Optional[Dict[str, Any]]:
         """
         Cookie 有效性检查(接入 BilibiliClient): 
         - 从存储获取 header_string(若缺失则根据 cookies 构建)
-        - 调用客户端 nav 接口判断是否登录
+        - 新鲜期(check_fresh_seconds)内已有上游判定时直接返回文档, force=True 跳过该判断
+        - 调用客户端 nav 接口判断是否登录, 有效时从同一响应中取得用户名
         - 更新仓库中的检查状态, 并在失效时发送通知
         """
         doc = await self.repo.get(dede_user_id)
@@ -104,25 +308,33 @@ class CookieService:
 
         info = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
         header_string = info["header_string"]
+        if not force and self._fresh_verdict(dede_user_id, info) is not None:
+            logger.debug(f"Cookie 新鲜期内已检查, 沿用上次结果: {dede_user_id}")
+            return doc
 
         is_valid = True
         error_message: str | None = None
         username_for_update: Optional[str] = None
+        # 记录上游 nav 的实际返回码; 请求异常沿用客户端的 -1 约定
+        upstream_code = 0
+        verified = False
+        started = time.perf_counter()
         if self.client:
             try:
-                is_valid = await self.client.check_cookie_valid(header_string)
-                if not is_valid:
+                # 用户名取自同一次 nav 响应, 不再单独请求 get_nav
+                verdict, upstream_code, nav_data = await self.client.check_login(header_string)
+                is_valid = bool(verdict)
+                verified = verdict is not None
+                if verdict is None:
+                    error_message = "检查失败: 请求异常" if upstream_code == -1 else f"检查失败: 上游返回码 {upstream_code}"
+                elif not is_valid:
                     error_message = "Cookie 无效"
                 else:
-                    try:
-                        nav_data = await self.client.get_nav(header_string)
-                        if nav_data and nav_data.get("isLogin"):
-                            username_for_update = nav_data.get("uname") or nav_data.get("username")
-                    except Exception:
-                        pass
+                    username_for_update = nav_data.get("uname") or nav_data.get("username")
             except Exception as e:
                 is_valid = False
                 error_message = f"检查失败: {e}"
+                upstream_code = -1
 
         result = await self.repo.update_check_status(
             dede_user_id,
@@ -130,7 +342,12 @@ class CookieService:
             error_message=error_message,
             username=username_for_update,
             header_string=header_string,
+            verified=verified,
         )
+        if verified:
+            self._verified[dede_user_id] = (time.time(), is_valid, BilibiliClient.cookie_key(header_string))
+        await self._record_outcome(dede_user_id, EVENT_CHECK, is_valid, started, upstream_code)
+        self.health.observe(result)
 
         if not is_valid:
             logger.warning(f"Cookie 检查失败: {dede_user_id}, 原因: {error_message}")
@@ -140,10 +357,13 @@ class CookieService:
         # 失效则通知
         try:
             if not is_valid:
+                # 上游确认失效时按 Cookie 摘要去重: 同一份失效 Cookie 的重复检查只通知一次
+                key = f"cookie_invalid:{dede_user_id}:{BilibiliClient.cookie_key(header_string)[:16]}" if verified else None
                 await self.notification.send(
                     title="Cookie 失效",
                     message=f"用户 {dede_user_id} 的 Cookie 已失效, 请尽快处理。",
                     priority=7,
+                    key=key,
                 )
             else:
                 pass
@@ -151,6 +371,7 @@ class CookieService:
             logger.error(f"Cookie 检查通知发送失败: {e}", exc_info=True)
         return result
 
+    @traced("service.refresh_cookie")
     async def refresh_cookie(self, dede_user_id: str) -> Optional[Dict[str, Any]]:
         """
         Cookie 刷新(接入 BilibiliClient): 
@@ -168,19 +389,20 @@ class CookieService:
         access_token = token_info.get("access_token") or token_info.get("access_key")
         refresh_token = token_info.get("refresh_token")
         if not access_token or not refresh_token:
-            return await self.repo.update_refresh_failed(dede_user_id, "缺少 access_token 或 refresh_token")
+            return await self._refresh_failed(dede_user_id, "缺少 access_token 或 refresh_token")
 
+        started = time.perf_counter()
         try:
             resp = await self.client.refresh_cookie(access_token, refresh_token)
         except Exception as e:
             logger.error(f"Cookie 刷新接口调用异常: {dede_user_id}, 错误: {e}", exc_info=True)
-            return await self.repo.update_refresh_failed(dede_user_id, f"刷新接口异常: {e}")
+            return await self._refresh_failed(dede_user_id, f"刷新接口异常: {e}", started)
 
         code = resp.get("code")
         if code != 0:
             message = resp.get("message", "刷新失败")
             logger.warning(f"Cookie 刷新返回错误: {dede_user_id}, code: {code}, message: {message}")
-            result = await self.repo.update_refresh_failed(dede_user_id, message)
+            result = await self._refresh_failed(dede_user_id, message, started, code)
             try:
                 await self.notification.send(
                     title="Cookie 刷新失败",
@@ -198,14 +420,15 @@ class CookieService:
 
         # 更新文件
         result = await self.repo.update_on_refresh(dede_user_id, new_token_info, new_cookie_info, ts)
+        await self._record_outcome(dede_user_id, EVENT_REFRESH, True, started, 0)
+        self.health.observe(result)
         logger.info(f"Cookie 刷新成功: {dede_user_id}")
 
         # 计算过期时间(用于通知)
         try:
-            import time as _t
             expires_in = int(new_token_info.get("expires_in", 0))
-            expire_timestamp_ms = (int(ts or _t.time()) + expires_in) * 1000
-            expire_time_str = _t.strftime("%Y-%m-%d %H:%M:%S", _t.localtime(expire_timestamp_ms / 1000))
+            expire_timestamp_ms = (int(ts or time.time()) + expires_in) * 1000
+            expire_time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(expire_timestamp_ms / 1000))
         except Exception:
             expire_time_str = "未知"
 
@@ -221,7 +444,7 @@ class CookieService:
 
         # 刷新后健康检查
         try:
-            await self.check_cookie(dede_user_id)
+            await self.check_cookie(dede_user_id, force=True)
         except Exception:
             pass
 
@@ -237,11 +460,22 @@ class CookieService:
 
         return result
 
-    async def check_cookies(self, ids: Optional[List[str]] = None, all: bool = False) -> Dict[str, Any]:
+    async def _refresh_failed(self, dede_user_id: str, error_message: str, started: Optional[float] = None, code: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """记录刷新失败(仓库、健康分与历史)。"""
+        try:
+            code = int(code) if code is not None else None
+        except (TypeError, ValueError):
+            code = None
+        await self._record_outcome(dede_user_id, EVENT_REFRESH, False, started, code)
+        return await self.repo.update_refresh_failed(dede_user_id, error_message)
+
+    @traced("service.check_cookies", uid_arg=None)
+    async def check_cookies(self, ids: Optional[List[str]] = None, all: bool = False, force: bool = False) -> Dict[str, Any]:
         """
         批量检查 Cookie 有效性。
         - ids 提供时, 仅检查这些用户。
         - all=True 时, 检查所有“启用”的 Cookie(is_enabled 为 True)。
+        - force=True 时忽略新鲜期, 全部请求上游。
         返回执行摘要与明细。
         """
         target_ids: List[str] = []
@@ -263,7 +497,7 @@ class CookieService:
         failed = 0
         for uid in target_ids:
             try:
-                res = await self.check_cookie(uid)
+                res = await self.check_cookie(uid, force=force)
                 if res:
                     details.append({"DedeUserID": uid, "ok": True})
                     succeeded += 1
@@ -276,6 +510,7 @@ class CookieService:
 
         return {"ok": True, "total": len(target_ids), "succeeded": succeeded, "failed": failed, "details": details}
 
+    @traced("service.refresh_cookies", uid_arg=None)
     async def refresh_cookies(self, ids: Optional[List[str]] = None, all: bool = False) -> Dict[str, Any]:
         """
         批量刷新 Cookie。
@@ -315,6 +550,7 @@ class CookieService:
 
         return {"ok": True, "total": len(target_ids), "succeeded": succeeded, "failed": failed, "details": details}
 
+    @traced("service.test_cookie", uid_arg=None)
     async def test_cookie(self, header_string: str) -> Dict[str, Any]:
         """
         测试任意 Cookie 字符串是否有效。
@@ -328,36 +564,61 @@ class CookieService:
         if not self.client:
             return {"code": 500, "is_valid": False, "message": "Bilibili 客户端未初始化"}
 
+        cache_key = BilibiliClient.cookie_key(header_string)
+        now = time.monotonic()
+        cached = self._test_cache.get(cache_key)
+        if cached and cached[0] > now:
+            return dict(cached[1])
+
         try:
-            ok = await self.client.check_cookie_valid(header_string)
-            return {"code": 0 if ok else 200, "is_valid": bool(ok), "message": "ok" if ok else "Cookie 无效"}
+            ok, upstream_code, _ = await self.client.check_login(header_string)
         except Exception as e:
             return {"code": 502, "is_valid": False, "message": f"检查失败: {e}"}
+        if ok is None:
+            message = "检查失败: 请求异常" if upstream_code == -1 else f"检查失败: 上游返回码 {upstream_code}"
+            return {"code": 502, "is_valid": False, "message": message}
+        result = {"code": 0 if ok else 200, "is_valid": bool(ok), "message": "ok" if ok else "Cookie 无效"}
+        if self.test_cache_ttl_seconds > 0:
+            self._remember_test(cache_key, result, now)
+        return result
+
+    def _remember_test(self, cache_key: str, result: Dict[str, Any], now: float) -> None:
+        cache = self._test_cache
+        if len(cache) >= TEST_CACHE_MAX_ENTRIES:
+            for key in [key for key, (expires, _) in cache.items() if expires <= now]:
+                del cache[key]
+            while len(cache) >= TEST_CACHE_MAX_ENTRIES:
+                del cache[next(iter(cache))]
+        cache.pop(cache_key, None)
+        cache[cache_key] = (now + self.test_cache_ttl_seconds, dict(result))
 
     async def set_enabled(self, dede_user_id: str, is_enabled: bool) -> Optional[Dict[str, Any]]:
         """设置启用/禁用状态(仅影响随机 Cookie 选择)。"""
-        return await self.repo.update_enabled(dede_user_id, is_enabled)
+        doc = await self.repo.update_enabled(dede_user_id, is_enabled)
+        self.health.observe(doc)
+        return doc
 
     async def set_tags(self, dede_user_id: str, tags: List[str]) -> Optional[Dict[str, Any]]:
         """设置账号标签。"""
         return await self.repo.update_tags(dede_user_id, _normalize_tags(tags))
 
-    async def get_random_cookie(self, fmt: str = "simple") -> Optional[Dict[str, Any]]:
+    @traced("service.get_random_cookie", uid_arg=None)
+    async def get_random_cookie(self, fmt: str = "simple", strategy: str = "uniform") -> Optional[Dict[str, Any]]:
         """
         返回随机且启用且有效的 Cookie。
+        - strategy=uniform: 在候选中均匀抽取
+        - strategy=weighted: 按健康分(近期检查/刷新结果与 Token 剩余有效期)加权抽取
         - fmt=simple: 返回 {DedeUserID, header_string}
         - 其它: 返回完整文档
         """
-        import random
-        items = await self.repo.list()
-        candidates: List[Dict[str, Any]] = []
-        for doc in items:
-            info = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
-            if bool(info.get("is_enabled", True)) and str(info.get("status")) == "valid":
-                candidates.append(doc)
-        if not candidates:
+        if strategy == "weighted":
+            chosen = await self._pick_weighted()
+        elif strategy == "uniform":
+            chosen = await self._pick_uniform()
+        else:
+            raise ValueError(f"未知的抽取策略: {strategy}")
+        if not chosen:
             return None
-        chosen = random.choice(candidates)
         if fmt == "simple":
             info = chosen.get(MANAGED_KEY, {}) if isinstance(chosen.get(MANAGED_KEY), dict) else {}
             return {
@@ -365,3 +626,35 @@ class CookieService:
                 "header_string": info.get("header_string"),
             }
         return chosen
+
+    async def _pick_uniform(self) -> Optional[Dict[str, Any]]:
+        import random
+        items = await self.repo.list()
+        candidates: List[Dict[str, Any]] = []
+        for doc in items:
+            info = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
+            if bool(info.get("is_enabled", True)) and str(info.get("status")) == "valid" \
+                    and not self.feedback.is_demoted(str(info.get("DedeUserID"))):
+                candidates.append(doc)
+        if not candidates:
+            return None
+        return random.choice(candidates)
+
+    async def _pick_weighted(self, max_attempts: int = 3) -> Optional[Dict[str, Any]]:
+        if not self.health.primed:
+            self.health.sync(await self.repo.list())
+        for _ in range(max_attempts):
+            dede_user_id = self.health.pick()
+            if not dede_user_id:
+                return None
+            doc = await self.repo.get(dede_user_id)
+            if not doc:
+                self.health.remove(dede_user_id)
+                continue
+            info = doc.get(MANAGED_KEY, {}) if isinstance(doc.get(MANAGED_KEY), dict) else {}
+            if bool(info.get("is_enabled", True)) and str(info.get("status")) == "valid" \
+                    and not self.feedback.is_demoted(dede_user_id):
+                return doc
+            # 内存中的可用性已过期(例如文件被外部修改), 校正后重抽
+            self.health.observe(doc)
+        return None
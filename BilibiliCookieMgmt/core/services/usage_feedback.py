@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+"""
+调用方使用反馈(POST /cookies/{id}/report):
+- 每个账号在内存中保留 window_seconds 内的上报结果(滑动窗口)
+- 上报登录失效类错误码(auth_codes, 如 -101)时立即降级, 等待优先检查确认; 检查通过即恢复
+- 其他错误(如 -412 风控)在窗口内达到 error_threshold 次且占比不低于 error_ratio 时降级,
+  降级持续 cooldown_seconds(检查接口无法发现风控, 检查通过也不提前恢复)
+- 降级账号不参与 /cookies/random 抽取
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+REASON_AUTH = "auth"
+REASON_ERRORS = "errors"
+# 每个账号窗口内最多保留的上报数, 防止高频上报占用过多内存
+MAX_REPORTS_PER_ACCOUNT = 1024
+
+
+@dataclass
+class _Window:
+    reports: Deque[Tuple[float, int]] = field(default_factory=lambda: deque(maxlen=MAX_REPORTS_PER_ACCOUNT))
+    errors: int = 0
+    demoted_until: float = 0.0
+    reason: Optional[str] = None
+
+
+class UsageFeedback:
+    def __init__(self, window_seconds: float = 300.0, error_threshold: int = 5, error_ratio: float = 0.5,
+                 auth_codes: Iterable[int] = (-101,), cooldown_seconds: float = 600.0):
+        self._accounts: Dict[str, _Window] = {}
+        self.configure(window_seconds, error_threshold, error_ratio, auth_codes, cooldown_seconds)
+
+    def configure(self, window_seconds: float, error_threshold: int, error_ratio: float,
+                  auth_codes: Iterable[int], cooldown_seconds: float) -> None:
+        self.window_seconds = max(1.0, float(window_seconds))
+        self.error_threshold = max(1, int(error_threshold))
+        self.error_ratio = min(1.0, max(0.0, float(error_ratio)))
+        self.auth_codes = frozenset(int(code) for code in auth_codes)
+        self.cooldown_seconds = max(0.0, float(cooldown_seconds))
+
+    def _prune(self, window: _Window, now: float) -> None:
+        reports = window.reports
+        while reports and now - reports[0][0] > self.window_seconds:
+            _, code = reports.popleft()
+            if code != 0:
+                window.errors -= 1
+
+    def record(self, dede_user_id: str, code: int, now: Optional[float] = None) -> bool:
+        """记录一次上报(code 为 0 表示成功), 返回是否因本次上报新降级。"""
+        now = time.time() if now is None else now
+        window = self._accounts.setdefault(dede_user_id, _Window())
+        self._prune(window, now)
+        reports = window.reports
+        if len(reports) == reports.maxlen and reports[0][1] != 0:
+            window.errors -= 1
+        reports.append((now, code))
+        if code != 0:
+            window.errors += 1
+        if window.demoted_until > now:
+            return False
+        if code in self.auth_codes:
+            reason = REASON_AUTH
+        elif window.errors >= self.error_threshold and window.errors >= self.error_ratio * len(reports):
+            reason = REASON_ERRORS
+        else:
+            return False
+        window.demoted_until = now + self.cooldown_seconds
+        window.reason = reason
+        return True
+
+    def is_demoted(self, dede_user_id: str, now: Optional[float] = None) -> bool:
+        window = self._accounts.get(dede_user_id)
+        return window is not None and window.demoted_until > (time.time() if now is None else now)
+
+    def reinstate(self, dede_user_id: str, verified_valid: bool) -> bool:
+        """优先检查完成后调用: 检查通过且因登录失效降级时恢复并清空窗口, 返回是否恢复。"""
+        window = self._accounts.get(dede_user_id)
+        if window is None or not verified_valid or window.reason != REASON_AUTH:
+            return False
+        self._accounts.pop(dede_user_id, None)
+        return True
+
+    def remove(self, dede_user_id: str) -> None:
+        self._accounts.pop(dede_user_id, None)
+
+    def state(self, dede_user_id: str, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        window = self._accounts.get(dede_user_id)
+        if window is None:
+            return {"demoted": False, "demoted_until": None, "reason": None, "window": {"total": 0, "errors": 0}}
+        self._prune(window, now)
+        demoted = window.demoted_until > now
+        return {
+            "demoted": demoted,
+            "demoted_until": round(window.demoted_until, 3) if demoted else None,
+            "reason": window.reason if demoted else None,
+            "window": {"total": len(window.reports), "errors": window.errors},
+        }
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+"""
+流式 tar 归档(用于 Cookie 批量导入/导出):
+- TarStreamWriter: 逐个文件追加, 每次返回已压缩的输出块, 不在内存中保留整个归档
+- TarStreamReader: 逐块喂入上传的数据, 增量解压并解析 tar, 产出完整的成员文件
+压缩: gz(标准库) / zst(需安装 zstandard); 读取时按魔数自动识别。
+"""
+
+import time, zlib, tarfile
+from typing import Iterator, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+
+COMPRESSION_GZ = "gz"
+COMPRESSION_ZST = "zst"
+COMPRESSIONS = (COMPRESSION_GZ, COMPRESSION_ZST)
+MEDIA_TYPES = {COMPRESSION_GZ: "application/gzip", COMPRESSION_ZST: "application/zstd"}
+
+BLOCK = 512
+# 单个成员文件的大小上限; Cookie 文档通常只有几 KB
+MAX_MEMBER_SIZE = 4 * 1024 * 1024
+# 每次解压输出的上限, 防止高压缩比数据一次性展开
+_DECOMPRESS_SLICE = 1024 * 1024
+# zstd 的 decompressobj 不支持限制输出长度, 改为限制每次输入的长度: 一个压缩块(3 字节块头 + 1 字节 RLE)
+# 最多展开为 128 KB, 即每字节输入最多 32768 字节输出, 按此切分输入可使单次输出不超过 _DECOMPRESS_SLICE
+_ZSTD_MAX_RATIO = 32768
+_ZSTD_INPUT_SLICE = max(1, _DECOMPRESS_SLICE // _ZSTD_MAX_RATIO)
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def check_compression(name: str) -> str:
+    if name not in COMPRESSIONS:
+        raise ValueError(f"未知的压缩格式: {name}, 可选: {', '.join(COMPRESSIONS)}")
+    if name == COMPRESSION_ZST and zstandard is None:
+        raise ValueError("压缩格式 zst 需要安装 zstandard")
+    return name
+
+
+class TarStreamWriter:
+    """流式写 tar.gz / tar.zst。"""
+
+    def __init__(self, compression: str = COMPRESSION_GZ, level: Optional[int] = None):
+        check_compression(compression)
+        if compression == COMPRESSION_ZST:
+            self._compressor = zstandard.ZstdCompressor(level=level or 3).compressobj()
+        else:
+            self._compressor = zlib.compressobj(level or 6, zlib.DEFLATED, 31)
+
+    def add(self, name: str, data: bytes, mtime: Optional[float] = None) -> bytes:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(mtime if mtime is not None else time.time())
+        info.mode = 0o644
+        padding = (-len(data)) % BLOCK
+        return self._compressor.compress(info.tobuf(format=tarfile.PAX_FORMAT) + data + b"\0" * padding)
+
+    def close(self) -> bytes:
+        # tar 结束标记: 两个全零块
+        return self._compressor.compress(b"\0" * (BLOCK * 2)) + self._compressor.flush()
+
+
+def _parse_octal(field: bytes) -> int:
+    field = field.rstrip(b"\0 ").strip()
+    return int(field, 8) if field else 0
+
+
+def _parse_pax(data: bytes) -> dict:
+    """解析 pax 扩展头的 "<长度> key=value\\n" 记录。"""
+    records = {}
+    pos = 0
+    while pos < len(data):
+        space = data.find(b" ", pos)
+        if space < 0:
+            break
+        length = int(data[pos:space])
+        if length <= 0:
+            break
+        key, _, value = data[space + 1:pos + length - 1].partition(b"=")
+        records[key.decode("utf-8", "replace")] = value.decode("utf-8", "replace")
+        pos += length
+    return records
+
+
+class TarStreamReader:
+    """
+    增量解析压缩的 tar 流。feed() 每次返回本块数据中完整出现的 (文件名, 内容);
+    只缓存当前成员文件, 超过 MAX_MEMBER_SIZE 的成员抛出 ValueError。
+    """
+
+    def __init__(self, compression: Optional[str] = None):
+        self._compression = check_compression(compression) if compression else None
+        self._decompressor = None
+        self._zlib = False
+        self._head = b""
+        self._buffer = bytearray()
+        self._need = BLOCK          # 当前状态需要的字节数
+        self._member: Optional[Tuple[str, str, int]] = None  # (文件名, 类型, 内容大小)
+        self._long_name: Optional[str] = None
+        self._pax_path: Optional[str] = None
+        self.finished = False
+
+    def _init_decompressor(self, head: bytes) -> None:
+        compression = self._compression
+        if compression is None:
+            compression = COMPRESSION_ZST if head.startswith(_ZSTD_MAGIC) else COMPRESSION_GZ
+            if compression == COMPRESSION_GZ and not head.startswith(_GZIP_MAGIC):
+                raise ValueError("无法识别的归档格式, 需要 tar.gz 或 tar.zst")
+            check_compression(compression)
+        if compression == COMPRESSION_ZST:
+            self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            self._decompressor = zlib.decompressobj(31)
+            self._zlib = True
+
+    def _decompress(self, chunk: bytes) -> Iterator[bytes]:
+        if self._zlib:
+            data = chunk
+            while data:
+                out = self._decompressor.decompress(data, _DECOMPRESS_SLICE)
+                data = self._decompressor.unconsumed_tail
+                if out:
+                    yield out
+                if self._decompressor.eof:
+                    break
+        else:
+            for start in range(0, len(chunk), _ZSTD_INPUT_SLICE):
+                if getattr(self._decompressor, "eof", False):
+                    break
+                try:
+                    out = self._decompressor.decompress(chunk[start:start + _ZSTD_INPUT_SLICE])
+                except zstandard.ZstdError as e:
+                    raise ValueError(f"zstd 解压失败: {e}")
+                if out:
+                    yield out
+
+    def feed(self, chunk: bytes) -> Iterator[Tuple[str, bytes]]:
+        if self.finished or not chunk:
+            return
+        if self._decompressor is None:
+            self._head += chunk
+            if len(self._head) < 4:
+                return
+            chunk, self._head = self._head, b""
+            self._init_decompressor(chunk)
+        for data in self._decompress(chunk):
+            self._buffer += data
+            yield from self._drain()
+            if self.finished:
+                return
+
+    def close(self) -> None:
+        """数据全部喂入后调用; 未读到 tar 结束标记时抛出 ValueError。"""
+        if not self.finished:
+            raise ValueError("归档数据不完整")
+
+    def _drain(self) -> Iterator[Tuple[str, bytes]]:
+        while len(self._buffer) >= self._need:
+            if self._member is None:
+                header = bytes(self._buffer[:BLOCK])
+                del self._buffer[:BLOCK]
+                if header == b"\0" * BLOCK:
+                    # 结束标记; 之后的数据忽略
+                    self.finished = True
+                    self._buffer.clear()
+                    return
+                self._start_member(header)
+                continue
+            name, kind, size = self._member
+            padded = size + (-size) % BLOCK
+            data = bytes(self._buffer[:size])
+            del self._buffer[:padded]
+            self._member = None
+            self._need = BLOCK
+            if kind == "L":
+                self._long_name = data.rstrip(b"\0").decode("utf-8", "replace")
+            elif kind == "x":
+                self._pax_path = _parse_pax(data).get("path", self._pax_path)
+            elif kind in ("0", "\0", "7"):
+                name = self._pax_path or self._long_name or name
+                self._pax_path = None
+                self._long_name = None
+                yield name, data
+
+    def _start_member(self, header: bytes) -> None:
+        checksum = _parse_octal(header[148:156])
+        if checksum != sum(header[:148]) + 8 * 32 + sum(header[156:]):
+            raise ValueError("tar 头校验失败")
+        name = header[0:100].split(b"\0", 1)[0].decode("utf-8", "replace")
+        prefix = header[345:500].split(b"\0", 1)[0].decode("utf-8", "replace") if header[257:262] == b"ustar" else ""
+        if prefix:
+            name = f"{prefix}/{name}"
+        kind = chr(header[156]) if header[156] else "\0"
+        size = _parse_octal(header[124:136])
+        if size > MAX_MEMBER_SIZE:
+            raise ValueError(f"归档成员过大: {name} ({size} 字节)")
+        # 目录、链接、全局 pax 头等类型在 _drain 中读取后丢弃
+        self._member = (name, kind, size)
+        self._need = size + (-size) % BLOCK
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+"""
+性能诊断工具(默认关闭, 见 config.yaml 的 PROFILING):
+- ProfilingMiddleware: 按请求采样, 耗时超过阈值的请求写出火焰图文件到 output_dir,
+  并对所有超过阈值的请求记录慢请求日志。开启方式: PROFILING.enable 对所有请求开启;
+  或 PROFILING.allow_header 时由携带 X-Profile: 1 与有效 API Token 的请求单独开启。
+  采样引擎优先使用 pyinstrument(输出 speedscope JSON), 未安装时退回 cProfile(输出 .prof)。
+- LoopStallDetector: 后台线程监测事件循环心跳, 循环被同步代码阻塞超过阈值时记录阻塞处的调用栈。
+"""
+
+import os, re, sys, time, cProfile, asyncio, logging, threading, traceback
+from datetime import datetime
+from typing import Any, Optional
+
+from .security import has_valid_token
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pragma: no cover - 可选依赖
+    _Pyinstrument = None
+    SpeedscopeRenderer = None
+
+
+logger = logging.getLogger(__name__)
+
+ENGINE_AUTO = "auto"
+ENGINE_PYINSTRUMENT = "pyinstrument"
+ENGINE_CPROFILE = "cprofile"
+ENGINES = (ENGINE_AUTO, ENGINE_PYINSTRUMENT, ENGINE_CPROFILE)
+PROFILE_HEADER = b"x-profile"
+
+
+def resolve_engine(engine: str) -> str:
+    if engine not in ENGINES:
+        raise ValueError(f"未知的采样引擎: {engine}, 可选: {', '.join(ENGINES)}")
+    if engine == ENGINE_AUTO:
+        return ENGINE_PYINSTRUMENT if _Pyinstrument is not None else ENGINE_CPROFILE
+    if engine == ENGINE_PYINSTRUMENT and _Pyinstrument is None:
+        raise ValueError("采样引擎 pyinstrument 需要安装 pyinstrument")
+    return engine
+
+
+class _Session:
+    """一次请求的采样; 同一进程同一时刻只允许一个(两种引擎都不支持在同一线程上嵌套)。"""
+
+    def __init__(self, engine: str, interval_ms: float):
+        self.engine = engine
+        if engine == ENGINE_PYINSTRUMENT:
+            self._profiler = _Pyinstrument(interval=max(0.0001, interval_ms / 1000), async_mode="enabled")
+        else:
+            self._profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        if self.engine == ENGINE_PYINSTRUMENT:
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if self.engine == ENGINE_PYINSTRUMENT:
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def write(self, path_base: str) -> str:
+        if self.engine == ENGINE_PYINSTRUMENT:
+            path = path_base + ".speedscope.json"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output(SpeedscopeRenderer()))
+        else:
+            path = path_base + ".prof"
+            self._profiler.dump_stats(path)
+        return path
+
+
+class ProfilingMiddleware:
+    """ASGI 中间件; 配置在每次请求时从 app.state.config 读取。"""
+
+    def __init__(self, app: Any):
+        self.app = app
+        self._busy = False
+
+    def _wants_profile(self, scope: dict, cfg: Any) -> bool:
+        if cfg.profiling.enable:
+            return True
+        if not cfg.profiling.allow_header:
+            return False
+        headers = dict(scope.get("headers") or [])
+        if headers.get(PROFILE_HEADER, b"").strip() not in (b"1", b"true"):
+            return False
+        return has_valid_token(cfg, headers.get(b"authorization", b"").decode("latin-1"))
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        cfg = scope["app"].state.config
+        session: Optional[_Session] = None
+        if not self._busy and self._wants_profile(scope, cfg):
+            try:
+                session = _Session(resolve_engine(cfg.profiling.engine), cfg.profiling.interval_ms)
+                session.start()
+                self._busy = True
+            except Exception as e:
+                logger.warning(f"启动请求采样失败: {e}")
+                session = None
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if session is not None:
+                session.stop()
+                self._busy = False
+            threshold_ms = cfg.profiling.threshold_ms
+            if elapsed_ms >= threshold_ms:
+                logger.warning(f"慢请求: {scope.get('method')} {scope.get('path')} 耗时 {elapsed_ms:.1f} ms")
+                if session is not None:
+                    await self._save(session, scope, cfg.profiling.output_dir, elapsed_ms)
+
+    @staticmethod
+    async def _save(session: _Session, scope: dict, output_dir: str, elapsed_ms: float) -> None:
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope.get("path", "")).strip("_") or "root"
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path_base = os.path.join(output_dir, f"{stamp}-{scope.get('method', '')}-{slug[:60]}-{int(elapsed_ms)}ms")
+
+        def write() -> str:
+            os.makedirs(output_dir, exist_ok=True)
+            return session.write(path_base)
+
+        try:
+            path = await asyncio.get_running_loop().run_in_executor(None, write)
+            logger.info(f"请求采样已保存: {path}")
+        except Exception as e:
+            logger.error(f"保存请求采样失败: {e}", exc_info=True)
+
+
+class LoopStallDetector:
+    """
+    事件循环阻塞检测: 循环内每 threshold/2 记录一次心跳, 监测线程发现心跳停滞超过阈值时,
+    抓取循环线程当前的调用栈并记录, 恢复后再记录阻塞总时长。开销仅为周期性的一次 call_later。
+    """
+
+    def __init__(self, threshold_ms: float = 100, stack_limit: int = 20):
+        self.threshold = max(1.0, float(threshold_ms)) / 1000
+        self.interval = self.threshold / 2
+        self.stack_limit = stack_limit
+        self.stalls = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._last_beat = 0.0
+        self._stalled_since: Optional[float] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        self._beat()
+        self._thread = threading.Thread(target=self._watch, name="loop-stall-detector", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _beat(self) -> None:
+        now = time.perf_counter()
+        stalled_since = self._stalled_since
+        if stalled_since is not None:
+            self._stalled_since = None
+            logger.warning(f"事件循环已恢复, 本次阻塞约 {(now - stalled_since) * 1000:.0f} ms")
+        self._last_beat = now
+        if not self._stopped.is_set():
+            self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval / 2):
+            last = self._last_beat
+            lag = time.perf_counter() - last - self.interval
+            if lag < self.threshold or self._stalled_since is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame, limit=self.stack_limit)) if frame is not None else ""
+            del frame
+            self.stalls += 1
+            self._stalled_since = last + self.interval
+            logger.warning(f"事件循环阻塞超过 {lag * 1000:.0f} ms, 阻塞处调用栈:\n{stack}")
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+"""
+加权随机抽样: 基于树状数组(Fenwick Tree)。
+- set/remove/pick 均为 O(log n)
+- 权重为 0 的键保留槽位但不会被抽中
+"""
+
+import random
+from typing import Dict, Hashable, List, Optional
+
+
+class WeightedSampler:
+    """按权重随机抽取键的采样器。"""
+
+    def __init__(self, capacity: int = 64):
+        self._capacity = max(1, int(capacity))
+        self._tree: List[float] = [0.0] * (self._capacity + 1)
+        self._weights: List[float] = [0.0] * self._capacity
+        self._keys: List[Optional[Hashable]] = [None] * self._capacity
+        self._slots: Dict[Hashable, int] = {}
+        self._free: List[int] = list(range(self._capacity - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    @property
+    def total(self) -> float:
+        return self._prefix_sum(self._capacity)
+
+    def _add(self, slot: int, delta: float) -> None:
+        i = slot + 1
+        while i <= self._capacity:
+            self._tree[i] += delta
+            i += i & (-i)
+
+    def _prefix_sum(self, count: int) -> float:
+        total = 0.0
+        i = count
+        while i > 0:
+            total += self._tree[i]
+            i -= i & (-i)
+        return total
+
+    def _grow(self) -> None:
+        """容量翻倍并以 O(n) 重建树。"""
+        old_capacity = self._capacity
+        self._capacity = old_capacity * 2
+        self._weights.extend([0.0] * old_capacity)
+        self._keys.extend([None] * old_capacity)
+        self._free.extend(range(self._capacity - 1, old_capacity - 1, -1))
+        self._tree = [0.0] * (self._capacity + 1)
+        for slot, weight in enumerate(self._weights):
+            i = slot + 1
+            self._tree[i] += weight
+            parent = i + (i & (-i))
+            if parent <= self._capacity:
+                self._tree[parent] += self._tree[i]
+
+    def get(self, key: Hashable) -> float:
+        slot = self._slots.get(key)
+        return 0.0 if slot is None else self._weights[slot]
+
+    def set(self, key: Hashable, weight: float) -> None:
+        """设置键的权重(负数按 0 处理)。"""
+        weight = max(0.0, float(weight))
+        slot = self._slots.get(key)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._free.pop()
+            self._slots[key] = slot
+            self._keys[slot] = key
+        delta = weight - self._weights[slot]
+        if delta:
+            self._weights[slot] = weight
+            self._add(slot, delta)
+
+    def remove(self, key: Hashable) -> None:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        if self._weights[slot]:
+            self._add(slot, -self._weights[slot])
+            self._weights[slot] = 0.0
+        self._keys[slot] = None
+        self._free.append(slot)
+
+    def pick(self, rng: Optional[random.Random] = None) -> Optional[Hashable]:
+        """按权重抽取一个键；总权重为 0 时返回 None。"""
+        total = self.total
+        if total <= 0:
+            return None
+        target = (rng or random).random() * total
+
+        # 自顶向下查找前缀和首次超过 target 的槽位
+        pos = 0
+        step = 1 << (self._capacity.bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt <= self._capacity and self._tree[nxt] <= target:
+                pos = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+
+        slot = min(pos, self._capacity - 1)
+        # 浮点误差可能落在权重为 0 的槽位上, 回退到最近的有效槽位
+        while slot >= 0 and self._weights[slot] <= 0:
+            slot -= 1
+        if slot < 0:
+            return None
+        return self._keys[slot]
@@ -10,6 +10,14 @@ from __future__ import annotations
 from fastapi import Request, HTTPException
 
 
+def has_valid_token(cfg, authorization: str) -> bool:
+    """不抛异常的鉴权判断(供中间件使用); 未启用鉴权时始终为 True。"""
+    if not cfg.api_token.enable:
+        return True
+    prefix = "Bearer "
+    return authorization.startswith(prefix) and authorization[len(prefix):].strip() == cfg.api_token.token
+
+
 def require_api_token(request: Request):
     cfg = request.app.state.config
     if not cfg.api_token.enable:
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+"""
+轻量链路追踪(默认关闭, 见 config.yaml 的 TRACING):
+- tracer.span(name, **attrs) / @traced(name): 记录一次调用的起止时间、父子关系与属性,
+  上下文经 contextvars 传递, 子 span 自动继承父 span 的 DedeUserID
+- 结束的 span 进入有界队列, 由后台线程按批导出: JSONL 文件或 OTLP/HTTP(JSON 编码, 无需 opentelemetry 依赖)
+- 关闭时 @traced 只多一次布尔判断, tracer.span 返回共享的空上下文
+"""
+
+import os, json, time, random, inspect, logging, functools, threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+UID_ATTRIBUTE = "DedeUserID"
+EXPORTER_JSONL = "jsonl"
+EXPORTER_OTLP = "otlp"
+EXPORTERS = (EXPORTER_JSONL, EXPORTER_OTLP)
+
+
+class _NoopSpan:
+    """追踪关闭或未被采样时使用的空 span。"""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+    def record_error(self, error: BaseException) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Span:
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "sampled", "attributes",
+                 "start_ns", "_started", "error", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        if parent is None:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_id = None
+            self.sampled = tracer.sample_ratio >= 1 or random.random() < tracer.sample_ratio
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.sampled = parent.sampled
+            uid = parent.attributes.get(UID_ATTRIBUTE)
+            if uid is not None:
+                attributes.setdefault(UID_ATTRIBUTE, uid)
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.start_ns = 0
+        self._started = 0.0
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        """记录被调用方吞掉的异常(span 本身不会因此抛出)。"""
+        self.error = f"{type(error).__name__}: {error}"
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        duration = time.perf_counter() - self._started
+        _current.reset(self._token)
+        if exc is not None and self.error is None:
+            self.record_error(exc)
+        if self.sampled:
+            self.tracer._finish(self, duration)
+
+
+def current_span() -> Any:
+    """当前上下文中的 span; 没有时返回空 span, 调用方无需判空。"""
+    return _current.get() or _NOOP
+
+
+@contextmanager
+def activate(span: Any) -> Any:
+    """在另一个任务中把 span 设为当前 span(如队列的后台 worker), 使其后的调用接在原调用链下。"""
+    token = _current.set(span if isinstance(span, Span) else None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+class JsonlSpanExporter:
+    """每个 span 一行 JSON, 追加写入本地文件。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, records: List[Dict[str, Any]]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        return None
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpSpanExporter:
+    """OTLP/HTTP 导出(JSON 编码), 发送到 <endpoint>/v1/traces, 可直接对接 OpenTelemetry Collector / Jaeger / Tempo。"""
+
+    def __init__(self, endpoint: str, service_name: str, headers: Optional[Dict[str, str]] = None, timeout: float = 5.0):
+        endpoint = endpoint.rstrip("/")
+        self.url = endpoint if endpoint.endswith("/v1/traces") else endpoint + "/v1/traces"
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=timeout, headers=headers or {})
+
+    def _payload(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        spans = []
+        for record in records:
+            span = {
+                "traceId": record["trace_id"],
+                "spanId": record["span_id"],
+                "name": record["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(record["start_time_unix_nano"]),
+                "endTimeUnixNano": str(record["end_time_unix_nano"]),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in record["attributes"].items()],
+                "status": {"code": 2, "message": record["error"]} if record["error"] else {"code": 1},
+            }
+            if record["parent_id"]:
+                span["parentSpanId"] = record["parent_id"]
+            spans.append(span)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "BilibiliCookieMgmt"}, "spans": spans}],
+            }]
+        }
+
+    def export(self, records: List[Dict[str, Any]]) -> None:
+        resp = self._client.post(self.url, json=self._payload(records))
+        resp.raise_for_status()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sample_ratio = 1.0
+        self.max_queue = 10000
+        self.flush_interval = 5.0
+        self.batch_size = 512
+        self.dropped = 0
+        self._exporter: Any = None
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    def configure(self, exporter: Any, sample_ratio: float = 1.0, flush_interval_seconds: float = 5.0,
+                  max_queue: int = 10000) -> None:
+        self.shutdown()
+        self._exporter = exporter
+        self.sample_ratio = min(1.0, max(0.0, float(sample_ratio)))
+        self.flush_interval = max(0.1, float(flush_interval_seconds))
+        self.max_queue = max(1, int(max_queue))
+        self.dropped = 0
+        self._stopped.clear()
+        self.enabled = True
+
+    def span(self, name: str, **attributes: Any) -> Any:
+        if not self.enabled:
+            return _NOOP
+        attrs = {key: value for key, value in attributes.items() if value is not None}
+        return Span(self, name, _current.get(), attrs)
+
+    def _finish(self, span: Span, duration: float) -> None:
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append({
+            "name": span.name,
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "start_time_unix_nano": span.start_ns,
+            "end_time_unix_nano": span.start_ns + int(duration * 1e9),
+            "duration_ms": round(duration * 1000, 3),
+            "error": span.error,
+            "attributes": span.attributes,
+        })
+        if self._thread is None:
+            self._start_worker()
+        elif len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def _start_worker(self) -> None:
+        with self._thread_lock:
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """同步导出队列中的 span, 返回导出数量; 导出失败的批次丢弃并记录日志。"""
+        exported = 0
+        while self._queue and self._exporter is not None:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            try:
+                self._exporter.export(batch)
+                exported += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.warning(f"导出追踪数据失败, 丢弃 {len(batch)} 个 span: {e}")
+                break
+        return exported
+
+    def shutdown(self) -> None:
+        """停止后台线程并导出剩余 span。"""
+        self.enabled = False
+        self._stopped.set()
+        self._wakeup.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        if self._exporter is not None:
+            try:
+                self._exporter.close()
+            except Exception:
+                pass
+            self._exporter = None
+        self._queue.clear()
+
+
+tracer = Tracer()
+
+
+def traced(name: str, uid_arg: Optional[str] = "dede_user_id") -> Callable:
+    """
+    异步函数/方法的追踪装饰器。uid_arg 指定的参数值记为 span 的 DedeUserID 属性,
+    参数不存在时沿用父 span 的值。
+    """
+
+    def decorate(func: Callable) -> Callable:
+        params = list(inspect.signature(func).parameters)
+        index = params.index(uid_arg) if uid_arg and uid_arg in params else None
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not tracer.enabled:
+                return await func(*args, **kwargs)
+            uid = None
+            if index is not None:
+                uid = kwargs.get(uid_arg) if uid_arg in kwargs else (args[index] if len(args) > index else None)
+            with tracer.span(name, **{UID_ATTRIBUTE: str(uid) if uid is not None else None}):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def build_exporter(cfg: Any) -> Any:
+    """根据 TracingConfig 构建导出器。"""
+    if cfg.exporter == EXPORTER_JSONL:
+        return JsonlSpanExporter(cfg.jsonl_path)
+    if cfg.exporter == EXPORTER_OTLP:
+        return OtlpHttpSpanExporter(cfg.otlp_endpoint, cfg.service_name, headers=cfg.otlp_headers)
+    raise ValueError(f"未知的追踪导出器: {cfg.exporter}, 可选: {', '.join(EXPORTERS)}")
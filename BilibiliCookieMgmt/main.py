@@ -10,81 +10,401 @@ from __future__ import annotations
   python main.py
 或: 
   uvicorn new_code.main:app --reload --host 0.0.0.0 --port 18000
+启动耗时按阶段记录在日志的 startup_timing 行中。
 """
 
-import uvicorn, logging
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import logging, asyncio
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from core.api.routes import auth_router, cookies_router
-from core.config import load_config
+from core.api.responses import SerializedDocCache
+from core.api.routes import auth_router, cookies_router, notifications_router, scheduler_router, wbi_router
+from core.config import AppConfig, ConfigWatcher, diff_config, load_config, resolve_config_path
 from core.infrastructure import BilibiliClient
-from core.infrastructure.notifications import GotifyNotificationService, NoopNotificationService
-from core.infrastructure.repositories import CookieRepository
-from core.scheduler import AppScheduler
+from core.infrastructure.notifications import NoopNotificationService, NotificationService
+from core.infrastructure.repositories import CookieRepository, CookieDirWatcher, CheckHistoryRepository
+from core.infrastructure.repositories.schema_upgrade import upgrade_storage
+from core.scheduler import AppScheduler, LeaderElection, ShardMembership
 from core.services import CookieService
+from core.services.usage_feedback import UsageFeedback
 from core.utils import setup_logging
+from core.utils.profiling import LoopStallDetector, ProfilingMiddleware
+from core.utils.tracing import build_exporter, tracer
+
+# 任一变化都会重建通知服务的配置段
+NOTIFICATION_SECTIONS = ("gotify", "webhook", "telegram", "notification")
+
+# 热重载无法应用、需要重启才能生效的配置段: 监听地址、存储、选主与分片成员身份
+RESTART_REQUIRED = ("host", "port", "storage", "config_reload", "scheduler.leader_election", "scheduler.sharding")
+
+
+def _format_timing(timing: dict) -> str:
+    return " ".join(f"{stage}={value * 1000:.0f}ms" for stage, value in timing.items())
+
+
+def _keep_sections(old_config: AppConfig, new_config: AppConfig, names: list) -> None:
+    """把需要重启的配置段还原为当前运行值, 使 app.state.config 与实际生效的配置一致。"""
+    for name in names:
+        section, _, sub = name.partition(".")
+        if sub:
+            setattr(getattr(new_config, section), sub, getattr(getattr(old_config, section), sub))
+        else:
+            setattr(new_config, section, getattr(old_config, section))
+
+
+def _build_feedback(config: AppConfig) -> UsageFeedback:
+    cfg = config.feedback
+    return UsageFeedback(cfg.window_seconds, cfg.error_threshold, cfg.error_ratio, cfg.auth_codes, cfg.cooldown_seconds)
+
+
+def _build_notification(config: AppConfig) -> NotificationService:
+    """按配置组装通知渠道, 每个渠道经扇出服务独立排队发送; 未启用任何渠道时为空实现。"""
+    workers = []
+    queue_size = config.notification.queue_size
+    if config.gotify.enable and config.gotify.url and config.gotify.token:
+        from core.infrastructure.notifications.gotify import GotifyNotificationService
+
+        channel = GotifyNotificationService(
+            url=config.gotify.url,
+            token=config.gotify.token,
+            default_title=config.gotify.title,
+            default_priority=config.gotify.priority,
+        )
+        workers.append((channel, config.gotify))
+    if config.webhook.enable and config.webhook.url:
+        from core.infrastructure.notifications.webhook import WebhookNotificationService
+
+        workers.append((WebhookNotificationService(config.webhook.url, headers=config.webhook.headers), config.webhook))
+    if config.telegram.enable and config.telegram.api_url and config.telegram.chat_id:
+        from core.infrastructure.notifications.telegram import TelegramNotificationService
+
+        workers.append((TelegramNotificationService(config.telegram.api_url, config.telegram.chat_id), config.telegram))
+    if not workers:
+        return NoopNotificationService()
+
+    from core.infrastructure.notifications.fanout import ChannelWorker, FanoutNotificationService
+
+    outbox = None
+    if config.notification.outbox:
+        from core.infrastructure.notifications.outbox import NotificationOutbox
+
+        outbox = NotificationOutbox(
+            config.notification.outbox_path,
+            retry_base_seconds=config.notification.retry_base_seconds,
+            retry_max_seconds=config.notification.retry_max_seconds,
+            dedupe_seconds=config.notification.dedupe_seconds,
+            max_age_seconds=config.notification.max_age_seconds,
+        )
+    return FanoutNotificationService(
+        [ChannelWorker(channel, queue_size, route.min_priority, route.max_priority) for channel, route in workers],
+        drain_timeout_seconds=config.notification.drain_timeout_seconds,
+        outbox=outbox,
+    )
+
+
+def _start_notification(notification: NotificationService) -> None:
+    # 启用发件箱时开始补发上次未送达的通知
+    start = getattr(notification, "start", None)
+    if callable(start):
+        start()
+
+
+async def _close_notification(notification: NotificationService) -> None:
+    try:
+        if hasattr(notification, "aclose"):
+            await notification.aclose()  # type: ignore
+    except Exception:
+        pass
+
+
+def _configure_tracing(config: AppConfig, logger: logging.Logger) -> None:
+    try:
+        tracer.configure(
+            build_exporter(config.tracing),
+            sample_ratio=config.tracing.sample_ratio,
+            flush_interval_seconds=config.tracing.flush_interval_seconds,
+            max_queue=config.tracing.max_queue,
+        )
+        logger.info(f"链路追踪已启用, 导出方式: {config.tracing.exporter}")
+    except Exception as e:
+        logger.error(f"链路追踪初始化失败: {e}")
+
 
 def create_app() -> FastAPI:
+    timing = {"imports": time.perf_counter() - _IMPORT_STARTED}
+    stage_started = time.perf_counter()
+
+    def mark(stage: str) -> None:
+        nonlocal stage_started
+        now = time.perf_counter()
+        timing[stage] = now - stage_started
+        stage_started = now
+
     # 初始化日志
     setup_logging()
     logger = logging.getLogger(__name__)
 
     # 加载配置
-    config = load_config()
+    config_path = resolve_config_path()
+    config = load_config(config_path)
     logger.info(f"配置加载完成, 端口: {config.port}")
+    mark("config")
 
-    repository = CookieRepository(base_dir=config.storage.cookie_dir)
+    if config.tracing.enable:
+        _configure_tracing(config, logger)
+
+    repository = CookieRepository(
+        base_dir=config.storage.cookie_dir,
+        storage_format=config.storage.format,
+        write_behind=config.storage.write_behind,
+        layout=config.storage.layout,
+        load_workers=config.storage.load_workers,
+        load_mode=config.storage.load_mode,
+    )
+    history = CheckHistoryRepository(base_dir=config.storage.history_dir, capacity=config.storage.history_capacity)
     # 通知服务
-    if config.gotify.enable and config.gotify.url and config.gotify.token:
-        notification = GotifyNotificationService(
-            url=config.gotify.url,
-            token=config.gotify.token,
-            default_title=config.gotify.title,
-            default_priority=config.gotify.priority,
-        )
-    else:
-        notification = NoopNotificationService()
+    notification = _build_notification(config)
 
     bilibili_client = BilibiliClient()
-    service = CookieService(repository=repository, notification=notification, bilibili_client=bilibili_client)
+    service = CookieService(
+        repository=repository,
+        notification=notification,
+        bilibili_client=bilibili_client,
+        history=history,
+        test_cache_ttl_seconds=config.bilibili.test_cache_ttl_seconds,
+        check_fresh_seconds=config.bilibili.check_fresh_seconds,
+        feedback=_build_feedback(config),
+    )
 
-    # 路由
-    scheduler = AppScheduler(service=service, config=config)
+    # 调度: 启用分片时每个实例处理自己的分片, 否则通过选主只在一个 worker 上运行
+    shard = None
+    election = None
+    sharding_cfg = config.scheduler.sharding
+    leader_cfg = config.scheduler.leader_election
+    if sharding_cfg.enable:
+        shard = ShardMembership(
+            sharding_cfg.members_dir,
+            heartbeat_seconds=sharding_cfg.heartbeat_seconds,
+            member_ttl_seconds=sharding_cfg.member_ttl_seconds,
+            vnodes=sharding_cfg.vnodes,
+        )
+    elif leader_cfg.enable:
+        election = LeaderElection(leader_cfg.lease_file, leader_cfg.lease_seconds, leader_cfg.heartbeat_seconds)
+    # 存储维护会改写共享目录中的文件: 分片模式下各实例都运行调度, 维护仍只由持有租约的实例执行
+    maintenance_lease = election
+    if shard is not None:
+        maintenance_lease = LeaderElection(leader_cfg.lease_file, leader_cfg.lease_seconds, leader_cfg.heartbeat_seconds)
+    scheduler = AppScheduler(service=service, config=config, shard=shard)
+    stall_detector = None
+
+    async def apply_config(new_config: AppConfig) -> None:
+        """应用热重载的配置差异; 需要重启的配置段只记录警告。"""
+        nonlocal stall_detector
+        old_config = app.state.config
+        changes = diff_config(old_config, new_config)
+        if not changes:
+            return
+        pending = [name for name in changes if name in RESTART_REQUIRED]
+        applied = [name for name in changes if name not in RESTART_REQUIRED]
+        _keep_sections(old_config, new_config, pending)
+        # 鉴权与请求采样在每次请求时读取 app.state.config, 替换后即生效
+        app.state.config = new_config
+        if "bilibili" in changes:
+            service.configure(new_config.bilibili.test_cache_ttl_seconds, new_config.bilibili.check_fresh_seconds)
+        if "feedback" in changes:
+            cfg = new_config.feedback
+            service.feedback.configure(cfg.window_seconds, cfg.error_threshold, cfg.error_ratio, cfg.auth_codes, cfg.cooldown_seconds)
+        if any(name in changes for name in NOTIFICATION_SECTIONS):
+            previous, service.notification = service.notification, _build_notification(new_config)
+            _start_notification(service.notification)
+            await _close_notification(previous)
+        if "tracing" in changes:
+            if new_config.tracing.enable:
+                _configure_tracing(new_config, logger)
+            else:
+                tracer.shutdown()
+        if new_config.profiling.slow_callback_ms != old_config.profiling.slow_callback_ms:
+            if stall_detector is not None:
+                stall_detector.stop()
+                stall_detector = None
+            if new_config.profiling.slow_callback_ms > 0:
+                stall_detector = LoopStallDetector(new_config.profiling.slow_callback_ms)
+                stall_detector.start()
+        await scheduler.reconfigure(new_config)
+        if applied:
+            logger.info(f"配置已热重载, 已生效: {', '.join(applied)}")
+        if pending:
+            logger.warning(f"以下配置修改需要重启服务才能生效: {', '.join(pending)}")
+
+    config_watcher = ConfigWatcher(config_path, apply_config, config.config_reload.poll_interval_seconds)
+    mark("build")
+
+    async def run_upgrade():
+        try:
+            # 已是最新版本时只读取版本文件
+            await upgrade_storage(repository, workers=config.storage.upgrade_workers)
+        except Exception as e:
+            logger.error(f"存储升级异常: {e}", exc_info=True)
+
+    async def convert_storage():
+        try:
+            result = await repository.migrate_layout()
+            if result["moved"] or result["conflicts"] or result["failed"]:
+                logger.info(f"目录布局迁移完成({repository.layout}): {result}")
+        except Exception as e:
+            logger.error(f"目录布局迁移异常: {e}", exc_info=True)
+        try:
+            result = await repository.convert_storage()
+            if result["converted"] or result["failed"]:
+                logger.info(f"存储格式转换完成({repository.storage_format}): {result}")
+        except Exception as e:
+            logger.error(f"存储格式转换异常: {e}", exc_info=True)
+
+    async def warm_up():
+        """后台并行加载全部文档, 建立缓存与索引; 完成前服务已可响应健康检查, 请求按需读取。"""
+        started = time.perf_counter()
+        try:
+            result = await service.warm_up()
+            timing["warm_up"] = time.perf_counter() - started
+            logger.info(
+                f"startup_timing: {_format_timing(timing)} "
+                f"(预热 {result['loaded']}/{result['files']} 个文件, {result['files_per_sec']} 个/秒)"
+            )
+        except Exception as e:
+            logger.error(f"仓库预热异常: {e}", exc_info=True)
+        finally:
+            app.state.ready = True
+        # 格式转换/布局迁移会读写全部文件, 放在预热之后避免与之争抢磁盘; 开启选主或分片时由租约持有者执行
+        if config.storage.convert_existing and maintenance_lease is None:
+            await convert_storage()
 
     @asynccontextmanager
     async def lifespan(app: FastAPI):
+        nonlocal stall_detector
         logger.info("应用程序启动中...")
-        await scheduler.start(app)
-        logger.info("调度器已启动")
+        lifespan_started = time.perf_counter()
+        # 存储维护(升级、布局迁移、格式转换)会改写文件: 开启选主或分片时只由租约持有者在取得租约后执行, 否则启动时执行
+        maintenance = None
+        warmer = None
+        lease_task = None
+
+        async def leader_maintenance():
+            await run_upgrade()
+            if config.storage.convert_existing:
+                # 与预热错开, 避免争抢磁盘
+                if warmer is not None:
+                    await asyncio.wait([warmer])
+                await convert_storage()
+
+        async def start_maintenance():
+            nonlocal maintenance
+            if maintenance is None:
+                maintenance = asyncio.create_task(leader_maintenance())
+
+        async def on_elected():
+            await scheduler.start(app)
+            await start_maintenance()
+
+        async def keep_running():
+            # 分片模式下失去维护租约不影响本实例的调度
+            pass
+
+        if maintenance_lease is None:
+            await run_upgrade()
+        elector = None
+        if shard is not None:
+            shard.heartbeat()
+            elector = asyncio.create_task(shard.run())
+            lease_task = asyncio.create_task(maintenance_lease.run(on_elected=start_maintenance, on_demoted=keep_running))
+            await scheduler.start(app)
+            logger.info(f"调度器已启动(分片模式, 实例 {shard.member_id}, 当前 {len(shard.ring.members)} 个实例)")
+        elif election is not None:
+            elector = asyncio.create_task(election.run(on_elected=on_elected, on_demoted=scheduler.stop))
+            logger.info(f"调度器选主已启动, 租约文件: {leader_cfg.lease_file}")
+        else:
+            await scheduler.start(app)
+            logger.info("调度器已启动")
+        _start_notification(service.notification)
+        warmer = asyncio.create_task(warm_up())
+        flusher = asyncio.create_task(repository.flush_loop(config.storage.flush_interval_seconds)) if config.storage.write_behind else None
+        watcher = None
+        if config.storage.watch:
+            dir_watcher = CookieDirWatcher(
+                repository,
+                poll_interval_seconds=config.storage.watch_poll_interval_seconds,
+                on_change=service.on_external_change,
+            )
+            watcher = asyncio.create_task(dir_watcher.run())
+        reloader = asyncio.create_task(config_watcher.run()) if config.config_reload.enable else None
+        if config.profiling.slow_callback_ms > 0:
+            stall_detector = LoopStallDetector(config.profiling.slow_callback_ms)
+            stall_detector.start()
+        timing["lifespan"] = time.perf_counter() - lifespan_started
+        logger.info(f"startup_timing: {_format_timing(timing)} (开始接受请求, 仓库预热在后台进行)")
         try:
             yield
         finally:
             logger.info("应用程序正在关闭...")
+            if stall_detector is not None:
+                stall_detector.stop()
+                stall_detector = None
+            for task in (reloader, elector, lease_task, maintenance, warmer, flusher, watcher):
+                if task and not task.done():
+                    task.cancel()
+                    try:
+                        await task
+                    except asyncio.CancelledError:
+                        pass
             await scheduler.stop()
+            if maintenance_lease is not None and maintenance_lease.is_leader:
+                try:
+                    maintenance_lease.release()
+                except Exception as e:
+                    logger.warning(f"释放调度器租约失败: {e}")
+            if shard is not None:
+                shard.leave()
             try:
-                if hasattr(notification, "aclose"):
-                    await notification.aclose()  # type: ignore
-            except Exception:
-                pass
+                written = await repository.flush()
+                if written:
+                    logger.info(f"缓冲写入已落盘: {written} 个文档")
+            except Exception as e:
+                logger.error(f"缓冲写入落盘异常: {e}", exc_info=True)
+            await service.aclose()
+            await _close_notification(service.notification)
             try:
                 await bilibili_client.aclose()
             except Exception:
                 pass
+            tracer.shutdown()
 
     app = FastAPI(title="BilibiliCookieMgmt v2 API", version="2.0.0", lifespan=lifespan)
     app.state.config = config
     app.state.cookie_service = service
+    app.state.response_cache = SerializedDocCache()
+    app.state.shard = shard
+    app.state.leader_election = election
+    app.state.ready = False
+    app.state.startup_timing = timing
+    app.state.config_watcher = config_watcher
+    app.add_middleware(ProfilingMiddleware)
 
     app.include_router(cookies_router, prefix="/api/v1")
     app.include_router(auth_router, prefix="/api/v1")
+    app.include_router(scheduler_router, prefix="/api/v1")
+    app.include_router(wbi_router, prefix="/api/v1")
+    app.include_router(notifications_router, prefix="/api/v1")
 
     @app.get("/api/v1/health", tags=["health"])
     async def health_check():
-        return {"status": "ok"}
+        # ready 为 False 时仓库仍在后台预热, 接口可用但首次列表/统计可能较慢
+        return {"status": "ok", "ready": app.state.ready}
 
     # 主页
     base_dir = Path(__file__).resolve().parent
@@ -106,6 +426,8 @@ def create_app() -> FastAPI:
             return FileResponse(str(index_file))
         return {"status": "ok", "message": root_message}
 
+    mark("app")
+    logger.info(f"startup_timing: {_format_timing(timing)}")
     return app
 
 
@@ -113,5 +435,7 @@ app = create_app()
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     cfg = app.state.config
     uvicorn.run(app, host=cfg.host, port=cfg.port)
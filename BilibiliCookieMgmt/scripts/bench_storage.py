@@ -0,0 +1,134 @@
+"""
+存储格式基准测试: 比较 pretty / compact / msgpack 三种落盘格式的
+- 磁盘占用(写放大)
+- 状态更新写入耗时
+- list / get 读取与解析耗时(每轮使用新的仓库实例, 不计入文档缓存)
+
+使用示例:
+  python scripts/bench_storage.py --count 2000 --rounds 3
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+def _ensure_backend_importable():
+    backend_root = Path(__file__).resolve().parents[1]
+    if str(backend_root) not in sys.path:
+        sys.path.insert(0, str(backend_root))
+
+
+def _build_raw(uid: str) -> Dict[str, Any]:
+    def cookie(name: str, value: str) -> Dict[str, Any]:
+        return {"name": name, "value": value, "http_only": 0, "expires": 1893456000, "secure": 0}
+
+    return {
+        "is_new": False,
+        "mid": int(uid),
+        "token_info": {
+            "mid": int(uid),
+            "access_token": f"access-{uid}" * 2,
+            "refresh_token": f"refresh-{uid}" * 2,
+            "expires_in": 15552000,
+        },
+        "cookie_info": {
+            "cookies": [
+                cookie("SESSDATA", f"sess%2C{uid}%2Cabcdef0123456789"),
+                cookie("bili_jct", f"csrf{uid}0123456789abcdef"),
+                cookie("buvid3", f"BUVID3-{uid}-0000-0000-000000000000infoc"),
+                cookie("buvid4", f"BUVID4-{uid}-0000-0000-000000000000"),
+                cookie("DedeUserID", uid),
+                cookie("DedeUserID__ckMd5", "0123456789abcdef"),
+            ],
+            "domains": [".bilibili.com", ".biligame.com", ".bigfun.cn", ".bigfunapp.cn", ".dreamcast.hk"],
+        },
+        "sso": [
+            "https://passport.bilibili.com/api/v2/sso",
+            "https://passport.biligame.com/api/v2/sso",
+            "https://passport.bigfunapp.cn/api/v2/sso",
+        ],
+        "hint": "",
+    }
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.iterdir() if p.is_file())
+
+
+async def bench_format(fmt: str, count: int, rounds: int) -> Dict[str, Any]:
+    from core.infrastructure.repositories.cookie_repository import CookieRepository
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        repo = CookieRepository(temp_dir, storage_format=fmt)
+        ids: List[str] = [str(10_000_000 + i) for i in range(count)]
+        for uid in ids:
+            await repo.save_from_raw(_build_raw(uid))
+
+        started = time.perf_counter()
+        for uid in ids:
+            await repo.update_check_status(uid, valid=True)
+        update_seconds = time.perf_counter() - started
+
+        # 仓库按文件签名缓存已解析的文档, 每轮使用新的仓库实例, 计时的是读取与解析而不是缓存命中
+        list_seconds: List[float] = []
+        get_seconds: List[float] = []
+        for _ in range(rounds):
+            reader = CookieRepository(temp_dir, storage_format=fmt)
+            started = time.perf_counter()
+            await reader.list()
+            list_seconds.append(time.perf_counter() - started)
+
+            reader = CookieRepository(temp_dir, storage_format=fmt)
+            started = time.perf_counter()
+            for uid in ids:
+                await reader.get(uid)
+            get_seconds.append(time.perf_counter() - started)
+
+        return {
+            "format": fmt,
+            "bytes": _dir_size(Path(temp_dir)),
+            "update_ms_per_doc": update_seconds * 1000 / count,
+            "list_ms": min(list_seconds) * 1000,
+            "get_ms_per_doc": min(get_seconds) * 1000 / count,
+        }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Cookie 存储格式基准测试")
+    parser.add_argument("--count", type=int, default=1000, help="生成的文档数量(默认 1000)")
+    parser.add_argument("--rounds", type=int, default=3, help="读取测试轮数, 取最优值(默认 3)")
+    parser.add_argument("--formats", type=str, nargs="*", default=None, help="要测试的格式(默认全部可用格式)")
+    return parser.parse_args()
+
+
+def main():
+    _ensure_backend_importable()
+    from core.infrastructure.repositories.doc_codec import FORMATS, check_format
+
+    args = parse_args()
+    formats = args.formats or list(FORMATS)
+    results = []
+    for fmt in formats:
+        try:
+            check_format(fmt)
+        except ValueError as e:
+            print(f"[SKIP] {fmt}: {e}")
+            continue
+        results.append(asyncio.run(bench_format(fmt, args.count, args.rounds)))
+
+    baseline = results[0] if results else None
+    print(f"\n{'format':<10}{'bytes':>12}{'size%':>8}{'update ms/doc':>16}{'list ms':>12}{'get ms/doc':>14}")
+    for r in results:
+        ratio = r["bytes"] * 100 / baseline["bytes"] if baseline else 100
+        print(f"{r['format']:<10}{r['bytes']:>12}{ratio:>7.1f}%{r['update_ms_per_doc']:>16.3f}{r['list_ms']:>12.1f}{r['get_ms_per_doc']:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+目录布局迁移脚本: 在 flat(<uid>.json) 与 hashed(ab/cd/<uid>.json) 布局之间移动已有文件。
+文件内容不变; 服务运行期间两种布局均可读取, 因此可在不停机的情况下执行, 中断后重新执行即可继续。
+同一账号在两种布局下都有文件时保留较新的一份, 较旧的一份备份为 <文件名>.conflict(计入 conflicts)。
+
+使用示例:
+  python scripts/migrate_layout.py --dir auto --layout hashed
+  python scripts/migrate_layout.py --dir ./data/cookie --layout flat
+"""
+
+from __future__ import annotations
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+
+def _project_root_from_this_file() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+def _ensure_backend_importable():
+    backend_root = _project_root_from_this_file()
+    if str(backend_root) not in sys.path:
+        sys.path.insert(0, str(backend_root))
+
+
+def _resolve_dir(dir_opt: str) -> Path:
+    """auto 时读取配置中的 storage.cookie_dir, 否则按显式路径解析(相对路径相对于当前目录)。"""
+    if dir_opt == "auto":
+        from core.config.loader import load_config  # type: ignore
+        return Path(load_config(None).storage.cookie_dir)
+    return Path(dir_opt)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="迁移 Cookie 目录布局(flat / hashed)")
+    parser.add_argument("--dir", type=str, default="auto", help="cookie 目录(auto 按配置解析)")
+    parser.add_argument("--layout", type=str, choices=["flat", "hashed"], default="hashed", help="目标布局(默认 hashed)")
+    return parser.parse_args()
+
+
+def main():
+    _ensure_backend_importable()
+    from core.infrastructure.repositories import CookieRepository  # type: ignore
+
+    args = parse_args()
+    cookie_dir = _resolve_dir(args.dir)
+    print(f"[INFO] dir={cookie_dir} (layout={args.layout})")
+    repo = CookieRepository(str(cookie_dir), layout=args.layout)
+    started = time.perf_counter()
+    result = asyncio.run(repo.migrate_layout())
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,9 +13,17 @@
       --dry-run false \
       --overwrite true
 
+  # 大批量: 多进程解析/转换 + 并发写入, 可断点续跑, 结束后校验
+  python scripts/migrate_v1_to_v2.py --src ./v1/data/cookie --dst auto \
+      --dry-run false --parallel true --workers 8 --writers 16
+
 注意: 
 - 默认 src=./v1/data/cookie, dst=从 v2 配置读取(./data/cookie)。
 - 如需写到 v2/data/cookie, 可显式指定 --dst ./v2/data/cookie。
+- 并行模式在 dst 下记录 .migrate_v1_to_v2.manifest(每行一个已完成文件、写入路径及文档哈希, 逐行刷新),
+  重跑时跳过已完成的文件; 校验阶段比较目标文档与清单哈希, 以及目标 raw 段与由源文件重新转换的 raw 段。
+- 并行模式按 STORAGE.layout / STORAGE.format 写入(--layout / --format 为 auto 时读取配置),
+  与服务使用同一路径规则; 任一布局下已存在同一账号的文件均视为已存在。
 """
 
 from __future__ import annotations
@@ -23,13 +31,18 @@ from __future__ import annotations
 import os
 import sys
 import json
+import time
 import asyncio
+import hashlib
 import argparse
 import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from datetime import datetime
 
+MANIFEST_FILENAME = ".migrate_v1_to_v2.manifest"
+
 
 def _project_root_from_this_file() -> Path:
     # 本脚本位于后端 scripts 下
@@ -387,6 +400,280 @@ async def migrate(src_dir: Path, dst_dir: Path, ids: Optional[List[str]] = None,
     }
 
 
+def _doc_hash(doc: Any) -> str:
+    """文档内容哈希: 与键顺序、缩进无关。"""
+    canonical = json.dumps(doc, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _resolve_storage_options(layout_opt: str, format_opt: str) -> Tuple[str, str]:
+    """解析并行模式的目标布局与落盘格式; auto 时读取 v2 配置的 STORAGE, 读取失败时使用 flat / pretty。"""
+    layout, storage_format = layout_opt, format_opt
+    if "auto" in (layout_opt, format_opt):
+        _ensure_backend_importable()
+        try:
+            from core.config.loader import load_config  # type: ignore
+            storage = load_config(None).storage
+            configured = (storage.layout, storage.format)
+        except Exception as e:
+            print(f"[WARN] 自动读取 v2 存储配置失败, 使用 flat / pretty: {e}")
+            configured = ("flat", "pretty")
+        layout = configured[0] if layout_opt == "auto" else layout_opt
+        storage_format = configured[1] if format_opt == "auto" else format_opt
+    return layout, storage_format
+
+
+def _convert_v1_file(file_path: str, storage_format: str = "pretty") -> Dict[str, Any]:
+    """
+    在工作进程中解析并转换单个 v1 文件(与 conform_raw 模式的转换规则一致), 按 storage_format 编码。
+    返回 {"src", "id", "data", "hash"} 或 {"src", "error"}。
+    """
+    fp = Path(file_path)
+    try:
+        with open(fp, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    except Exception as e:
+        return {"src": fp.name, "error": f"解析失败: {e}"}
+    if not isinstance(raw, dict):
+        return {"src": fp.name, "error": "解析失败: 顶层不是对象"}
+    dede_user_id = _extract_dede_user_id(raw)
+    if not dede_user_id:
+        return {"src": fp.name, "error": "缺少 DedeUserID"}
+    legacy = raw.get("_cookiemgmt", {}) if isinstance(raw.get("_cookiemgmt", {}), dict) else {}
+    raw_v2 = _build_v2_like_raw(raw)
+    managed = _build_managed_for_v2(raw_v2, legacy, _file_time_iso(fp))
+    doc = {"raw": raw_v2, "managed": managed}
+    _ensure_backend_importable()
+    from core.infrastructure.repositories.doc_codec import encode_doc  # type: ignore
+    data = encode_doc(doc, storage_format)
+    return {"src": fp.name, "id": dede_user_id, "data": data, "hash": _doc_hash(doc)}
+
+
+def _verify_entry(src_path: str, dst_path: str, expected_hash: Optional[str]) -> Optional[str]:
+    """校验单个迁移结果, 一致时返回 None, 否则返回原因。"""
+    from core.infrastructure.repositories.doc_codec import decode_doc  # type: ignore
+
+    try:
+        with open(dst_path, "rb") as f:
+            dst_doc = decode_doc(f.read())
+    except FileNotFoundError:
+        return "目标文件不存在"
+    except Exception as e:
+        return f"目标文件无法解析: {e}"
+    if expected_hash and _doc_hash(dst_doc) != expected_hash:
+        return "目标文档哈希与清单不一致"
+    try:
+        with open(src_path, "r", encoding="utf-8") as f:
+            src_raw = json.load(f)
+    except FileNotFoundError:
+        return None  # 源文件已移除时仅校验清单哈希
+    except Exception as e:
+        return f"源文件无法解析: {e}"
+    if _doc_hash(_build_v2_like_raw(src_raw)) != _doc_hash(dst_doc.get("raw")):
+        return "目标 raw 段与源文件不一致"
+    return None
+
+
+def _load_manifest(path: Path) -> Dict[str, Dict[str, Any]]:
+    """读取检查点清单: 源文件名 -> {"src", "id", "hash"}; 忽略中断时写了一半的行。"""
+    entries: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and entry.get("src"):
+                    entries[entry["src"]] = entry
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+class _Progress:
+    """按固定间隔在同一行输出进度与吞吐。"""
+
+    def __init__(self, total: int, label: str, enabled: bool = True, interval: float = 1.0):
+        self.total = total
+        self.label = label
+        self.enabled = enabled
+        self.interval = interval
+        self.done = 0
+        self.started = time.perf_counter()
+        self._last = 0.0
+
+    def advance(self, count: int = 1) -> None:
+        self.done += count
+        now = time.perf_counter()
+        if self.enabled and (now - self._last >= self.interval or self.done >= self.total):
+            self._last = now
+            self._print(now)
+
+    def _print(self, now: float) -> None:
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.done / elapsed
+        remaining = (self.total - self.done) / rate if rate > 0 else 0.0
+        sys.stderr.write(f"\r[{self.label}] {self.done}/{self.total} {rate:.0f} 文件/秒 剩余约 {remaining:.0f}s ")
+        sys.stderr.flush()
+
+    def finish(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        if self.enabled and self.total:
+            # advance 在完成最后一个文件时已输出最终进度
+            sys.stderr.write("\n")
+        return elapsed
+
+
+def _make_pool(workers: int) -> Executor:
+    return ProcessPoolExecutor(max_workers=workers) if workers > 1 else ThreadPoolExecutor(max_workers=1)
+
+
+async def _map_bounded(executor: Executor, fn, args_list: Iterable[Tuple[Any, ...]], limit: int):
+    """在执行器中运行 fn, 同时在途的任务不超过 limit, 按完成顺序产出结果。"""
+    loop = asyncio.get_running_loop()
+    pending: Set[asyncio.Future] = set()
+    for args in args_list:
+        pending.add(loop.run_in_executor(executor, fn, *args))
+        if len(pending) >= limit:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for fut in done:
+            yield fut.result()
+
+
+async def verify_migration(src_dir: Path, dst_dir: Path, workers: int = 4, progress: bool = True,
+                           layout: str = "flat") -> Dict[str, Any]:
+    """
+    按检查点清单校验目标目录, 返回 {"checked", "ok", "mismatches": [{"id", "src", "error"}]}。
+    目标路径取清单记录的 path; 旧清单没有 path 时按 layout 推算。
+    """
+    _ensure_backend_importable()
+    from core.infrastructure.repositories.cookie_repository import layout_path  # type: ignore
+
+    entries = list(_load_manifest(dst_dir / MANIFEST_FILENAME).values())
+    meter = _Progress(len(entries), "校验", enabled=progress)
+    mismatches: List[Dict[str, Any]] = []
+
+    def check(entry: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        dst_path = str(dst_dir / entry["path"]) if entry.get("path") else layout_path(str(dst_dir), entry["id"], layout)
+        return entry, _verify_entry(str(src_dir / entry["src"]), dst_path, entry.get("hash"))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        async for entry, error in _map_bounded(executor, check, ((e,) for e in entries), max(1, workers) * 4):
+            if error:
+                mismatches.append({"id": entry["id"], "src": entry["src"], "error": error})
+            meter.advance()
+    meter.finish()
+    return {"checked": len(entries), "ok": len(entries) - len(mismatches), "mismatches": mismatches}
+
+
+async def migrate_parallel(src_dir: Path, dst_dir: Path, ids: Optional[List[str]] = None, dry_run: bool = True,
+                           overwrite: bool = False, workers: int = 4, writers: int = 8, resume: bool = True,
+                           verify: bool = True, progress: bool = True, layout: str = "flat",
+                           storage_format: str = "pretty") -> Dict[str, Any]:
+    """
+    并行迁移:
+    - 进程池解析与转换(CPU 密集), 在途任务数有上限, 内存占用与文件总数无关
+    - writers 个异步写入协程从有界队列取结果落盘(临时文件 + 原子替换), 路径与编码同仓库的 layout / storage_format
+    - 每个完成的文件追加到检查点清单并立即刷新, resume 时跳过
+    """
+    _ensure_backend_importable()
+    from core.infrastructure.repositories.cookie_repository import LAYOUTS, layout_path, temp_path  # type: ignore
+    from core.infrastructure.repositories.doc_codec import check_format  # type: ignore
+
+    if layout not in LAYOUTS:
+        raise ValueError(f"未知的目录布局: {layout}, 可选: {', '.join(LAYOUTS)}")
+    check_format(storage_format)
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = dst_dir / MANIFEST_FILENAME
+    if not resume and manifest_path.exists() and not dry_run:
+        manifest_path.unlink()
+    done = _load_manifest(manifest_path) if resume else {}
+
+    files = [fp for fp in _find_v1_files(src_dir, ids) if fp.name not in done]
+    workers = max(1, int(workers))
+    writers = max(1, int(writers))
+    result: Dict[str, Any] = {
+        "ok": True, "total": len(files) + len(done), "resumed": len(done),
+        "migrated": 0, "skipped": 0, "errors": [], "src": str(src_dir), "dst": str(dst_dir),
+        "layout": layout, "format": storage_format,
+    }
+    meter = _Progress(len(files), "迁移", enabled=progress)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=writers * 4)
+
+    manifest = None if dry_run else open(manifest_path, "a", encoding="utf-8")
+
+    def write_file(item: Dict[str, Any]) -> str:
+        target_path = layout_path(str(dst_dir), item["id"], layout)
+        existing = [path for path in (layout_path(str(dst_dir), item["id"], other) for other in LAYOUTS) if os.path.exists(path)]
+        if existing and not overwrite:
+            return "skipped"
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        tmp_path = temp_path(target_path)
+        with open(tmp_path, "wb") as f:
+            f.write(item["data"])
+        os.replace(tmp_path, target_path)
+        # 覆盖时移除另一布局下的旧文件, 避免同一账号留下两份
+        for path in existing:
+            if path != target_path:
+                os.remove(path)
+        return "migrated"
+
+    async def writer(executor: Executor) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                if dry_run:
+                    outcome = "migrated"
+                else:
+                    outcome = await loop.run_in_executor(executor, write_file, item)
+                    if outcome == "migrated":
+                        path = os.path.relpath(layout_path(str(dst_dir), item["id"], layout), dst_dir)
+                        record = {"src": item["src"], "id": item["id"], "path": Path(path).as_posix(), "hash": item["hash"]}
+                        manifest.write(json.dumps(record) + "\n")
+                        # 逐条刷新, 进程中断时已完成的记录不会丢失
+                        manifest.flush()
+                result[outcome] += 1
+            except Exception as e:
+                result["errors"].append({"file": item["src"], "error": f"写入失败: {e}"})
+            finally:
+                queue.task_done()
+                if item is not None:
+                    meter.advance()
+
+    try:
+        with _make_pool(workers) as pool, ThreadPoolExecutor(max_workers=writers) as io_pool:
+            writer_tasks = [asyncio.create_task(writer(io_pool)) for _ in range(writers)]
+            convert_args = ((str(fp), storage_format) for fp in files)
+            async for item in _map_bounded(pool, _convert_v1_file, convert_args, workers * 4):
+                if "error" in item:
+                    result["errors"].append({"file": item["src"], "error": item["error"]})
+                    meter.advance()
+                    continue
+                await queue.put(item)
+            for _ in writer_tasks:
+                await queue.put(None)
+            await asyncio.gather(*writer_tasks)
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+    elapsed = meter.finish()
+    result["seconds"] = round(elapsed, 3)
+    result["files_per_second"] = round(len(files) / elapsed, 1) if elapsed > 0 else None
+    if verify and not dry_run:
+        result["verify"] = await verify_migration(src_dir, dst_dir, workers=writers, progress=progress, layout=layout)
+        result["ok"] = not result["verify"]["mismatches"]
+    return result
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="迁移 v1 Cookie JSON 到 v2 格式")
     parser.add_argument("--src", type=str, default="./v1/data/cookie", help="v1 源目录(默认 ./v1/data/cookie)")
@@ -395,6 +682,14 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--dry-run", type=lambda x: str(x).lower() in {"1","true","yes","y"}, default=True, help="是否 dry-run(默认 true)")
     parser.add_argument("--overwrite", type=lambda x: str(x).lower() in {"1","true","yes","y"}, default=False, help="是否覆盖已有文件(默认 false)")
     parser.add_argument("--conform-raw", type=lambda x: str(x).lower() in {"1","true","yes","y"}, default=True, help="是否将 raw 映射为更接近原生 v2 的结构(默认 true)")
+    parser.add_argument("--parallel", type=lambda x: str(x).lower() in {"1","true","yes","y"}, default=False, help="并行模式: 多进程转换 + 并发写入 + 检查点(默认 false, 要求 conform-raw)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="并行模式的转换进程数(默认 CPU 核数)")
+    parser.add_argument("--writers", type=int, default=8, help="并行模式的并发写入数(默认 8)")
+    parser.add_argument("--resume", type=lambda x: str(x).lower() in {"1","true","yes","y"}, default=True, help="并行模式下跳过检查点清单中已完成的文件(默认 true)")
+    parser.add_argument("--verify", type=lambda x: str(x).lower() in {"1","true","yes","y"}, default=True, help="并行模式结束后校验目标文档(默认 true)")
+    parser.add_argument("--layout", type=str, choices=["auto", "flat", "hashed"], default="auto", help="并行模式的目标目录布局(默认 auto, 读取 STORAGE.layout)")
+    parser.add_argument("--format", type=str, choices=["auto", "pretty", "compact", "msgpack"], default="auto", help="并行模式的落盘格式(默认 auto, 读取 STORAGE.format)")
+    parser.add_argument("--verify-only", type=lambda x: str(x).lower() in {"1","true","yes","y"}, default=False, help="仅按检查点清单校验, 不迁移(默认 false)")
     return parser.parse_args()
 
 
@@ -427,7 +722,22 @@ def main():
     print(f"[INFO] src={src_dir}")
     print(f"[INFO] dst={dst_dir} (dry-run={args.dry_run}, overwrite={args.overwrite})")
 
-    result = asyncio.run(migrate(src_dir, dst_dir, ids=args.ids, dry_run=args.dry_run, overwrite=args.overwrite, conform_raw=args.conform_raw))
+    if args.verify_only:
+        layout, _ = _resolve_storage_options(args.layout, "pretty")
+        result = asyncio.run(verify_migration(src_dir, dst_dir, workers=args.writers, layout=layout))
+    elif args.parallel:
+        if not args.conform_raw:
+            print("[ERROR] 并行模式仅支持 --conform-raw true")
+            sys.exit(2)
+        layout, storage_format = _resolve_storage_options(args.layout, args.format)
+        print(f"[INFO] layout={layout}, format={storage_format}")
+        result = asyncio.run(migrate_parallel(
+            src_dir, dst_dir, ids=args.ids, dry_run=args.dry_run, overwrite=args.overwrite,
+            workers=args.workers, writers=args.writers, resume=args.resume, verify=args.verify,
+            layout=layout, storage_format=storage_format,
+        ))
+    else:
+        result = asyncio.run(migrate(src_dir, dst_dir, ids=args.ids, dry_run=args.dry_run, overwrite=args.overwrite, conform_raw=args.conform_raw))
     print("\n===== 迁移摘要 =====")
     print(json.dumps(result, ensure_ascii=False, indent=2))
 
@@ -0,0 +1,59 @@
+"""
+存储升级脚本: 补齐旧文档缺失的管理字段并记录存储版本(与服务启动时执行的升级相同)。
+中断后重新执行会从上次进度继续。
+
+使用示例:
+  python scripts/upgrade_storage.py --dir auto --workers 8
+  python scripts/upgrade_storage.py --dir ./data/cookie --force true
+"""
+
+from __future__ import annotations
+
+import sys
+import json
+import asyncio
+import argparse
+from pathlib import Path
+
+
+def _project_root_from_this_file() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+def _ensure_backend_importable():
+    backend_root = _project_root_from_this_file()
+    if str(backend_root) not in sys.path:
+        sys.path.insert(0, str(backend_root))
+
+
+def _resolve_dir(dir_opt: str) -> Path:
+    """auto 时读取配置中的 storage.cookie_dir, 否则按显式路径解析(相对路径相对于当前目录)。"""
+    if dir_opt == "auto":
+        from core.config.loader import load_config  # type: ignore
+        return Path(load_config(None).storage.cookie_dir)
+    return Path(dir_opt)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="升级 Cookie 存储(补齐旧文档字段)")
+    parser.add_argument("--dir", type=str, default="auto", help="cookie 目录(auto 按配置解析)")
+    parser.add_argument("--workers", type=int, default=4, help="并行线程数(默认 4)")
+    parser.add_argument("--force", type=lambda x: str(x).lower() in {"1", "true", "yes", "y"}, default=False, help="忽略已记录的版本与进度, 重新执行(默认 false)")
+    return parser.parse_args()
+
+
+def main():
+    _ensure_backend_importable()
+    from core.infrastructure.repositories import CookieRepository  # type: ignore
+    from core.infrastructure.repositories.schema_upgrade import upgrade_storage  # type: ignore
+
+    args = parse_args()
+    cookie_dir = _resolve_dir(args.dir)
+    print(f"[INFO] dir={cookie_dir} (workers={args.workers}, force={args.force})")
+    repo = CookieRepository(str(cookie_dir))
+    result = asyncio.run(upgrade_storage(repo, workers=args.workers, force=args.force))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
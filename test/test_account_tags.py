@@ -19,6 +19,8 @@ if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
 from core.infrastructure.repositories.cookie_repository import CookieRepository
+from core.infrastructure.repositories.doc_codec import detect_format
+from core.infrastructure.repositories.schema_upgrade import SCHEMA_VERSION, read_schema_version, upgrade_storage
 from core.services.cookie_service import CookieService
 
 
@@ -140,6 +142,12 @@ class FakeBilibiliClient:
     async def check_cookie_valid(self, header_string: str) -> bool:
         return "invalid" not in header_string
 
+    async def check_login(self, header_string: str):
+        valid = await self.check_cookie_valid(header_string)
+        if not valid:
+            return False, -101, {}
+        return True, 0, await self.get_nav(header_string)
+
     async def get_nav(self, header_string: str):
         user_id = "unknown"
         for part in header_string.split(";"):
@@ -226,7 +234,7 @@ class RepositoryTagTests(unittest.IsolatedAsyncioTestCase):
             },
         )
 
-    async def test_legacy_document_without_tags_is_filled_and_persisted(self) -> None:
+    async def test_legacy_document_without_tags_is_filled_on_read_and_persisted_by_upgrade(self) -> None:
         legacy_doc = {
             "raw": build_raw("1002"),
             "managed": {
@@ -251,9 +259,20 @@ class RepositoryTagTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(doc["managed"]["tags"], [])
         self.assertEqual(doc["managed"]["join_time"], expected_join_time)
 
+        # 读取不写回
+        stored_doc = json.loads(legacy_path.read_text(encoding="utf-8"))
+        self.assertNotIn("tags", stored_doc["managed"])
+
+        result = await upgrade_storage(self.repo, workers=2)
+        self.assertEqual(result["upgraded"], 1)
+        self.assertEqual(read_schema_version(str(self.cookie_dir)), SCHEMA_VERSION)
+
         stored_doc = json.loads(legacy_path.read_text(encoding="utf-8"))
         self.assertEqual(stored_doc["managed"]["tags"], [])
-        self.assertEqual(stored_doc["managed"]["join_time"], doc["managed"]["join_time"])
+        self.assertEqual(stored_doc["managed"]["join_time"], expected_join_time)
+
+        again = await upgrade_storage(self.repo)
+        self.assertTrue(again["skipped"])
 
     async def test_legacy_document_with_invalid_tags_value_is_rejected(self) -> None:
         legacy_doc = {
@@ -419,7 +438,7 @@ class ApiTagTests(unittest.TestCase):
         self.assertEqual(cookie_doc["managed"]["status"], "valid")
         self.assertTrue(cookie_doc["managed"]["join_time"])
 
-    def test_legacy_document_without_tags_is_filled_by_api(self) -> None:
+    def test_legacy_document_without_tags_is_filled_by_api_without_writing(self) -> None:
         legacy_doc = {
             "raw": build_raw("3999"),
             "managed": {
@@ -443,8 +462,7 @@ class ApiTagTests(unittest.TestCase):
         self.assertTrue(response.json()["managed"]["join_time"])
 
         stored_doc = json.loads((self.cookie_dir / "3999.json").read_text(encoding="utf-8"))
-        self.assertEqual(stored_doc["managed"]["tags"], [])
-        self.assertEqual(stored_doc["managed"]["join_time"], response.json()["managed"]["join_time"])
+        self.assertEqual(stored_doc, legacy_doc)
 
 
 class MigrationScriptTests(unittest.TestCase):
@@ -505,6 +523,64 @@ class MigrationScriptTests(unittest.TestCase):
             self.assertEqual(managed["status"], "valid")
             self.assertEqual(managed["username"], f"旧用户{legacy_uid}")
 
+    def test_parallel_migrate_resumes_from_manifest_and_verifies(self) -> None:
+        module = load_migrate_module()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            src_dir = root / "src"
+            dst_dir = root / "dst"
+            src_dir.mkdir(parents=True, exist_ok=True)
+            for uid in ("5101", "5102", "5103"):
+                (src_dir / f"{uid}.json").write_text(json.dumps(build_legacy_raw(uid), ensure_ascii=False), encoding="utf-8")
+            (src_dir / "broken.json").write_text("{", encoding="utf-8")
+
+            kwargs = dict(dry_run=False, overwrite=True, workers=1, writers=2, progress=False)
+            first = asyncio.run(module.migrate_parallel(src_dir, dst_dir, ids=["5101", "5102"], **kwargs))
+            self.assertTrue(first["ok"])
+            self.assertEqual(first["migrated"], 2)
+            self.assertEqual(first["verify"]["ok"], 2)
+
+            second = asyncio.run(module.migrate_parallel(src_dir, dst_dir, **kwargs))
+            self.assertEqual(second["resumed"], 2)
+            self.assertEqual(second["migrated"], 1)
+            self.assertEqual([e["file"] for e in second["errors"]], ["broken.json"])
+            managed = json.loads((dst_dir / "5103.json").read_text(encoding="utf-8"))["managed"]
+            self.assertEqual(managed["username"], "旧用户5103")
+
+            tampered = json.loads((dst_dir / "5102.json").read_text(encoding="utf-8"))
+            tampered["managed"]["status"] = "invalid"
+            (dst_dir / "5102.json").write_text(json.dumps(tampered), encoding="utf-8")
+            report = asyncio.run(module.verify_migration(src_dir, dst_dir, progress=False))
+            self.assertEqual(report["checked"], 3)
+            self.assertEqual([m["id"] for m in report["mismatches"]], ["5102"])
+
+    def test_parallel_migrate_follows_storage_layout_and_format(self) -> None:
+        module = load_migrate_module()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            src_dir = root / "src"
+            dst_dir = root / "dst"
+            src_dir.mkdir(parents=True, exist_ok=True)
+            for uid in ("5201", "5202"):
+                (src_dir / f"{uid}.json").write_text(json.dumps(build_legacy_raw(uid), ensure_ascii=False), encoding="utf-8")
+            # 已存在于另一布局的账号视为已存在
+            dst_dir.mkdir()
+            (dst_dir / "5202.json").write_text("{}", encoding="utf-8")
+
+            kwargs = dict(dry_run=False, overwrite=False, workers=1, writers=2, progress=False,
+                          layout="hashed", storage_format="compact")
+            result = asyncio.run(module.migrate_parallel(src_dir, dst_dir, **kwargs))
+            self.assertEqual((result["migrated"], result["skipped"]), (1, 1))
+            self.assertEqual(result["verify"]["ok"], 1)
+
+            repo = CookieRepository(str(dst_dir), layout="hashed")
+            target = Path(repo._layout_path("5201", "hashed"))
+            self.assertFalse((dst_dir / "5201.json").exists())
+            self.assertEqual(detect_format(target.read_bytes()), "compact")
+            self.assertEqual(asyncio.run(repo.get("5201"))["managed"]["username"], "旧用户5201")
+            manifest = (dst_dir / module.MANIFEST_FILENAME).read_text(encoding="utf-8").splitlines()
+            self.assertEqual([json.loads(line)["path"] for line in manifest], [target.relative_to(dst_dir).as_posix()])
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from test_account_tags import build_raw
+
+from core.infrastructure.repositories.cookie_repository import CookieRepository
+from core.services import CookieService
+
+
+class BulkLoadTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cookie_dir = Path(self.temp_dir.name) / "cookies"
+
+        async def seed() -> None:
+            repo = CookieRepository(str(self.cookie_dir), layout="hashed")
+            for i in range(150):
+                await repo.save_from_raw(build_raw(str(9400 + i)))
+            await repo.update_check_status("9400", valid=True)
+
+        asyncio.run(seed())
+        (self.cookie_dir / "broken.json").write_text("{", encoding="utf-8")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def load(self, **kwargs) -> tuple:
+        async def scenario():
+            repo = CookieRepository(str(self.cookie_dir), **kwargs)
+            service = CookieService(repo)
+            result = await service.warm_up()
+            return repo, service, result
+
+        return asyncio.run(scenario())
+
+    def test_thread_pool_builds_cache_and_indexes_in_one_pass(self) -> None:
+        repo, service, result = self.load(load_workers=4)
+        self.assertEqual((result["files"], result["loaded"], result["failed"]), (151, 150, 1))
+        self.assertGreater(result["files_per_sec"], 0)
+        self.assertTrue(repo.index.ready)
+        self.assertEqual(len(repo.index.ids()), 150)
+        self.assertEqual(repo.index.entry("9400").status, "valid")
+        self.assertEqual(len(repo._cache), 150)
+        self.assertTrue(service.health.primed)
+
+    def test_process_pool_matches_thread_pool(self) -> None:
+        repo, _, result = self.load(load_workers=2, load_mode="process")
+        self.assertEqual(result["loaded"], 150)
+        self.assertEqual(len(repo.index.ids()), 150)
+
+    def test_invalidate_keeps_buffered_writes(self) -> None:
+        async def scenario():
+            repo = CookieRepository(str(self.cookie_dir), write_behind=True)
+            await repo.bulk_load()
+            await repo.update_check_status("9401", valid=False)
+            await repo.update_check_status("9401", valid=False, username="缓冲中")
+            self.assertEqual(repo.pending_writes, 1)
+            (self.cookie_dir / "broken.json").unlink()
+            repo.invalidate()
+            self.assertFalse(repo.index.ready)
+            await repo.ensure_index()
+            doc = await repo.get("9401")
+            return repo, doc
+
+        repo, doc = asyncio.run(scenario())
+        self.assertEqual(doc["managed"]["username"], "缓冲中")
+        self.assertEqual(len(repo.index.ids()), 150)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+import httpx
+
+from test_account_tags import build_raw
+from test_wbi_keys import CountingNav
+
+from core.infrastructure.bilibili_client import BilibiliClient
+from core.infrastructure.repositories.cookie_repository import CookieRepository
+from core.services import CookieService
+
+
+class CheckFreshnessTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cookie_dir = str(Path(self.temp_dir.name) / "cookies")
+        self.nav = CountingNav(code=0)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def run_with_client(self, scenario):
+        async def runner():
+            client = BilibiliClient(transport=httpx.MockTransport(self.nav))
+            try:
+                return await scenario(client)
+            finally:
+                await client.aclose()
+
+        return asyncio.run(runner())
+
+    def test_checks_inside_window_reuse_verdict_unless_forced(self) -> None:
+        async def scenario(client):
+            repo = CookieRepository(self.cookie_dir)
+            await repo.save_from_raw(build_raw("9101"))
+            service = CookieService(repo, bilibili_client=client, check_fresh_seconds=60)
+            await service.check_cookie("9101")
+            per_check = self.nav.calls
+            await service.check_cookie("9101")
+            self.assertEqual(self.nav.calls, per_check)
+            summary = await service.check_cookies(ids=["9101"], force=True)
+            self.assertEqual(summary["succeeded"], 1)
+            self.assertEqual(self.nav.calls, 2 * per_check)
+
+            # 重启后从文档中的 last_verified_time 恢复
+            restarted = CookieService(CookieRepository(self.cookie_dir), bilibili_client=client, check_fresh_seconds=60)
+            doc = await restarted.check_cookie("9101")
+            self.assertEqual(self.nav.calls, 2 * per_check)
+            self.assertEqual(doc["managed"]["status"], "valid")
+            self.assertIsNotNone(doc["managed"]["last_verified_time"])
+
+            disabled = CookieService(CookieRepository(self.cookie_dir), bilibili_client=client, check_fresh_seconds=0)
+            await disabled.check_cookie("9101")
+            self.assertEqual(self.nav.calls, 3 * per_check)
+
+        self.run_with_client(scenario)
+
+    def test_failed_request_is_not_treated_as_verdict(self) -> None:
+        async def broken(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("boom", request=request)
+
+        async def scenario(client):
+            repo = CookieRepository(self.cookie_dir)
+            await repo.save_from_raw(build_raw("9102"))
+            failing = CookieService(repo, bilibili_client=BilibiliClient(transport=httpx.MockTransport(broken)), check_fresh_seconds=60)
+            doc = await failing.check_cookie("9102")
+            self.assertEqual(doc["managed"]["status"], "invalid")
+            self.assertEqual(doc["managed"]["error_message"], "检查失败: 请求异常")
+            self.assertIsNone(doc["managed"].get("last_verified_time"))
+
+            service = CookieService(repo, bilibili_client=client, check_fresh_seconds=60)
+            doc = await service.check_cookie("9102")
+            self.assertGreater(self.nav.calls, 0)
+            self.assertEqual(doc["managed"]["status"], "valid")
+
+        self.run_with_client(scenario)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from test_account_tags import FakeBilibiliClient, build_raw, close_log_handlers, load_test_app, write_config
+
+from core.infrastructure.repositories.cookie_repository import CookieRepository
+from core.infrastructure.repositories.history_repository import (
+    EVENT_CHECK,
+    EVENT_REFRESH,
+    RECORD,
+    CheckHistoryRepository,
+)
+from core.services import CookieService
+
+
+class CheckHistoryRepositoryTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.history = CheckHistoryRepository(self.temp_dir.name, capacity=4)
+
+    async def asyncTearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    async def test_read_returns_newest_first(self) -> None:
+        await self.history.append("1001", EVENT_CHECK, True, latency_ms=12.5, ts=1700000000)
+        await self.history.append("1001", EVENT_REFRESH, False, code=-101, ts=1700000100)
+
+        events = await self.history.read("1001")
+        self.assertEqual([e["event"] for e in events], ["refresh", "check"])
+        self.assertEqual(events[0]["code"], -101)
+        self.assertFalse(events[0]["ok"])
+        self.assertEqual(events[1]["latency_ms"], 12.5)
+        self.assertEqual(await self.history.read("9999"), [])
+
+    async def test_file_is_compacted_to_capacity(self) -> None:
+        for i in range(11):
+            await self.history.append("1002", EVENT_CHECK, True, code=i, ts=1700000000 + i)
+
+        path = Path(self.temp_dir.name) / "1002.bin"
+        self.assertLess(os.path.getsize(path), RECORD.size * 8)
+        events = await self.history.read("1002", limit=100)
+        self.assertEqual(len(events), 4)
+        self.assertEqual(events[0]["code"], 10)
+
+    async def test_check_records_upstream_nav_code(self) -> None:
+        class CodeClient(FakeBilibiliClient):
+            codes = {"7001": (None, -412), "7002": (False, -101), "7003": (None, -1)}
+
+            async def check_login(self, header_string: str):
+                uid = header_string.rsplit("DedeUserID=", 1)[-1].split(";")[0]
+                return (*self.codes[uid], {})
+
+        repo = CookieRepository(str(Path(self.temp_dir.name) / "cookies"))
+        service = CookieService(repo, bilibili_client=CodeClient(), history=self.history)
+        for uid, (_, code) in CodeClient.codes.items():
+            await repo.save_from_raw(build_raw(uid))
+            await service.check_cookie(uid)
+            events = await self.history.read(uid)
+            self.assertEqual((events[0]["code"], events[0]["ok"]), (code, False))
+
+
+class CheckHistoryApiTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        config_path = root / "config.yaml"
+        write_config(config_path, root / "cookies")
+        self.app = load_test_app(config_path)
+        self.app.state.cookie_service.client = FakeBilibiliClient()
+        self.client = TestClient(self.app)
+        self.auth_headers = {"Authorization": "Bearer test-token"}
+
+    def tearDown(self) -> None:
+        self.client.close()
+        close_log_handlers()
+        self.temp_dir.cleanup()
+
+    def test_check_and_refresh_are_recorded(self) -> None:
+        asyncio.run(self.app.state.cookie_service.repo.save_from_raw(build_raw("6001")))
+        self.client.post("/api/v1/cookies/check", headers=self.auth_headers, json={"ids": ["6001"]})
+        self.client.post("/api/v1/cookies/refresh", headers=self.auth_headers, json={"ids": ["6001"]})
+
+        response = self.client.get("/api/v1/cookies/6001/history?limit=10", headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200)
+        events = response.json()["events"]
+        # 刷新后会再执行一次检查
+        self.assertEqual([e["event"] for e in events], ["check", "refresh", "check"])
+        self.assertTrue(all(e["ok"] for e in events))
+        self.assertTrue((Path(self.temp_dir.name) / "history" / "6001.bin").exists())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
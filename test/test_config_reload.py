@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from test_account_tags import load_test_app, write_config
+
+from core.config import AppConfig, diff_config, load_config, parse_config_file
+from core.scheduler import AppScheduler
+
+
+class ConfigReloadAppTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.config_path = self.root / "config.yaml"
+        self.cookie_dir = self.root / "cookies"
+        write_config(self.config_path, self.cookie_dir)
+        self.app = load_test_app(self.config_path)
+        self.client = TestClient(self.app)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.temp_dir.cleanup()
+
+    def rewrite(self, extra: str, token: str = "test-token", cookie_dir: str = "") -> None:
+        self.config_path.write_text(
+            textwrap.dedent(
+                f"""
+                API_TOKEN:
+                  enable: true
+                  token: {token}
+                STORAGE:
+                  cookie_dir: "{cookie_dir or self.cookie_dir.as_posix()}"
+                """
+            ).strip() + "\n" + textwrap.dedent(extra).strip() + "\n",
+            encoding="utf-8",
+        )
+
+    def reload(self):
+        return asyncio.run(self.app.state.config_watcher.check_once())
+
+    def status(self, token: str) -> int:
+        return self.client.get("/api/v1/cookies", headers={"Authorization": f"Bearer {token}"}).status_code
+
+    def test_valid_change_is_applied_live(self) -> None:
+        self.rewrite(
+            """
+            GOTIFY:
+              enable: true
+              url: "http://127.0.0.1:1"
+              token: gotify-token
+            BILIBILI:
+              check_fresh_seconds: 5
+            """,
+            token="rotated-token",
+            cookie_dir=(self.root / "elsewhere").as_posix(),
+        )
+        self.assertIsNotNone(self.reload())
+
+        self.assertEqual(self.status("test-token"), 401)
+        self.assertEqual(self.status("rotated-token"), 200)
+        service = self.app.state.cookie_service
+        self.assertEqual([worker.name for worker in service.notification.workers], ["gotify"])
+        self.assertEqual(service.check_fresh_seconds, 5)
+        # 存储目录需要重启才能生效, 运行中的配置保持原值
+        self.assertEqual(self.app.state.config.storage.cookie_dir, self.cookie_dir.as_posix())
+
+    def test_invalid_change_is_rejected(self) -> None:
+        self.rewrite(
+            """
+            TRACING:
+              sample_ratio: 2
+            """,
+            token="rotated-token",
+        )
+        with self.assertLogs("core.config.watcher", level="ERROR"):
+            self.assertIsNone(self.reload())
+        self.assertEqual(self.app.state.config_watcher.rejected, 1)
+        self.assertEqual(self.status("test-token"), 200)
+        self.assertEqual(self.status("rotated-token"), 401)
+
+
+class LegacyValidationTests(unittest.TestCase):
+    def test_legacy_invalid_config_starts_with_a_warning(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config_path = Path(temp_dir) / "config.yaml"
+            write_config(config_path, Path(temp_dir) / "cookies")
+            config_path.write_text(
+                config_path.read_text(encoding="utf-8").replace("token: test-token", 'token: ""'),
+                encoding="utf-8",
+            )
+            with self.assertLogs("core.config.loader", level="WARNING"):
+                config = load_config(str(config_path))
+            self.assertTrue(config.api_token.enable)
+            self.assertFalse(config.config_reload.enable)
+            # 热重载仍拒绝该配置, 运行中的配置保持不变
+            with self.assertRaises(ValueError):
+                parse_config_file(str(config_path))
+
+
+class SchedulerReconfigureTests(unittest.TestCase):
+    def test_loops_follow_new_switches_and_interval(self) -> None:
+        calls = []
+
+        class FakeService:
+            async def list_cookies(self):
+                calls.append(asyncio.get_running_loop().time())
+                return []
+
+        config = AppConfig()
+        config.scheduler.cookie_check.enable = True
+        config.scheduler.cookie_check.interval_seconds = 3600
+
+        async def scenario() -> None:
+            scheduler = AppScheduler(FakeService(), config)
+            await scheduler.start(SimpleNamespace(state=SimpleNamespace()))
+            await asyncio.sleep(0.05)
+            self.assertEqual(len(calls), 1)
+
+            faster = copy.deepcopy(config)
+            faster.scheduler.cookie_check.interval_seconds = 1
+            self.assertEqual(diff_config(config, faster), ["scheduler.cookie_check"])
+            await scheduler.reconfigure(faster)
+            # 无需等满原来的 3600 秒, 从上一轮开始时刻按新间隔计算
+            await asyncio.sleep(1.2)
+            self.assertEqual(len(calls), 2)
+            self.assertLess(calls[1] - calls[0], 1.5)
+
+            swapped = copy.deepcopy(faster)
+            swapped.scheduler.cookie_check.enable = False
+            swapped.scheduler.cookie_refresh.enable = True
+            await scheduler.reconfigure(swapped)
+            await asyncio.sleep(0.05)
+            self.assertTrue(scheduler._tasks["check"].done())
+            self.assertFalse(scheduler._tasks["refresh"].done())
+            await scheduler.stop()
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
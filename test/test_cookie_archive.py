@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import io
+import json
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from test_account_tags import build_raw, close_log_handlers, load_test_app, write_config
+
+from core.utils import archive
+from core.utils.archive import MAX_MEMBER_SIZE, TarStreamReader
+
+
+class CookieArchiveApiTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.auth_headers = {"Authorization": "Bearer test-token"}
+
+        source_config = root / "source" / "config.yaml"
+        source_config.parent.mkdir()
+        write_config(source_config, root / "source" / "cookies")
+        self.source_app = load_test_app(source_config)
+        repo = self.source_app.state.cookie_service.repo
+
+        async def seed() -> None:
+            for uid in ("8201", "8202", "8203"):
+                await repo.save_from_raw(build_raw(uid))
+            await repo.update_tags("8201", ["主力号"])
+            await repo.update_tags("8203", ["主力号"])
+            await repo.update_check_status("8203", valid=False)
+
+        asyncio.run(seed())
+        self.source = TestClient(self.source_app)
+
+        target_config = root / "target" / "config.yaml"
+        target_config.parent.mkdir()
+        self.target_cookie_dir = root / "target" / "cookies"
+        write_config(target_config, self.target_cookie_dir)
+        self.target_app = load_test_app(target_config)
+        self.target = TestClient(self.target_app)
+
+    def tearDown(self) -> None:
+        self.source.close()
+        self.target.close()
+        close_log_handlers()
+        self.temp_dir.cleanup()
+
+    def test_export_filters_and_import_round_trips(self) -> None:
+        exported = self.source.get("/api/v1/cookies/export", params={"tag": "主力号"}, headers=self.auth_headers)
+        self.assertEqual(exported.status_code, 200)
+        self.assertEqual(exported.headers["content-type"], "application/gzip")
+        with tarfile.open(fileobj=io.BytesIO(exported.content), mode="r:gz") as archive:
+            self.assertEqual(sorted(archive.getnames()), ["8201.json", "8203.json"])
+
+        invalid = self.source.get("/api/v1/cookies/export", params={"tag": "主力号", "status": "invalid"}, headers=self.auth_headers)
+        with tarfile.open(fileobj=io.BytesIO(invalid.content), mode="r:gz") as archive:
+            self.assertEqual(archive.getnames(), ["8203.json"])
+
+        imported = self.target.post("/api/v1/cookies/import", content=exported.content, headers=self.auth_headers)
+        self.assertEqual(imported.status_code, 200)
+        self.assertEqual(imported.json(), {"imported": 2, "failed": 0, "errors": []})
+        stored = json.loads((self.target_cookie_dir / "8203.json").read_bytes())
+        self.assertEqual(stored["managed"]["status"], "invalid")
+        self.assertEqual(stored["managed"]["tags"], ["主力号"])
+        stats = self.target.get("/api/v1/cookies/stats", headers=self.auth_headers).json()
+        self.assertEqual(stats["total"], 2)
+
+    def test_import_reports_invalid_documents_and_rejects_truncated_archives(self) -> None:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            for name, data in (
+                ("nested/8301.json", self.source.get("/api/v1/cookies/8201", headers=self.auth_headers).content),
+                ("broken.json", b"{"),
+                ("missing.json", json.dumps({"raw": {}}).encode()),
+                ("escape.json", json.dumps({"raw": {}, "managed": {"DedeUserID": "../x"}}).encode()),
+            ):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+
+        response = self.target.post("/api/v1/cookies/import", content=buffer.getvalue(), headers=self.auth_headers)
+        body = response.json()
+        self.assertEqual(body["imported"], 1)
+        self.assertEqual(body["failed"], 3)
+        self.assertEqual([e["name"] for e in body["errors"]], ["broken.json", "missing.json", "escape.json"])
+        self.assertTrue((self.target_cookie_dir / "8201.json").exists())
+        self.assertFalse((self.target_cookie_dir.parent / "x.json").exists())
+
+        truncated = gzip.decompress(buffer.getvalue())[:700]
+        response = self.target.post("/api/v1/cookies/import", content=gzip.compress(truncated), headers=self.auth_headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class TarStreamReaderTests(unittest.TestCase):
+    def _bomb(self, compression: str) -> bytes:
+        header = tarfile.TarInfo("bomb.json")
+        header.size = MAX_MEMBER_SIZE + 1
+        payload = header.tobuf(format=tarfile.PAX_FORMAT) + b"\0" * (32 * 1024 * 1024)
+        if compression == "zst":
+            return archive.zstandard.ZstdCompressor().compress(payload)
+        return gzip.compress(payload)
+
+    def _check_bounded(self, compression: str) -> None:
+        data = self._bomb(compression)
+        self.assertLess(len(data), 64 * 1024)
+
+        reader = TarStreamReader()
+        reader._init_decompressor(data[:4])
+        pieces = reader._decompress(data)
+        self.assertLessEqual(max(len(next(pieces)) for _ in range(4)), archive._DECOMPRESS_SLICE)
+        with self.assertRaisesRegex(ValueError, "归档成员过大"):
+            list(TarStreamReader().feed(data))
+
+    def test_gzip_output_is_bounded_per_step(self) -> None:
+        self._check_bounded("gz")
+
+    @unittest.skipIf(archive.zstandard is None, "需要安装 zstandard")
+    def test_zstd_output_is_bounded_per_step(self) -> None:
+        self._check_bounded("zst")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from test_account_tags import FakeBilibiliClient, build_raw, close_log_handlers, load_test_app, write_config
+
+from core.infrastructure.repositories.cookie_repository import CookieRepository
+
+
+class RepositoryStatsTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cookie_dir = Path(self.temp_dir.name) / "cookies"
+        self.repo = CookieRepository(str(self.cookie_dir))
+
+    async def asyncTearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    async def test_counters_follow_every_transition(self) -> None:
+        await self.repo.save_from_raw(build_raw("8001"))
+        await self.repo.save_from_raw(build_raw("8002"))
+
+        stats = await self.repo.stats()
+        self.assertEqual(stats["total"], 2)
+        self.assertEqual(stats["status"]["unknown"], 2)
+
+        await self.repo.update_check_status("8001", valid=True)
+        await self.repo.update_check_status("8002", valid=False)
+        await self.repo.update_refresh_failed("8002", "boom")
+        await self.repo.update_enabled("8002", False)
+        await self.repo.update_tags("8001", ["主力号", "直播"])
+        await self.repo.update_tags("8002", ["直播"])
+
+        stats = await self.repo.stats()
+        self.assertEqual(stats["status"], {"valid": 1, "invalid": 1, "expired": 0, "unknown": 0})
+        self.assertEqual(stats["refresh_status"]["failed"], 1)
+        self.assertEqual(stats["refresh_status"]["not_needed"], 1)
+        self.assertEqual(stats["enabled"], {"true": 1, "false": 1})
+        self.assertEqual(stats["tags"], {"主力号": 1, "直播": 2})
+
+        await self.repo.update_tags("8001", [])
+        await self.repo.delete("8002")
+        stats = await self.repo.stats()
+        self.assertEqual(stats["total"], 1)
+        self.assertEqual(stats["tags"], {})
+        self.assertEqual(stats["enabled"], {"true": 1, "false": 0})
+
+    async def test_index_is_built_from_existing_files(self) -> None:
+        await self.repo.save_from_raw(build_raw("8003"))
+        await self.repo.update_check_status("8003", valid=True)
+
+        fresh = CookieRepository(str(self.cookie_dir))
+        stats = await fresh.stats()
+        self.assertEqual(stats["total"], 1)
+        self.assertEqual(stats["status"]["valid"], 1)
+
+
+class StatsApiTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        config_path = root / "config.yaml"
+        write_config(config_path, root / "cookies")
+        self.app = load_test_app(config_path)
+        self.app.state.cookie_service.client = FakeBilibiliClient()
+        asyncio.run(self.app.state.cookie_service.repo.save_from_raw(build_raw("8101")))
+        self.client = TestClient(self.app)
+        self.auth_headers = {"Authorization": "Bearer test-token"}
+
+    def tearDown(self) -> None:
+        self.client.close()
+        close_log_handlers()
+        self.temp_dir.cleanup()
+
+    def test_stats_etag_changes_only_on_transition(self) -> None:
+        first = self.client.get("/api/v1/cookies/stats", headers=self.auth_headers)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()["total"], 1)
+        etag = first.headers["ETag"]
+
+        cached = self.client.get("/api/v1/cookies/stats", headers={**self.auth_headers, "If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+
+        self.client.patch("/api/v1/cookies/8101/enabled", headers=self.auth_headers, json={"is_enabled": False})
+        changed = self.client.get("/api/v1/cookies/stats", headers={**self.auth_headers, "If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+        self.assertEqual(changed.json()["enabled"], {"true": 0, "false": 1})
+
+    def test_list_and_get_answer_if_none_match(self) -> None:
+        listed = self.client.get("/api/v1/cookies/", headers=self.auth_headers)
+        list_etag = listed.headers["ETag"]
+        got = self.client.get("/api/v1/cookies/8101", headers=self.auth_headers)
+        doc_etag = got.headers["ETag"]
+
+        self.assertEqual(
+            self.client.get("/api/v1/cookies/", headers={**self.auth_headers, "If-None-Match": list_etag}).status_code,
+            304,
+        )
+        self.assertEqual(
+            self.client.get("/api/v1/cookies/8101", headers={**self.auth_headers, "If-None-Match": doc_etag}).status_code,
+            304,
+        )
+
+        self.client.patch("/api/v1/cookies/8101/tags", headers=self.auth_headers, json={"tags": ["备用"]})
+
+        relisted = self.client.get("/api/v1/cookies/", headers={**self.auth_headers, "If-None-Match": list_etag})
+        self.assertEqual(relisted.status_code, 200)
+        self.assertNotEqual(relisted.headers["ETag"], list_etag)
+        regot = self.client.get("/api/v1/cookies/8101", headers={**self.auth_headers, "If-None-Match": doc_etag})
+        self.assertEqual(regot.status_code, 200)
+        self.assertEqual(regot.json()["managed"]["tags"], ["备用"])
+
+        missing = self.client.get("/api/v1/cookies/9999", headers={**self.auth_headers, "If-None-Match": "*"})
+        self.assertEqual(missing.status_code, 404)
+
+    def test_external_edit_invalidates_etag_and_serialized_body(self) -> None:
+        listed = self.client.get("/api/v1/cookies/", headers=self.auth_headers)
+        got = self.client.get("/api/v1/cookies/8101", headers=self.auth_headers)
+        list_etag, doc_etag = listed.headers["ETag"], got.headers["ETag"]
+
+        # 目录监听未运行: 文件被直接改写
+        path = Path(self.temp_dir.name) / "cookies" / "8101.json"
+        stored = json.loads(path.read_bytes())
+        stored["managed"]["tags"] = ["外部修改"]
+        path.write_text(json.dumps(stored, ensure_ascii=False), encoding="utf-8")
+
+        regot = self.client.get("/api/v1/cookies/8101", headers={**self.auth_headers, "If-None-Match": doc_etag})
+        self.assertEqual(regot.status_code, 200)
+        self.assertEqual(regot.json()["managed"]["tags"], ["外部修改"])
+        relisted = self.client.get("/api/v1/cookies/", headers={**self.auth_headers, "If-None-Match": list_etag})
+        self.assertEqual(relisted.status_code, 200)
+        self.assertEqual(relisted.json()[0]["managed"]["tags"], ["外部修改"])
+
+        current = self.client.get("/api/v1/cookies/8101", headers=self.auth_headers).headers["ETag"]
+        self.assertNotEqual(current, doc_etag)
+        self.assertEqual(
+            self.client.get("/api/v1/cookies/8101", headers={**self.auth_headers, "If-None-Match": current}).status_code,
+            304,
+        )
+
+    def test_watched_directory_answers_304_without_reading(self) -> None:
+        listed = self.client.get("/api/v1/cookies/", headers=self.auth_headers)
+        got = self.client.get("/api/v1/cookies/8101", headers=self.auth_headers)
+        list_etag, doc_etag = listed.headers["ETag"], got.headers["ETag"]
+
+        repo = self.app.state.cookie_service.repo
+        repo.watched = True
+        reads = []
+
+        async def counting_list():
+            reads.append("list")
+            return []
+
+        async def counting_get(dede_user_id):
+            reads.append(dede_user_id)
+            return None
+
+        repo.list, repo.get = counting_list, counting_get
+        self.assertEqual(
+            self.client.get("/api/v1/cookies/", headers={**self.auth_headers, "If-None-Match": list_etag}).status_code,
+            304,
+        )
+        self.assertEqual(
+            self.client.get("/api/v1/cookies/8101", headers={**self.auth_headers, "If-None-Match": doc_etag}).status_code,
+            304,
+        )
+        self.assertEqual(reads, [])
+
+    def test_serialized_body_is_not_reused_after_recreate(self) -> None:
+        first = self.client.get("/api/v1/cookies/8101", headers=self.auth_headers)
+        self.assertEqual(first.json()["managed"]["tags"], [])
+        self.client.delete("/api/v1/cookies/8101", headers=self.auth_headers)
+
+        doc = json.loads(first.content)
+        doc["managed"]["tags"] = ["重建"]
+        asyncio.run(self.app.state.cookie_service.repo.upsert(doc))
+        regot = self.client.get("/api/v1/cookies/8101", headers=self.auth_headers)
+        self.assertEqual(regot.json()["managed"]["tags"], ["重建"])
+        self.assertNotEqual(regot.headers["ETag"], first.headers["ETag"])
+
+    def test_list_is_compressed_and_serialization_is_cached(self) -> None:
+        repo = self.app.state.cookie_service.repo
+
+        async def seed() -> None:
+            for i in range(20):
+                await repo.save_from_raw(build_raw(f"82{i:02d}"))
+
+        asyncio.run(seed())
+        response = self.client.get("/api/v1/cookies/", headers={**self.auth_headers, "Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(len(response.json()), 21)
+
+        cache = self.app.state.response_cache
+        self.assertEqual(len(cache), 21)
+        cached_body = cache.get("8101", self.app.state.cookie_service.cookie_revision("8101"))
+        self.assertIsNotNone(cached_body)
+
+        plain = self.client.get("/api/v1/cookies/8101", headers={**self.auth_headers, "Accept-Encoding": "identity"})
+        self.assertEqual(plain.content, cached_body)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
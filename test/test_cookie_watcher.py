@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from test_account_tags import build_raw
+
+from core.infrastructure.repositories.cookie_repository import CookieRepository
+from core.infrastructure.repositories.cookie_watcher import CookieDirWatcher
+
+
+class CookieDirWatcherTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cookie_dir = Path(self.temp_dir.name) / "cookies"
+        self.repo = CookieRepository(str(self.cookie_dir))
+        self.changes = []
+
+        async def on_change(dede_user_id, doc):
+            self.changes.append((dede_user_id, doc is not None))
+
+        self.watcher = CookieDirWatcher(self.repo, debounce_ms=0, use_polling=True, on_change=on_change)
+
+    async def asyncTearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    async def test_own_writes_are_ignored(self) -> None:
+        await self.watcher.poll_once()
+        await self.repo.save_from_raw(build_raw("9101"))
+        await self.repo.update_tags("9101", ["主力号"])
+
+        self.assertEqual(await self.watcher.poll_once(), {"updated": 0, "removed": 0})
+        self.assertEqual(self.changes, [])
+
+    async def test_external_create_modify_delete_update_index(self) -> None:
+        await self.repo.ensure_index()
+        await self.watcher.poll_once()
+
+        other = CookieRepository(str(self.cookie_dir))
+        await other.save_from_raw(build_raw("9102"))
+        self.assertEqual(await self.watcher.poll_once(), {"updated": 1, "removed": 0})
+        self.assertIn("9102", self.repo.index)
+        etag = self.repo.index.doc_etag("9102")
+
+        path = self.cookie_dir / "9102.json"
+        stored = json.loads(path.read_bytes())
+        stored["managed"]["tags"] = ["手动"]
+        path.write_text(json.dumps(stored, ensure_ascii=False), encoding="utf-8")
+        await self.watcher.poll_once()
+        self.assertEqual(self.repo.index.stats()["tags"], {"手动": 1})
+        self.assertNotEqual(self.repo.index.doc_etag("9102"), etag)
+        self.assertEqual((await self.repo.get("9102"))["managed"]["tags"], ["手动"])
+
+        path.unlink()
+        self.assertEqual(await self.watcher.poll_once(), {"updated": 0, "removed": 1})
+        self.assertNotIn("9102", self.repo.index)
+        self.assertEqual(self.changes, [("9102", True), ("9102", True), ("9102", False)])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
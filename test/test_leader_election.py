@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import test_account_tags  # noqa: F401  确保后端目录在 sys.path 中
+
+from core.scheduler.leader import LeaderElection
+
+
+class LeaderElectionTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.lease_path = str(Path(self.temp_dir.name) / "scheduler.lease")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_only_one_worker_holds_the_lease(self) -> None:
+        first = LeaderElection(self.lease_path, lease_seconds=15, heartbeat_seconds=5)
+        second = LeaderElection(self.lease_path, lease_seconds=15, heartbeat_seconds=5)
+        now = time.time()
+
+        self.assertTrue(first.try_acquire(now))
+        self.assertFalse(second.try_acquire(now + 1))
+        self.assertTrue(first.try_acquire(now + 10))
+        self.assertFalse(second.try_acquire(now + 20))
+        self.assertEqual(first.current()["owner"], first.owner)
+
+    def test_standby_takes_over_after_missed_heartbeats(self) -> None:
+        first = LeaderElection(self.lease_path, lease_seconds=15, heartbeat_seconds=5)
+        second = LeaderElection(self.lease_path, lease_seconds=15, heartbeat_seconds=5)
+        now = time.time()
+
+        self.assertTrue(first.try_acquire(now))
+        self.assertTrue(second.try_acquire(now + 16))
+        self.assertFalse(first.try_acquire(now + 17))
+
+    def test_release_allows_immediate_takeover(self) -> None:
+        first = LeaderElection(self.lease_path)
+        second = LeaderElection(self.lease_path)
+        self.assertTrue(first.try_acquire())
+        first.release()
+        self.assertTrue(second.try_acquire())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import unittest
+
+import httpx
+
+import test_account_tags  # noqa: F401  确保后端目录在 sys.path 中
+
+from core.infrastructure.notifications.channel import NotificationChannel
+from core.infrastructure.notifications.fanout import ChannelWorker, FanoutNotificationService
+from core.infrastructure.notifications.telegram import TelegramNotificationService
+from core.infrastructure.notifications.webhook import WebhookNotificationService
+
+
+class FakeChannel(NotificationChannel):
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        super().__init__()
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.received = []
+
+    async def deliver(self, title: str, message: str, priority: int = 5) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("渠道不可用")
+        self.received.append((title, priority))
+
+
+class FanoutTests(unittest.TestCase):
+    def test_slow_channel_does_not_delay_others(self) -> None:
+        async def scenario():
+            fast, slow = FakeChannel("fast"), FakeChannel("slow", delay=0.3)
+            fanout = FanoutNotificationService([ChannelWorker(fast), ChannelWorker(slow)])
+            started = asyncio.get_running_loop().time()
+            await fanout.send("Cookie 失效", "用户 1 的 Cookie 已失效", priority=7)
+            send_elapsed = asyncio.get_running_loop().time() - started
+            await asyncio.sleep(0.05)
+            fast_done, slow_done = list(fast.received), list(slow.received)
+            await fanout.aclose()
+            return send_elapsed, fast_done, slow_done, slow.received, fanout.metrics()
+
+        send_elapsed, fast_done, slow_done, slow_final, metrics = asyncio.run(scenario())
+        self.assertLess(send_elapsed, 0.05)
+        self.assertEqual(fast_done, [("Cookie 失效", 7)])
+        self.assertEqual(slow_done, [])
+        # 关闭时等待队列发送完毕
+        self.assertEqual(slow_final, [("Cookie 失效", 7)])
+        by_name = {item["channel"]: item for item in metrics}
+        self.assertEqual(by_name["slow"]["sent"], 1)
+        self.assertGreaterEqual(by_name["slow"]["latency_ms"]["max"], 250)
+
+    def test_priority_routing_drops_and_failures(self) -> None:
+        async def scenario():
+            urgent = FakeChannel("urgent")
+            broken = FakeChannel("broken", fail=True)
+            blocked = FakeChannel("blocked", delay=10)
+            fanout = FanoutNotificationService(
+                [
+                    ChannelWorker(urgent, min_priority=7),
+                    ChannelWorker(broken),
+                    ChannelWorker(blocked, queue_size=1),
+                ],
+                drain_timeout_seconds=0.01,
+            )
+            for priority in (5, 7, 6):
+                await fanout.send("通知", "内容", priority=priority)
+                await asyncio.sleep(0.01)
+            metrics = {item["channel"]: item for item in fanout.metrics()}
+            await fanout.aclose()
+            return urgent.received, metrics
+
+        received, metrics = asyncio.run(scenario())
+        self.assertEqual(received, [("通知", 7)])
+        self.assertEqual(metrics["urgent"]["sent"], 1)
+        self.assertEqual((metrics["broken"]["failed"], metrics["broken"]["sent"]), (3, 0))
+        self.assertIn("渠道不可用", metrics["broken"]["last_error"])
+        # 第 1 条正在发送, 第 2 条占满队列, 第 3 条被丢弃
+        self.assertEqual((metrics["blocked"]["queued"], metrics["blocked"]["dropped"]), (1, 1))
+
+
+class ChannelPayloadTests(unittest.TestCase):
+    def test_webhook_and_telegram_requests(self) -> None:
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append((str(request.url), json.loads(request.content)))
+            if request.url.path.endswith("/sendMessage"):
+                return httpx.Response(200, json={"ok": False, "description": "chat not found"})
+            return httpx.Response(204)
+
+        async def scenario():
+            webhook = WebhookNotificationService("http://hook.test/notify", headers={"X-Key": "k"})
+            telegram = TelegramNotificationService("http://tg.test/bot123:abc/", chat_id="42")
+            for channel in (webhook, telegram):
+                channel._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            await webhook.deliver("标题", "内容", 6)
+            with self.assertRaises(RuntimeError):
+                await telegram.deliver("标题", "内容", 3)
+            # send 保持吞掉异常的语义
+            await telegram.send("标题", "内容", 3)
+            await webhook.aclose()
+            await telegram.aclose()
+
+        asyncio.run(scenario())
+        self.assertEqual(requests[0], ("http://hook.test/notify", {"title": "标题", "message": "内容", "priority": 6}))
+        self.assertEqual(requests[1][0], "http://tg.test/bot123:abc/sendMessage")
+        self.assertEqual(requests[1][1], {"chat_id": "42", "text": "标题\n内容", "disable_notification": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+import test_account_tags  # noqa: F401  确保后端目录在 sys.path 中
+
+from test_notification_fanout import FakeChannel
+
+from core.infrastructure.notifications.fanout import ChannelWorker, FanoutNotificationService
+from core.infrastructure.notifications.outbox import NotificationOutbox
+
+
+class OutboxTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.temp_dir.name) / "data" / "notifications.db")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_dedupe_lease_and_backoff(self) -> None:
+        outbox = NotificationOutbox(self.path, lease_seconds=60, retry_base_seconds=5, dedupe_seconds=100)
+        added = outbox.add("invalid:1", ["gotify", "webhook"], "Cookie 失效", "内容", 7, now=1000)
+        self.assertEqual(set(added), {"gotify", "webhook"})
+        self.assertEqual(list(outbox.add("invalid:1", ["gotify", "telegram"], "Cookie 失效", "内容", 7, now=1001)), ["telegram"])
+
+        # 新写入的记录由写入方持有租约, 租约到期(如进程崩溃)后才能被重新认领
+        self.assertEqual(outbox.claim_due("gotify", 10, now=1030), [])
+        [entry] = outbox.claim_due("gotify", 10, now=1061)
+        self.assertEqual((entry.event_key, entry.attempts), ("invalid:1", 0))
+
+        retry_at = outbox.mark_failed(entry.id, entry.attempts, "ConnectError", now=1062)
+        self.assertTrue(1062 + 4 <= retry_at <= 1062 + 6)
+        self.assertEqual(outbox.claim_due("gotify", 10, now=retry_at - 0.1), [])
+        [entry] = outbox.claim_due("gotify", 10, now=retry_at)
+        self.assertEqual(entry.attempts, 1)
+        outbox.mark_delivered(entry.id, now=1100)
+        self.assertEqual(outbox.pending(), {"webhook": 1, "telegram": 1})
+
+        # 去重期内同一事件不再写入, 过期后清理
+        self.assertEqual(outbox.add("invalid:1", ["gotify"], "Cookie 失效", "内容", 7, now=1150), {})
+        self.assertEqual(outbox.purge(now=1201), (1, 0))
+        self.assertEqual(list(outbox.add("invalid:1", ["gotify"], "Cookie 失效", "内容", 7, now=1202)), ["gotify"])
+        outbox.close()
+
+    def test_failed_notifications_survive_restart(self) -> None:
+        def build(channel: FakeChannel) -> FanoutNotificationService:
+            outbox = NotificationOutbox(self.path, retry_base_seconds=0.1)
+            return FanoutNotificationService([ChannelWorker(channel)], outbox=outbox, poll_interval_seconds=0.05)
+
+        async def first_run() -> dict:
+            fanout = build(FakeChannel("gotify", fail=True))
+            await fanout.send("Cookie 失效", "用户 1 的 Cookie 已失效", priority=7, key="invalid:1")
+            await asyncio.sleep(0.05)
+            metrics = fanout.metrics()[0]
+            await fanout.aclose()
+            return metrics
+
+        async def second_run():
+            channel = FakeChannel("gotify")
+            fanout = build(channel)
+            fanout.start()
+            await asyncio.sleep(0.3)
+            # 已送达的事件在去重期内再次提交不会重复发送
+            await fanout.send("Cookie 失效", "用户 1 的 Cookie 已失效", priority=7, key="invalid:1")
+            await asyncio.sleep(0.1)
+            metrics = fanout.metrics()[0]
+            await fanout.aclose()
+            return channel.received, metrics
+
+        metrics = asyncio.run(first_run())
+        self.assertEqual((metrics["sent"], metrics["failed"]), (0, 1))
+
+        received, metrics = asyncio.run(second_run())
+        self.assertEqual(received, [("Cookie 失效", 7)])
+        self.assertEqual((metrics["sent"], metrics["pending"]), (1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
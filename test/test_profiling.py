@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from test_account_tags import close_log_handlers, load_test_app, write_config
+
+from core.utils.profiling import LoopStallDetector
+
+
+class ProfilingMiddlewareTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.output_dir = root / "profiles"
+        config_path = root / "config.yaml"
+        write_config(config_path, root / "cookies")
+        with config_path.open("a", encoding="utf-8") as f:
+            f.write(
+                "\nPROFILING:\n"
+                "  engine: cprofile\n"
+                "  threshold_ms: 0\n"
+                f"  output_dir: \"{self.output_dir.as_posix()}\"\n"
+            )
+        self.app = load_test_app(config_path)
+        self.client = TestClient(self.app)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        close_log_handlers()
+        self.temp_dir.cleanup()
+
+    def test_header_with_token_writes_profile(self) -> None:
+        self.client.get("/api/v1/cookies/stats", headers={"X-Profile": "1"})
+        self.client.get("/api/v1/cookies/stats", headers={"X-Profile": "1", "Authorization": "Bearer wrong"})
+        self.assertFalse(self.output_dir.exists())
+
+        response = self.client.get("/api/v1/cookies/stats", headers={"X-Profile": "1", "Authorization": "Bearer test-token"})
+        self.assertEqual(response.status_code, 200)
+        profiles = list(self.output_dir.glob("*.prof"))
+        self.assertEqual(len(profiles), 1)
+        self.assertIn("GET-api_v1_cookies_stats", profiles[0].name)
+
+
+class LoopStallDetectorTests(unittest.TestCase):
+    def test_blocking_call_is_reported_with_stack(self) -> None:
+        def blocking_helper() -> None:
+            time.sleep(0.3)
+
+        async def scenario() -> LoopStallDetector:
+            detector = LoopStallDetector(threshold_ms=50)
+            detector.start()
+            try:
+                await asyncio.sleep(0.05)
+                blocking_helper()
+                await asyncio.sleep(0.05)
+            finally:
+                detector.stop()
+            return detector
+
+        with self.assertLogs("core.utils.profiling", level="WARNING") as logs:
+            detector = asyncio.run(scenario())
+        self.assertEqual(detector.stalls, 1)
+        self.assertTrue(any("blocking_helper" in line for line in logs.output))
+        self.assertTrue(any("已恢复" in line for line in logs.output))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import random
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+
+from test_account_tags import build_raw
+
+from core.infrastructure.repositories.cookie_repository import CookieRepository
+from core.services.cookie_service import CookieService
+from core.utils.sampler import WeightedSampler
+
+
+class WeightedSamplerTests(unittest.TestCase):
+    def test_pick_follows_weights_and_skips_zero(self) -> None:
+        sampler = WeightedSampler(capacity=2)
+        sampler.set("a", 1.0)
+        sampler.set("b", 3.0)
+        sampler.set("c", 0.0)
+        sampler.set("d", 6.0)
+
+        self.assertAlmostEqual(sampler.total, 10.0)
+        rng = random.Random(7)
+        counts = Counter(sampler.pick(rng) for _ in range(5000))
+        self.assertNotIn("c", counts)
+        self.assertLess(counts["a"], counts["b"])
+        self.assertLess(counts["b"], counts["d"])
+
+    def test_remove_and_reuse_slots(self) -> None:
+        sampler = WeightedSampler(capacity=1)
+        sampler.set("a", 2.0)
+        sampler.set("b", 1.0)
+        sampler.remove("a")
+        self.assertAlmostEqual(sampler.total, 1.0)
+        self.assertEqual(sampler.pick(), "b")
+
+        sampler.remove("b")
+        self.assertIsNone(sampler.pick())
+        sampler.set("c", 1.0)
+        self.assertEqual(len(sampler), 1)
+        self.assertEqual(sampler.pick(), "c")
+
+
+class WeightedRandomCookieTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repo = CookieRepository(str(Path(self.temp_dir.name) / "cookies"))
+        self.service = CookieService(self.repo)
+        for uid in ("4001", "4002", "4003"):
+            await self.repo.save_from_raw(build_raw(uid))
+        await self.repo.update_check_status("4001", valid=True)
+        await self.repo.update_check_status("4002", valid=True)
+        await self.repo.update_check_status("4003", valid=False)
+
+    async def asyncTearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    async def test_weighted_only_returns_valid_enabled_accounts(self) -> None:
+        await self.service.set_enabled("4002", False)
+        for _ in range(20):
+            chosen = await self.service.get_random_cookie(strategy="weighted")
+            self.assertEqual(chosen["DedeUserID"], "4001")
+
+    async def test_recent_failures_lower_weight(self) -> None:
+        await self.service.get_random_cookie(strategy="weighted")
+        for _ in range(5):
+            self.service.health.record("4002", False)
+
+        self.assertLess(self.service.health.weight("4002"), self.service.health.weight("4001"))
+        self.assertEqual(self.service.health.weight("4003"), 0.0)
+
+    async def test_unknown_strategy_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            await self.service.get_random_cookie(strategy="round_robin")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import test_account_tags  # noqa: F401  确保后端目录在 sys.path 中
+
+from core.scheduler.sharding import HashRing, ShardMembership
+
+
+class HashRingTests(unittest.TestCase):
+    def test_adding_a_member_moves_only_its_share(self) -> None:
+        ids = [str(100000 + i) for i in range(3000)]
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "b", "c", "d"])
+
+        owners = {uid: before.owner(uid) for uid in ids}
+        self.assertTrue(all(count > 600 for count in (list(owners.values()).count(m) for m in "abc")))
+        moved = [uid for uid in ids if after.owner(uid) != owners[uid]]
+        self.assertTrue(all(after.owner(uid) == "d" for uid in moved))
+        self.assertLess(len(moved), len(ids) * 0.4)
+
+
+class ShardMembershipTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.members_dir = str(Path(self.temp_dir.name) / "members")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_members_partition_ids_and_rebalance_on_leave(self) -> None:
+        first = ShardMembership(self.members_dir, member_id="first")
+        second = ShardMembership(self.members_dir, member_id="second")
+        now = time.time()
+        first.heartbeat(now)
+        second.heartbeat(now)
+        self.assertTrue(first.heartbeat(now + 1))
+
+        ids = [str(200000 + i) for i in range(500)]
+        first_ids = {uid for uid in ids if first.owns(uid)}
+        second_ids = {uid for uid in ids if second.owns(uid)}
+        self.assertFalse(first_ids & second_ids)
+        self.assertEqual(first_ids | second_ids, set(ids))
+
+        second.backlog["check"] = 7
+        second.heartbeat(now + 2)
+        first.heartbeat(now + 2)
+        backlog = {item["member"]: item["backlog"]["check"] for item in first.shards()}
+        self.assertEqual(backlog, {"first": 0, "second": 7})
+
+        second.leave()
+        self.assertTrue(first.heartbeat(now + 3))
+        self.assertTrue(all(first.owns(uid) for uid in ids))
+
+    def test_silent_member_expires_after_ttl(self) -> None:
+        first = ShardMembership(self.members_dir, member_ttl_seconds=15, member_id="first")
+        second = ShardMembership(self.members_dir, member_ttl_seconds=15, member_id="second")
+        now = time.time()
+        second.heartbeat(now)
+        first.heartbeat(now)
+        self.assertEqual(first.ring.members, ("first", "second"))
+
+        first.heartbeat(now + 20)
+        self.assertEqual(first.ring.members, ("first",))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+import httpx
+
+from test_account_tags import build_raw
+from test_wbi_keys import CountingNav, nav_payload
+
+from core.infrastructure.bilibili_client import BilibiliClient
+from core.infrastructure.repositories.cookie_repository import CookieRepository
+from core.services import CookieService
+
+
+class SingleFlightTests(unittest.TestCase):
+    def test_concurrent_nav_calls_for_same_cookie_share_one_request(self) -> None:
+        nav = CountingNav(code=0)
+        client = BilibiliClient(transport=httpx.MockTransport(nav))
+
+        async def scenario() -> list:
+            try:
+                return await asyncio.gather(
+                    client.check_cookie_valid("SESSDATA=a"),
+                    client.check_cookie_valid("SESSDATA=a"),
+                    client.get_nav("SESSDATA=a"),
+                    client.check_cookie_valid("SESSDATA=b"),
+                )
+            finally:
+                await client.aclose()
+
+        results = asyncio.run(scenario())
+        self.assertEqual(results[:2], [True, True])
+        self.assertTrue(results[2]["isLogin"])
+        self.assertEqual(nav.calls, 2)
+
+    def test_failure_is_shared_and_not_cached(self) -> None:
+        calls = []
+
+        async def broken(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            await asyncio.sleep(0.01)
+            raise httpx.ConnectError("boom", request=request)
+
+        client = BilibiliClient(transport=httpx.MockTransport(broken))
+
+        async def scenario() -> list:
+            try:
+                first = await asyncio.gather(*(client.check_cookie_valid("SESSDATA=a") for _ in range(3)))
+                return first + [await client.check_cookie_valid("SESSDATA=a")]
+            finally:
+                await client.aclose()
+
+        self.assertEqual(asyncio.run(scenario()), [False] * 4)
+        self.assertEqual(len(calls), 2)
+
+
+class TestCookieCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repo = CookieRepository(str(Path(self.temp_dir.name) / "cookies"))
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_repeated_tests_reuse_cached_verdict(self) -> None:
+        nav = CountingNav(code=-101)
+        client = BilibiliClient(transport=httpx.MockTransport(nav))
+        service = CookieService(self.repo, bilibili_client=client, test_cache_ttl_seconds=60)
+        uncached = CookieService(self.repo, bilibili_client=client, test_cache_ttl_seconds=0)
+
+        async def scenario() -> list:
+            try:
+                results = [await service.test_cookie("SESSDATA=x") for _ in range(3)]
+                results.append(await uncached.test_cookie("SESSDATA=x"))
+                results.append(await uncached.test_cookie("SESSDATA=x"))
+                return results
+            finally:
+                await client.aclose()
+
+        results = asyncio.run(scenario())
+        self.assertTrue(all(result == {"code": 200, "is_valid": False, "message": "Cookie 无效"} for result in results))
+        self.assertEqual(nav.calls, 3)
+
+    def test_valid_check_takes_username_from_one_nav_request(self) -> None:
+        calls = []
+
+        async def nav(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            payload = nav_payload(code=0)
+            payload["data"]["uname"] = "测试用户"
+            return httpx.Response(200, json=payload)
+
+        client = BilibiliClient(transport=httpx.MockTransport(nav))
+        service = CookieService(self.repo, bilibili_client=client)
+
+        async def scenario() -> dict:
+            await self.repo.save_from_raw(build_raw("8301"))
+            try:
+                return await service.check_cookie("8301")
+            finally:
+                await client.aclose()
+
+        doc = asyncio.run(scenario())
+        self.assertEqual(doc["managed"]["status"], "valid")
+        self.assertEqual(doc["managed"]["username"], "测试用户")
+        self.assertEqual(calls, ["/x/web-interface/nav"])
+
+    def test_throttled_nav_is_not_a_verdict(self) -> None:
+        nav = CountingNav(code=-412)
+        client = BilibiliClient(transport=httpx.MockTransport(nav))
+        service = CookieService(self.repo, bilibili_client=client, test_cache_ttl_seconds=60)
+
+        async def scenario() -> list:
+            try:
+                return [await client.check_login("SESSDATA=x")] + [await service.test_cookie("SESSDATA=x") for _ in range(2)]
+            finally:
+                await client.aclose()
+
+        verdict, *results = asyncio.run(scenario())
+        self.assertEqual(verdict, (None, -412, {}))
+        self.assertTrue(all(result["code"] == 502 for result in results))
+        self.assertEqual(nav.calls, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from test_account_tags import build_raw, close_log_handlers, load_test_app, write_config
+
+from core.infrastructure.repositories.schema_upgrade import SCHEMA_FILENAME
+from core.scheduler.leader import LeaderElection
+
+
+class StartupTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        config_path = root / "config.yaml"
+        write_config(config_path, root / "cookies")
+        self.app = load_test_app(config_path)
+        repo = self.app.state.cookie_service.repo
+        asyncio.run(repo.save_from_raw(build_raw("9301")))
+        repo.index.ready = False
+
+    def tearDown(self) -> None:
+        close_log_handlers()
+        self.temp_dir.cleanup()
+
+    def _enable_scheduler_section(self, section: str) -> Path:
+        """在配置的 SCHEDULER 下追加启用的 LEADER_ELECTION / SHARDING。"""
+        config_path = Path(self.temp_dir.name) / "config.yaml"
+        config_path.write_text(
+            config_path.read_text(encoding="utf-8") + f"\n  {section}:\n    enable: true\n",
+            encoding="utf-8",
+        )
+        return config_path
+
+    def test_clients_are_built_lazily_and_index_warms_in_background(self) -> None:
+        self.assertIsNone(self.app.state.cookie_service.client._http)
+        self.assertEqual(set(self.app.state.startup_timing), {"imports", "config", "build", "app"})
+
+        with TestClient(self.app) as client:
+            deadline = time.monotonic() + 5
+            while not client.get("/api/v1/health").json()["ready"] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(client.get("/api/v1/health").json()["ready"])
+            self.assertTrue(self.app.state.cookie_service.repo.index.ready)
+            self.assertIn("9301", self.app.state.cookie_service.repo.index.ids())
+            self.assertIn("warm_up", self.app.state.startup_timing)
+
+    def test_storage_upgrade_runs_only_on_the_leader(self) -> None:
+        root = Path(self.temp_dir.name)
+        config_path = self._enable_scheduler_section("LEADER_ELECTION")
+        version_file = root / "cookies" / SCHEMA_FILENAME
+        other = LeaderElection(str(root / "scheduler.lease"))
+        self.assertTrue(other.try_acquire())
+
+        close_log_handlers()
+        app = load_test_app(config_path)
+        with TestClient(app):
+            time.sleep(0.2)
+            self.assertFalse(version_file.exists())
+
+        other.release()
+        close_log_handlers()
+        app = load_test_app(config_path)
+        with TestClient(app):
+            deadline = time.monotonic() + 5
+            while not version_file.exists() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(version_file.exists())
+            self.assertTrue(app.state.leader_election.is_leader)
+
+    def test_sharded_instances_leave_maintenance_to_the_lease_holder(self) -> None:
+        root = Path(self.temp_dir.name)
+        config_path = self._enable_scheduler_section("SHARDING")
+        version_file = root / "cookies" / SCHEMA_FILENAME
+        other = LeaderElection(str(root / "scheduler.lease"))
+        self.assertTrue(other.try_acquire())
+
+        close_log_handlers()
+        app = load_test_app(config_path)
+        self.assertIsNotNone(app.state.shard)
+        with TestClient(app):
+            time.sleep(0.2)
+            self.assertFalse(version_file.exists())
+
+        other.release()
+        close_log_handlers()
+        app = load_test_app(config_path)
+        with TestClient(app):
+            deadline = time.monotonic() + 5
+            while not version_file.exists() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(version_file.exists())
+
+    def test_standby_does_not_convert_existing_files(self) -> None:
+        root = Path(self.temp_dir.name)
+        config_path = self._enable_scheduler_section("LEADER_ELECTION")
+        config_path.write_text(
+            config_path.read_text(encoding="utf-8").replace("STORAGE:\n", "STORAGE:\n  format: compact\n"),
+            encoding="utf-8",
+        )
+        path = root / "cookies" / "9301.json"
+        original = path.read_bytes()
+        other = LeaderElection(str(root / "scheduler.lease"))
+        self.assertTrue(other.try_acquire())
+        close_log_handlers()
+        app = load_test_app(config_path)
+        self.assertEqual(app.state.config.storage.format, "compact")
+
+        with TestClient(app) as client:
+            deadline = time.monotonic() + 5
+            while not client.get("/api/v1/health").json()["ready"] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.1)
+        self.assertEqual(path.read_bytes(), original)
+        self.assertEqual(sorted(p.name for p in path.parent.iterdir()), ["9301.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from test_account_tags import build_raw
+
+from core.infrastructure.repositories.cookie_repository import CookieRepository
+from core.infrastructure.repositories.doc_codec import detect_format
+
+
+class StorageFormatTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cookie_dir = Path(self.temp_dir.name) / "cookies"
+
+    async def asyncTearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    async def test_compact_repository_reads_pretty_files(self) -> None:
+        pretty_repo = CookieRepository(str(self.cookie_dir))
+        await pretty_repo.save_from_raw(build_raw("9001"))
+        path = self.cookie_dir / "9001.json"
+        self.assertEqual(detect_format(path.read_bytes()), "pretty")
+
+        compact_repo = CookieRepository(str(self.cookie_dir), storage_format="compact")
+        doc = await compact_repo.get("9001")
+        self.assertEqual(doc["managed"]["DedeUserID"], "9001")
+
+        await compact_repo.update_tags("9001", ["主力号"])
+        data = path.read_bytes()
+        self.assertEqual(detect_format(data), "compact")
+        self.assertEqual(json.loads(data)["managed"]["tags"], ["主力号"])
+
+    async def test_writes_replace_the_file_atomically(self) -> None:
+        repo = CookieRepository(str(self.cookie_dir))
+        await repo.save_from_raw(build_raw("9011"))
+        path = self.cookie_dir / "9011.json"
+        before = path.stat().st_ino
+
+        await repo.update_tags("9011", ["原子写入"])
+        self.assertNotEqual(path.stat().st_ino, before)
+        self.assertEqual([p.name for p in self.cookie_dir.iterdir()], ["9011.json"])
+        self.assertEqual(json.loads(path.read_bytes())["managed"]["tags"], ["原子写入"])
+
+    async def test_convert_storage_rewrites_only_other_formats(self) -> None:
+        pretty_repo = CookieRepository(str(self.cookie_dir))
+        await pretty_repo.save_from_raw(build_raw("9002"))
+        await pretty_repo.save_from_raw(build_raw("9003"))
+        before = json.loads((self.cookie_dir / "9002.json").read_bytes())
+
+        compact_repo = CookieRepository(str(self.cookie_dir), storage_format="compact")
+        result = await compact_repo.convert_storage()
+        self.assertEqual(result, {"scanned": 2, "converted": 2, "failed": 0})
+        self.assertEqual(detect_format((self.cookie_dir / "9002.json").read_bytes()), "compact")
+        self.assertEqual(json.loads((self.cookie_dir / "9002.json").read_bytes()), before)
+
+        again = await compact_repo.convert_storage()
+        self.assertEqual(again["converted"], 0)
+
+    async def test_get_is_cached_until_file_changes(self) -> None:
+        repo = CookieRepository(str(self.cookie_dir))
+        await repo.save_from_raw(build_raw("9004"))
+        first = await repo.get("9004")
+        self.assertIs(await repo.get("9004"), first)
+
+        path = self.cookie_dir / "9004.json"
+        stored = json.loads(path.read_bytes())
+        stored["managed"]["username"] = "外部修改"
+        path.write_text(json.dumps(stored, ensure_ascii=False), encoding="utf-8")
+
+        reloaded = await repo.get("9004")
+        self.assertEqual(reloaded["managed"]["username"], "外部修改")
+
+        updated = await repo.update_tags("9004", ["备用"])
+        self.assertEqual(reloaded["managed"]["tags"], [])
+        self.assertIs(await repo.get("9004"), updated)
+
+    async def test_write_behind_buffers_hot_fields_until_flush(self) -> None:
+        repo = CookieRepository(str(self.cookie_dir), write_behind=True)
+        await repo.save_from_raw(build_raw("9005"))
+        path = self.cookie_dir / "9005.json"
+        await repo.update_check_status("9005", valid=True)
+        on_disk = path.read_bytes()
+
+        updated = await repo.update_check_status("9005", valid=True, username="热字段")
+        self.assertEqual(repo.pending_writes, 1)
+        self.assertEqual(path.read_bytes(), on_disk)
+        self.assertIs(await repo.get("9005"), updated)
+
+        self.assertEqual(await repo.flush(), 1)
+        self.assertEqual(repo.pending_writes, 0)
+        self.assertEqual(json.loads(path.read_bytes())["managed"]["username"], "热字段")
+
+        await repo.update_check_status("9005", valid=False, error_message="失效")
+        self.assertEqual(repo.pending_writes, 0)
+        self.assertEqual(json.loads(path.read_bytes())["managed"]["status"], "invalid")
+
+    async def test_flush_drops_buffer_when_file_changed_externally(self) -> None:
+        repo = CookieRepository(str(self.cookie_dir), write_behind=True)
+        await repo.save_from_raw(build_raw("9006"))
+        await repo.update_check_status("9006", valid=True)
+        await repo.update_check_status("9006", valid=True, username="缓冲")
+
+        path = self.cookie_dir / "9006.json"
+        stored = json.loads(path.read_bytes())
+        stored["managed"]["tags"] = ["外部"]
+        path.write_text(json.dumps(stored, ensure_ascii=False), encoding="utf-8")
+
+        self.assertEqual(await repo.flush(), 0)
+        self.assertEqual((await repo.get("9006"))["managed"]["tags"], ["外部"])
+
+    async def test_hashed_layout_reads_flat_files_and_migrates(self) -> None:
+        flat_repo = CookieRepository(str(self.cookie_dir))
+        await flat_repo.save_from_raw(build_raw("9007"))
+        await flat_repo.save_from_raw(build_raw("9008"))
+
+        repo = CookieRepository(str(self.cookie_dir), layout="hashed")
+        await repo.save_from_raw(build_raw("9009"))
+        self.assertFalse((self.cookie_dir / "9009.json").exists())
+        self.assertEqual(len(list(self.cookie_dir.glob("*/*/9009.json"))), 1)
+
+        cached = await repo.get("9007")
+        self.assertEqual(cached["managed"]["DedeUserID"], "9007")
+        self.assertEqual(sorted(d["managed"]["DedeUserID"] for d in await repo.list()), ["9007", "9008", "9009"])
+
+        result = await repo.migrate_layout()
+        self.assertEqual(result, {"scanned": 3, "moved": 2, "conflicts": 0, "failed": 0})
+        self.assertEqual(list(self.cookie_dir.glob("*.json")), [])
+        self.assertIs(await repo.get("9007"), cached)
+
+        # 另一进程仍持有旧路径时可重新定位
+        self.assertEqual((await flat_repo.get("9008"))["managed"]["DedeUserID"], "9008")
+        await flat_repo.update_tags("9008", ["迁移后"])
+        self.assertEqual((await repo.get("9008"))["managed"]["tags"], ["迁移后"])
+        self.assertTrue(await repo.delete("9008"))
+        self.assertIsNone(await flat_repo.get("9008"))
+
+    async def test_migrate_layout_keeps_newer_copy_and_delete_removes_both(self) -> None:
+        repo = CookieRepository(str(self.cookie_dir), layout="hashed")
+        await repo.save_from_raw(build_raw("9010"))
+        hashed = next(self.cookie_dir.glob("*/*/9010.json"))
+        flat = self.cookie_dir / "9010.json"
+        stored = json.loads(hashed.read_bytes())
+        stored["managed"]["tags"] = ["手动放入"]
+        flat.write_text(json.dumps(stored, ensure_ascii=False), encoding="utf-8")
+        os.utime(flat, ns=(hashed.stat().st_mtime_ns + 10**9,) * 2)
+
+        result = await repo.migrate_layout()
+        self.assertEqual((result["conflicts"], result["failed"]), (1, 0))
+        self.assertFalse(flat.exists())
+        self.assertTrue(Path(str(hashed) + ".conflict").exists())
+        self.assertEqual((await repo.get("9010"))["managed"]["tags"], ["手动放入"])
+
+        flat.write_text(json.dumps(stored, ensure_ascii=False), encoding="utf-8")
+        self.assertTrue(await repo.delete("9010"))
+        self.assertFalse(flat.exists() or hashed.exists())
+        self.assertIsNone(await repo.get("9010"))
+
+    def test_unknown_format_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            CookieRepository(str(self.cookie_dir), storage_format="yaml")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
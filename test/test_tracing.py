@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import httpx
+
+from test_account_tags import build_raw
+from test_wbi_keys import CountingNav
+
+from core.infrastructure.bilibili_client import BilibiliClient
+from core.infrastructure.repositories.cookie_repository import CookieRepository
+from core.services import CookieService
+from core.utils.tracing import JsonlSpanExporter, OtlpHttpSpanExporter, tracer
+
+
+class TracingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+
+    def tearDown(self) -> None:
+        tracer.shutdown()
+        self.temp_dir.cleanup()
+
+    def test_check_produces_nested_spans_with_user_id(self) -> None:
+        trace_path = self.root / "traces.jsonl"
+        repo = CookieRepository(str(self.root / "cookies"))
+
+        async def scenario() -> None:
+            await repo.save_from_raw(build_raw("9201"))
+            tracer.configure(JsonlSpanExporter(str(trace_path)), flush_interval_seconds=60)
+            client = BilibiliClient(transport=httpx.MockTransport(CountingNav(code=0)))
+            try:
+                await CookieService(repo, bilibili_client=client).check_cookie("9201")
+            finally:
+                await client.aclose()
+
+        asyncio.run(scenario())
+        tracer.shutdown()
+
+        spans = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").splitlines()]
+        by_name = {span["name"]: span for span in spans}
+        root = by_name["service.check_cookie"]
+        self.assertIsNone(root["parent_id"])
+        for name in ("bilibili.check_login", "bilibili.http", "repository.save"):
+            self.assertEqual(by_name[name]["trace_id"], root["trace_id"])
+            self.assertEqual(by_name[name]["attributes"]["DedeUserID"], "9201")
+        # 有效时用户名取自同一次 nav 响应, 只有一次上游请求
+        self.assertNotIn("bilibili.get_nav", by_name)
+        http_spans = [span for span in spans if span["name"] == "bilibili.http"]
+        self.assertEqual([span["parent_id"] for span in http_spans], [by_name["bilibili.check_login"]["span_id"]])
+
+    def test_disabled_tracer_records_nothing(self) -> None:
+        self.assertFalse(tracer.enabled)
+        with tracer.span("noop", DedeUserID="1") as span:
+            span.set_attribute("x", 1)
+        self.assertEqual(tracer.flush(), 0)
+
+    def test_otlp_payload_shape(self) -> None:
+        exporter = OtlpHttpSpanExporter("http://collector:4318", "svc")
+        try:
+            payload = exporter._payload([{
+                "name": "service.check_cookie", "trace_id": "a" * 32, "span_id": "b" * 16, "parent_id": None,
+                "start_time_unix_nano": 1, "end_time_unix_nano": 2, "duration_ms": 0.0, "error": "boom",
+                "attributes": {"DedeUserID": "9201", "status_code": 200},
+            }])
+        finally:
+            exporter.close()
+        self.assertEqual(exporter.url, "http://collector:4318/v1/traces")
+        span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertNotIn("parentSpanId", span)
+        self.assertEqual(span["status"], {"code": 2, "message": "boom"})
+        self.assertIn({"key": "status_code", "value": {"intValue": "200"}}, span["attributes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from test_account_tags import FakeBilibiliClient, build_raw, load_test_app, write_config
+
+from core.infrastructure.repositories.cookie_repository import CookieRepository
+from core.services import CookieService
+from core.services.usage_feedback import UsageFeedback
+
+
+class UsageFeedbackTests(unittest.TestCase):
+    def test_thresholds_and_sliding_window(self) -> None:
+        feedback = UsageFeedback(window_seconds=60, error_threshold=3, error_ratio=0.5, cooldown_seconds=100)
+        for i in range(4):
+            self.assertFalse(feedback.record("1", 0, now=1000 + i))
+        self.assertFalse(feedback.record("1", -412, now=1004))
+        self.assertFalse(feedback.record("1", -412, now=1005))
+        # 3 次错误但占比 3/7 不足一半
+        self.assertFalse(feedback.record("1", -412, now=1006))
+        # 成功上报滑出窗口后占比达标
+        self.assertTrue(feedback.record("1", -412, now=1063))
+        state = feedback.state("1", now=1063)
+        self.assertEqual((state["reason"], state["window"]), ("errors", {"total": 5, "errors": 4}))
+        self.assertFalse(feedback.reinstate("1", verified_valid=True))
+        self.assertTrue(feedback.is_demoted("1", now=1162))
+        self.assertFalse(feedback.is_demoted("1", now=1164))
+
+        self.assertTrue(feedback.record("2", -101, now=1000))
+        self.assertFalse(feedback.reinstate("2", verified_valid=False))
+        self.assertTrue(feedback.reinstate("2", verified_valid=True))
+        self.assertFalse(feedback.is_demoted("2", now=1001))
+
+
+class ReportServiceTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cookie_dir = str(Path(self.temp_dir.name) / "cookies")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_demoted_accounts_leave_random_pool_until_checked(self) -> None:
+        checks = []
+
+        class RecordingClient(FakeBilibiliClient):
+            async def check_login(self, header_string: str):
+                checks.append(header_string)
+                return await super().check_login(header_string)
+
+        async def scenario():
+            repo = CookieRepository(self.cookie_dir)
+            service = CookieService(
+                repo,
+                bilibili_client=RecordingClient(),
+                feedback=UsageFeedback(error_threshold=2, error_ratio=0.5, cooldown_seconds=600),
+            )
+            for uid in ("9501", "9502"):
+                await repo.save_from_raw(build_raw(uid))
+                await service.check_cookie(uid)
+            checks.clear()
+
+            state = await service.report_usage("9501", -101)
+            self.assertEqual((state["demoted"], state["reason"]), (True, "auth"))
+            for strategy in ("uniform", "weighted"):
+                picks = {(await service.get_random_cookie(strategy=strategy))["DedeUserID"] for _ in range(20)}
+                self.assertEqual(picks, {"9502"})
+
+            # 优先检查通过后恢复
+            await asyncio.sleep(0.05)
+            self.assertEqual(len(checks), 1)
+            self.assertFalse(service.feedback.is_demoted("9501"))
+            self.assertGreater(service.health.weight("9501"), 0)
+
+            # 风控类错误即使检查通过也保持降级到冷却结束
+            await service.report_usage("9502", -412)
+            state = await service.report_usage("9502", -412)
+            self.assertEqual(state["reason"], "errors")
+            await asyncio.sleep(0.05)
+            self.assertTrue(service.feedback.is_demoted("9502"))
+            self.assertEqual(service.health.weight("9502"), 0)
+            self.assertIsNone(await service.report_usage("missing", 0))
+            await service.aclose()
+
+        asyncio.run(scenario())
+
+
+class ReportRouteTests(unittest.TestCase):
+    def test_report_endpoint(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            write_config(root / "config.yaml", root / "cookies")
+            asyncio.run(CookieRepository(str(root / "cookies")).save_from_raw(build_raw("9503")))
+            client = TestClient(load_test_app(root / "config.yaml"))
+            headers = {"Authorization": "Bearer test-token"}
+
+            resp = client.post("/api/v1/cookies/9503/report", json={"outcome": "ok"}, headers=headers)
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.json()["window"], {"total": 1, "errors": 0})
+            self.assertEqual(client.post("/api/v1/cookies/9503/report", json={"outcome": "bad"}, headers=headers).status_code, 400)
+            self.assertEqual(client.post("/api/v1/cookies/404/report", json={"outcome": -412}, headers=headers).status_code, 404)
+            client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
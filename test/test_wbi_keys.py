@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+import httpx
+from fastapi.testclient import TestClient
+
+from test_account_tags import close_log_handlers, load_test_app, write_config
+
+from core.infrastructure.bilibili_client import BilibiliClient, get_mixin_key, wbisign
+
+
+IMG_KEY = "7cd084941338484aae1ad9425b84077c"
+SUB_KEY = "4932caff0ff746eab6f01bf08b70ac45"
+
+
+def nav_payload(code: int = -101) -> dict:
+    return {
+        "code": code,
+        "data": {
+            "isLogin": code == 0,
+            "wbi_img": {
+                "img_url": f"https://i0.hdslb.com/bfs/wbi/{IMG_KEY}.png",
+                "sub_url": f"https://i0.hdslb.com/bfs/wbi/{SUB_KEY}.png",
+            },
+        },
+    }
+
+
+class CountingNav:
+    def __init__(self, code: int = -101) -> None:
+        self.code = code
+        self.calls = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=nav_payload(self.code))
+
+
+class WbiSigningTests(unittest.TestCase):
+    def test_mixin_key_and_signature_match_reference(self) -> None:
+        mixin_key = get_mixin_key(IMG_KEY, SUB_KEY)
+        self.assertEqual(mixin_key, "ea1db124af3c7062474693fa704f4ff8")
+        signed = wbisign({"foo": "114", "bar": "514", "zab": 1919810}, mixin_key, wts=1702204169)
+        self.assertEqual(signed["w_rid"], "8f6f2b5b3d485fe1886cec6a0be8c5d4")
+        self.assertEqual(list(signed), ["bar", "foo", "wts", "zab", "w_rid"])
+
+    def test_concurrent_refresh_uses_one_nav_request(self) -> None:
+        nav = CountingNav()
+        client = BilibiliClient(transport=httpx.MockTransport(nav))
+
+        async def scenario() -> list:
+            try:
+                return await asyncio.gather(*(client.get_wbi_keys() for _ in range(5)))
+            finally:
+                await client.aclose()
+
+        results = asyncio.run(scenario())
+        self.assertEqual(nav.calls, 1)
+        self.assertTrue(all(keys["mixin_key"] == "ea1db124af3c7062474693fa704f4ff8" for keys in results))
+        self.assertGreater(results[0]["expires_at"], results[0]["fetched_at"])
+
+    def test_cookie_check_populates_keys(self) -> None:
+        nav = CountingNav(code=0)
+        client = BilibiliClient(transport=httpx.MockTransport(nav))
+
+        async def scenario() -> dict:
+            try:
+                self.assertTrue(await client.check_cookie_valid("SESSDATA=x"))
+                return await client.sign_wbi({"mid": 1})
+            finally:
+                await client.aclose()
+
+        signed = asyncio.run(scenario())
+        self.assertEqual(nav.calls, 1)
+        self.assertIn("w_rid", signed)
+
+
+class WbiKeysApiTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        config_path = root / "config.yaml"
+        write_config(config_path, root / "cookies")
+        self.app = load_test_app(config_path)
+        self.nav = CountingNav()
+        self.app.state.cookie_service.client = BilibiliClient(transport=httpx.MockTransport(self.nav))
+        self.client = TestClient(self.app)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        close_log_handlers()
+        self.temp_dir.cleanup()
+
+    def test_keys_endpoint_requires_token_and_caches(self) -> None:
+        self.assertEqual(self.client.get("/api/v1/wbi/keys").status_code, 401)
+        headers = {"Authorization": "Bearer test-token"}
+        first = self.client.get("/api/v1/wbi/keys", headers=headers)
+        second = self.client.get("/api/v1/wbi/keys", headers=headers)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()["img_key"], IMG_KEY)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.nav.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()